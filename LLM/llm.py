@@ -1,18 +1,297 @@
-from langchain_community.llms import LlamaCpp
+"""
+Local LLM loading.
+
+Models are selected by name from LLM/models.yaml and loaded through a backend (llama.cpp for now).
+Runtime settings are tuned to the machine: threads from the physical/logical core count, `n_ctx`
+from the prompt budget, memory-mapped weights and mlock when there is enough free RAM.
+The chosen settings (and an optional startup self-benchmark) are recorded in LLM/llm_settings.json.
+
+Speculative decoding is opt-in through `import_llm(draft=...)`: a smaller model from models.yaml
+drafts tokens that the main model verifies, or "prompt_lookup" drafts by copying from the prompt.
+"""
+
+import json
+import os
+import time
 from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import yaml
+
+try:
+    import psutil
+except ImportError:  # Optional, only used for a more accurate core count and the free RAM
+    psutil = None
+
+HERE = Path(__file__).resolve().parent
+MODELS_CONFIG = HERE / "models.yaml"
+SETTINGS_FILE = HERE / "llm_settings.json"
+
+# Prompt budget of the default chain: production_retriever returns up to k=20 chunks of 400 tokens
+# (+ header) and the template itself is ~300 tokens
+DEFAULT_K = 20
+CHUNK_TOKENS = 400 + 30
+TEMPLATE_TOKENS = 300
+
+
+def logical_cores() -> int:
+    """
+    Number of logical cores this process may run on (respects CPU affinity / container limits).
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def physical_cores() -> int:
+    """
+    Number of physical cores usable by this process (hyper-threads don't help token generation).
+    """
+    logical = logical_cores()
+
+    if psutil is not None:
+        count = psutil.cpu_count(logical=False)
+        if count:
+            return max(1, min(count, logical))
+
+    # Linux without psutil: unique (physical id, core id) pairs
+    try:
+        cores = set()
+        physical_id = core_id = None
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("physical id"):
+                    physical_id = line.split(":")[1].strip()
+                elif line.startswith("core id"):
+                    core_id = line.split(":")[1].strip()
+                elif not line.strip() and core_id is not None:
+                    cores.add((physical_id, core_id))
+                    physical_id = core_id = None
+        if cores:
+            return max(1, min(len(cores), logical))
+    except OSError:
+        pass
+
+    return logical
+
 
-def import_llm() :
-    here = Path(__file__).resolve().parent 
-    model_path = here / "Qwen3-1.7B-Q8_0.gguf"
-    llm = LlamaCpp(
-        model_path=str(model_path),
-        n_threads=4,
-        temperature=0.5,
-        top_k=20,
-        top_p=0.8,
-        n_ctx = 8040,
-        max_tokens=2048,
-        verbose=True,
-        repeat_penalty = 1.5
+def available_ram() -> Optional[int]:
+    """
+    Available RAM in bytes, None if it can't be read.
+    """
+    if psutil is not None:
+        return psutil.virtual_memory().available
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def estimate_prompt_budget(k: int = DEFAULT_K, chunk_tokens: int = CHUNK_TOKENS, template_tokens: int = TEMPLATE_TOKENS) -> int:
+    """
+    Worst-case number of prompt tokens for k retrieved chunks.
+    """
+    return k * chunk_tokens + template_tokens
+
+
+def load_models_config(path: Path = MODELS_CONFIG) -> list:
+    with open(path) as f:
+        return yaml.safe_load(f) or []
+
+
+def resolve_model(model_name: Optional[str] = None) -> dict:
+    """
+    Find a model in models.yaml by name or GGUF file name (the default one if model_name is None).
+    A path to an existing GGUF file not listed in the config is also accepted.
+    """
+    models = load_models_config()
+
+    if model_name is None:
+        for model in models:
+            if model.get("default"):
+                return model
+        return models[0]
+
+    for model in models:
+        if model_name in (model["name"], model["file"]):
+            return model
+
+    if Path(model_name).exists():
+        return {"name": Path(model_name).stem, "file": str(Path(model_name).resolve()), "backend": "llamacpp"}
+
+    raise ValueError(
+        f"Unknown model '{model_name}'. "
+        f"Available models: {', '.join(m['name'] for m in models)}"
     )
+
+
+def tune_settings(model_path: Path, prompt_budget: int, max_tokens: int, max_ctx: Optional[int] = None) -> Dict:
+    """
+    Choose llama.cpp runtime settings for this machine.
+
+    - n_threads: physical cores (generation is memory-bound, extra hyper-threads slow it down)
+    - n_threads_batch: logical cores (prompt evaluation is compute-bound)
+    - n_ctx: prompt budget + generated tokens, rounded up to 256 and capped by the model
+    - n_batch: 512 tokens per prompt-eval batch (never above n_ctx)
+    - use_mlock: only if the weights fit twice in the available RAM, to avoid swapping them out
+    """
+    n_ctx = -(-(prompt_budget + max_tokens) // 256) * 256
+    if max_ctx:
+        n_ctx = min(n_ctx, max_ctx)
+
+    model_size = model_path.stat().st_size if model_path.exists() else 0
+    ram = available_ram()
+
+    return {
+        "n_threads": physical_cores(),
+        "n_threads_batch": logical_cores(),
+        "n_ctx": n_ctx,
+        "n_batch": min(512, n_ctx),
+        "use_mmap": True,
+        "use_mlock": bool(ram and model_size and ram > 2 * model_size),
+    }
+
+
+def load_llamacpp(model_path: Path, params: Dict):
+    from langchain_community.llms import LlamaCpp
+
+    model_kwargs = dict(params.pop("model_kwargs", {}))
+    # Not a field of the LangChain wrapper, passed straight to llama_cpp.Llama
+    if "n_threads_batch" in params:
+        model_kwargs["n_threads_batch"] = params.pop("n_threads_batch")
+
+    return LlamaCpp(model_path=str(model_path), model_kwargs=model_kwargs, **params)
+
+
+BACKENDS: Dict[str, Callable] = {
+    "llamacpp": load_llamacpp,
+}
+
+
+def register_backend(name: str, loader: Callable):
+    """
+    Add a backend: loader(model_path, params) must return a LangChain LLM.
+    """
+    BACKENDS[name] = loader
+
+
+def self_benchmark(llm, n_tokens: int = 32) -> Dict[str, float]:
+    """
+    Quick startup benchmark of a loaded llama.cpp model: prompt-eval and generation tokens/s.
+    """
+    client = llm.client
+    prompt = "Explain in one sentence what IFRS 9 is about. " * 8
+    prompt_tokens = len(client.tokenize(prompt.encode("utf-8")))
+
+    start = time.perf_counter()
+    first_token = None
+    generated = 0
+    for _ in client.create_completion(prompt, max_tokens=n_tokens, temperature=0.0, stream=True):
+        if first_token is None:
+            first_token = time.perf_counter()
+        generated += 1
+    end = time.perf_counter()
+
+    client.reset()  # Don't leave the benchmark prompt in the KV cache
+
+    if first_token is None:  # Nothing generated (immediate end of sequence), the whole call was prompt evaluation
+        first_token = end
+
+    return {
+        "prompt_tokens": prompt_tokens,
+        "prompt_eval_tps": prompt_tokens / (first_token - start) if first_token > start else 0.0,
+        "generated_tokens": generated,
+        "generation_tps": (generated - 1) / (end - first_token) if generated > 1 else 0.0,
+    }
+
+
+def import_llm(
+    model_name: Optional[str] = None,
+    backend: Optional[str] = None,
+    prompt_budget: Optional[int] = None,
+    benchmark: bool = False,
+    draft: Optional[str] = None,
+    num_pred_tokens: Optional[int] = None,
+    **overrides
+):
+    """
+    Load a local LLM with settings tuned to the machine.
+
+    Args:
+        model_name: Name (or GGUF file name / path) of a model in LLM/models.yaml. Default model if None
+        backend: Backend to load it with, defaults to the model's backend in models.yaml
+        prompt_budget: Max prompt tokens used to size n_ctx, defaults to the production retriever worst case
+        benchmark: Run a short self-benchmark after loading and record it with the settings
+        draft: Speculative decoding (llama.cpp only): name of a smaller model of models.yaml sharing the
+            tokenizer, or "prompt_lookup". None disables it
+        num_pred_tokens: Tokens drafted per step (defaults: 4 for a draft model, 10 for prompt lookup)
+        **overrides: Any LlamaCpp parameter, replaces the tuned/default value (and the CPU budget's
+            thread counts when scheduling.cpu_budget is enabled)
+
+    Returns:
+        LangChain LLM
+    """
+    model = resolve_model(model_name)
+    backend = backend or model.get("backend", "llamacpp")
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend: {backend}. Available options: {', '.join(BACKENDS)}")
+
+    model_path = HERE / model["file"]
+    max_tokens = overrides.get("max_tokens", 2048)
+    prompt_budget = prompt_budget if prompt_budget is not None else estimate_prompt_budget()
+
+    params = {
+        "temperature": 0.5,
+        "top_k": 20,
+        "top_p": 0.8,
+        "max_tokens": max_tokens,
+        "repeat_penalty": 1.5,
+        "verbose": False, #Timings are collected by monitoring.tracing instead of llama.cpp stderr logs
+        "streaming": True, #Token callbacks split prompt evaluation from generation in monitoring.tracing
+    }
+    params.update(tune_settings(model_path, prompt_budget, max_tokens, model.get("max_ctx")))
+
+    from scheduling.cpu_budget import get_cpu_budget, pinned
+    budget = get_cpu_budget()
+    if budget is not None:  # Thread counts of the process-wide CPU budget instead of the whole machine
+        params.update(budget.llm_kwargs())
+    params.update(overrides)
+
+    draft_model = None
+    if draft is not None:
+        if backend != "llamacpp":
+            raise ValueError("Speculative decoding is only available with the llamacpp backend")
+
+        from LLM.speculative import load_draft_model, prompt_lookup_draft
+
+        if draft == "prompt_lookup":
+            draft_model = prompt_lookup_draft(num_pred_tokens=num_pred_tokens or 10)
+        else:
+            draft_model = load_draft_model(
+                str(HERE / resolve_model(draft)["file"]),
+                n_ctx=params["n_ctx"],
+                n_threads=params["n_threads"],
+                num_pred_tokens=num_pred_tokens or 4,
+            )
+        params["model_kwargs"] = {**params.get("model_kwargs", {}), "draft_model": draft_model}
+
+    with pinned("llm"):
+        llm = BACKENDS[backend](model_path, dict(params))
+
+    if draft is not None and draft != "prompt_lookup":
+        from LLM.speculative import check_draft_vocabulary
+        check_draft_vocabulary(llm.client, draft_model)
+
+    record = {"model": model["name"], "backend": backend, "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+              "draft": draft, "settings": {k: v for k, v in params.items() if k != "model_kwargs"}}
+    if benchmark and backend == "llamacpp":
+        record["benchmark"] = self_benchmark(llm)
+
+    with open(SETTINGS_FILE, "w") as f:
+        json.dump(record, f, indent=2, default=str)
+
     return llm
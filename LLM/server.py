@@ -0,0 +1,388 @@
+"""
+Local model-serving workers.
+
+Keeps llama.cpp models resident in separate worker processes so that a UI reload or crash doesn't
+reload the weights, and several generations can run at once. Clients talk to the server over a
+Unix socket; requests are queued by priority and can be cancelled while queued or running.
+
+Weights are memory-mapped, so N workers on the same GGUF share its pages in the OS cache and only
+pay for their own KV cache.
+
+The socket is created owner-only and clients authenticate with LLM_SERVER_AUTHKEY, or the random key
+the server writes to `<socket>.key` (0600): messages are pickles, so connecting means running code.
+
+Start the server:
+    python -m LLM.server --model qwen2.5-0.5b-instruct --workers 2
+
+Use it as the chain LLM:
+    from LLM.server import RemoteLLM
+    chain = create_rag_chain(RemoteLLM(socket_path="/tmp/rag_llm.sock"))
+"""
+
+import argparse
+import heapq
+import json
+import itertools
+import multiprocessing as mp
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from multiprocessing.connection import Client, Listener
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.language_models.llms import LLM
+
+from LLM.llm import import_llm, logical_cores, physical_cores
+
+DEFAULT_SOCKET = "/tmp/rag_llm.sock"
+MIN_THREADS_PER_WORKER = 4
+
+
+def load_authkey(socket_path: str, create: bool = False) -> bytes:
+    """
+    Key authenticating clients (connections exchange pickles, so only trusted local users may connect).
+
+    LLM_SERVER_AUTHKEY if set, otherwise a random key in `<socket_path>.key` readable by its owner only,
+    written by the server (create=True) and read by the clients.
+    """
+    if os.getenv("LLM_SERVER_AUTHKEY"):
+        return os.getenv("LLM_SERVER_AUTHKEY").encode()
+
+    key_path = f"{socket_path}.key"
+    if create:
+        if os.path.exists(key_path):
+            os.remove(key_path)
+        fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "wb") as f:
+            f.write(os.urandom(32).hex().encode())
+
+    try:
+        with open(key_path, "rb") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        raise ValueError(f"No key at {key_path}: start the server first or set LLM_SERVER_AUTHKEY") from None
+
+
+def default_workers() -> int:
+    """
+    As many workers as the physical cores allow with at least MIN_THREADS_PER_WORKER threads each.
+    """
+    return max(1, physical_cores() // MIN_THREADS_PER_WORKER)
+
+
+def _worker_main(model_name: Optional[str], llm_kwargs: Dict, conn, cancel_event):
+    """
+    Worker process: load the model once, then generate for every task received on `conn`.
+    """
+    llm = import_llm(model_name, **llm_kwargs)
+    grammars = {}  # JSON schema -> compiled LlamaGrammar, compiled once per worker
+    defaults = dict(llm._default_params)
+    defaults["stop"] = defaults.pop("stop_sequences", None) or []
+    conn.send({"ready": True})
+
+    while True:
+        task = conn.recv()
+        if task is None:
+            break
+
+        params = {**defaults, **task["params"]}
+        schema = params.pop("json_schema", None)
+        if schema is not None:
+            key = json.dumps(schema, sort_keys=True)
+            if key not in grammars:
+                from llama_cpp import LlamaGrammar
+                grammars[key] = LlamaGrammar.from_json_schema(key, verbose=False)
+            params["grammar"] = grammars[key]
+        text = []
+        status = "done"
+
+        try:
+            for chunk in llm.client.create_completion(prompt=task["prompt"], stream=True, **params):
+                if cancel_event.is_set():
+                    status = "cancelled"
+                    break
+                text.append(chunk["choices"][0]["text"])
+            conn.send({"id": task["id"], "status": status, "text": "".join(text)})
+        except Exception as e:
+            conn.send({"id": task["id"], "status": "error", "error": repr(e)})
+
+
+class LLMServer:
+    """
+    Priority queue + pool of worker processes behind a Unix socket listener.
+
+    Messages (dicts) accepted from clients:
+        {"op": "generate", "id": str, "prompt": str, "priority": int, "params": dict}  (lower priority value first)
+        {"op": "cancel", "id": str}
+    Replies: {"id": str, "status": "done" | "cancelled" | "error", "text": str}
+
+    Args:
+        socket_path: Path of the Unix socket
+        model_name: Model from LLM/models.yaml loaded by every worker
+        n_workers: Number of worker processes (default: physical cores // 4)
+        **llm_kwargs: Passed to import_llm in the workers (n_threads and n_threads_batch default to an equal
+            share of the physical and logical cores)
+    """
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET, model_name: Optional[str] = None, n_workers: Optional[int] = None, **llm_kwargs):
+        self.socket_path = socket_path
+        self.n_workers = n_workers or default_workers()
+        llm_kwargs.setdefault("n_threads", max(1, physical_cores() // self.n_workers))
+        llm_kwargs.setdefault("n_threads_batch", max(1, logical_cores() // self.n_workers))
+
+        self.model_name = model_name
+        self.llm_kwargs = llm_kwargs
+        self._ctx = mp.get_context("spawn")  # Don't fork the server threads into the workers
+        self.workers = [{"task": None} for _ in range(self.n_workers)]
+        for worker in self.workers:
+            self._start_worker(worker)
+
+        for worker in self.workers:
+            worker["conn"].recv()  # Wait until every model is loaded
+
+        self._queue = []
+        self._counter = itertools.count()
+        self._cancelled = set()
+        self._clients = {}  # request id -> (connection, send lock)
+        self._idle = list(range(self.n_workers))
+        self._cond = threading.Condition()
+
+    def _start_worker(self, worker: dict):
+        """
+        Start a worker process (its model is loaded when it sends {"ready": True}).
+        """
+        parent_conn, child_conn = self._ctx.Pipe()
+        cancel_event = self._ctx.Event()
+        process = self._ctx.Process(target=_worker_main, args=(self.model_name, self.llm_kwargs, child_conn, cancel_event), daemon=True)
+        process.start()
+        child_conn.close()  # Only the worker holds it, so its death is seen as EOF
+        worker.update({"process": process, "conn": parent_conn, "cancel": cancel_event})
+
+    def _restart_worker(self, worker: dict):
+        """
+        Replace a dead worker process, retrying until its model is loaded.
+        """
+        while True:
+            worker["conn"].close()
+            worker["process"].join(timeout=1)
+            self._start_worker(worker)
+            try:
+                worker["conn"].recv()
+                return
+            except (EOFError, OSError):
+                time.sleep(1)  # Died while loading, don't spin
+
+    def serve_forever(self):
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+        for index in range(self.n_workers):
+            threading.Thread(target=self._collect_results, args=(index,), daemon=True).start()
+        threading.Thread(target=self._dispatch, daemon=True).start()
+
+        authkey = load_authkey(self.socket_path, create=True)
+        umask = os.umask(0o177)  # Socket created owner-only (0600)
+        try:
+            listener = Listener(self.socket_path, family="AF_UNIX", authkey=authkey)
+        finally:
+            os.umask(umask)
+
+        with listener:
+            print(f"LLM server ready on {self.socket_path} with {self.n_workers} worker(s)")
+            while True:
+                conn = listener.accept()
+                threading.Thread(target=self._handle_client, args=(conn,), daemon=True).start()
+
+    def _handle_client(self, conn):
+        send_lock = threading.Lock()
+        try:
+            while True:
+                message = conn.recv()
+
+                with self._cond:
+                    if message["op"] == "generate":
+                        self._clients[message["id"]] = (conn, send_lock)
+                        heapq.heappush(self._queue, (message.get("priority", 0), next(self._counter), message))
+                        self._cond.notify_all()
+
+                    elif message["op"] == "cancel":
+                        running = [w for w in self.workers if w["task"] == message["id"]]
+                        if running:
+                            running[0]["cancel"].set()
+                        elif message["id"] in self._clients:  # Still queued (finished or unknown ids are ignored)
+                            self._cancelled.add(message["id"])
+        except (EOFError, OSError):
+            conn.close()
+
+    def _dispatch(self):
+        while True:
+            with self._cond:
+                while not self._queue or not self._idle:
+                    self._cond.wait()
+
+                _, _, message = heapq.heappop(self._queue)
+                if message["id"] in self._cancelled:
+                    self._cancelled.discard(message["id"])
+                    self._reply({"id": message["id"], "status": "cancelled", "text": ""})
+                    continue
+
+                worker = self.workers[self._idle.pop()]
+                worker["cancel"].clear()  # Before the task is visible to cancels, so none of them is lost
+                worker["task"] = message["id"]
+
+            try:
+                worker["conn"].send({"id": message["id"], "prompt": message["prompt"], "params": message.get("params", {})})
+            except OSError:
+                pass  # Dead worker: its collector thread replies with an error and restarts it
+
+    def _collect_results(self, index: int):
+        worker = self.workers[index]
+        while True:
+            try:
+                result = worker["conn"].recv()
+            except (EOFError, OSError):  # Worker process died, fail its task and replace it
+                with self._cond:
+                    task, worker["task"] = worker["task"], None
+                    if index in self._idle:  # Died while idle, don't dispatch to it until restarted
+                        self._idle.remove(index)
+                if task is not None:
+                    self._reply({"id": task, "status": "error", "error": "LLM worker process died"})
+                self._restart_worker(worker)
+                with self._cond:
+                    self._idle.append(index)
+                    self._cond.notify_all()
+                continue
+
+            with self._cond:
+                worker["task"] = None
+                self._idle.append(index)
+                self._cond.notify_all()
+            self._reply(result)
+
+    def _reply(self, result: dict):
+        client = self._clients.pop(result["id"], None)
+        if client is None:
+            return
+        conn, send_lock = client
+        try:
+            with send_lock:
+                conn.send(result)
+        except OSError:
+            pass  # Client went away, nothing to do
+
+
+class LLMWorkerClient:
+    """
+    Connection to an LLMServer. Thread-safe: several requests can be in flight at once.
+    """
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET):
+        self.conn = Client(socket_path, family="AF_UNIX", authkey=load_authkey(socket_path))
+        self._pending: Dict[str, Future] = {}
+        self._send_lock = threading.Lock()
+        threading.Thread(target=self._read_replies, daemon=True).start()
+
+    def submit(self, prompt: str, priority: int = 0, **params) -> Tuple[str, Future]:
+        """
+        Queue a generation and return (request id, future of the generated text).
+        """
+        request_id = uuid.uuid4().hex
+        future = Future()
+        self._pending[request_id] = future
+        with self._send_lock:
+            self.conn.send({"op": "generate", "id": request_id, "prompt": prompt, "priority": priority, "params": params})
+        return request_id, future
+
+    def generate(self, prompt: str, priority: int = 0, timeout: Optional[float] = None, **params) -> str:
+        request_id, future = self.submit(prompt, priority=priority, **params)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            self.cancel(request_id)
+            raise
+
+    def cancel(self, request_id: str):
+        with self._send_lock:
+            self.conn.send({"op": "cancel", "id": request_id})
+
+    def _read_replies(self):
+        while True:
+            try:
+                reply = self.conn.recv()
+            except (EOFError, OSError):
+                for future in self._pending.values():
+                    future.set_exception(ConnectionError("LLM server connection closed"))
+                self._pending.clear()
+                return
+
+            future = self._pending.pop(reply["id"], None)
+            if future is None:
+                continue
+            if reply["status"] == "error":
+                future.set_exception(RuntimeError(reply["error"]))
+            elif reply["status"] == "cancelled":
+                future.cancel()
+            else:
+                future.set_result(reply["text"])
+
+
+_clients: Dict[str, LLMWorkerClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(socket_path: str = DEFAULT_SOCKET) -> LLMWorkerClient:
+    """
+    One shared connection per socket for the whole process.
+    """
+    with _clients_lock:
+        if socket_path not in _clients:
+            _clients[socket_path] = LLMWorkerClient(socket_path)
+        return _clients[socket_path]
+
+
+class RemoteLLM(LLM):
+    """
+    LangChain LLM backed by an LLMServer, usable as the `llm` of `create_rag_chain`.
+
+    Generation parameters (max_tokens, temperature, stop, ...) given at call time are passed to
+    llama.cpp; the workers' import_llm settings are used otherwise. A `json_schema` parameter is
+    compiled to a llama.cpp grammar in the worker (structured output of create_rag_chain).
+    """
+
+    accepts_json_schema: bool = True
+
+    socket_path: str = DEFAULT_SOCKET
+    priority: int = 0
+    timeout: Optional[float] = 300.0  # Seconds, so a lost reply can't block the caller forever
+
+    @property
+    def _llm_type(self) -> str:
+        return "llama_worker"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {"socket_path": self.socket_path, "priority": self.priority}
+
+    def _call(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> str:
+        if stop:
+            kwargs["stop"] = stop
+        return get_client(self.socket_path).generate(prompt, priority=self.priority, timeout=self.timeout, **kwargs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a local LLM from resident worker processes")
+    parser.add_argument("--model", default=None, help="Model name from LLM/models.yaml")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--socket", default=DEFAULT_SOCKET)
+    args = parser.parse_args()
+
+    LLMServer(socket_path=args.socket, model_name=args.model, n_workers=args.workers).serve_forever()
@@ -0,0 +1,67 @@
+"""
+Draft models for llama.cpp speculative decoding.
+
+The draft proposes a few tokens, the main model checks them all in one batched forward pass and
+keeps the longest prefix it agrees with, so several tokens can be accepted for the cost of one
+main-model step. Output is the same as without drafting (up to float differences between batched
+and single-token evaluation).
+"""
+
+import numpy as np
+from llama_cpp import Llama
+from llama_cpp.llama_speculative import LlamaDraftModel, LlamaPromptLookupDecoding
+
+
+class SmallModelDraft(LlamaDraftModel):
+    """
+    Draft tokens greedily with a smaller model sharing the main model's tokenizer
+    (e.g. Qwen2.5-0.5B drafting for Qwen3-1.7B).
+
+    The draft model keeps its own KV cache; `Llama.generate` reuses the longest common prefix
+    with the previous call, so only the tokens accepted since the last draft are evaluated.
+
+    Args:
+        llm: Loaded llama_cpp.Llama used to draft
+        num_pred_tokens: Number of tokens drafted per step
+    """
+
+    def __init__(self, llm: Llama, num_pred_tokens: int = 4):
+        self.llm = llm
+        self.num_pred_tokens = num_pred_tokens
+
+    def __call__(self, input_ids, /, **kwargs):
+        drafted = []
+        for token in self.llm.generate(input_ids.tolist(), top_k=1, temp=0.0):
+            if token == self.llm.token_eos():
+                break
+            drafted.append(token)
+            if len(drafted) >= self.num_pred_tokens:
+                break
+        return np.array(drafted, dtype=np.intc)
+
+
+def load_draft_model(model_path: str, n_ctx: int, n_threads: int, num_pred_tokens: int = 4) -> SmallModelDraft:
+    """
+    Load a GGUF model as draft.
+    """
+    llm = Llama(model_path=model_path, n_ctx=n_ctx, n_threads=n_threads, verbose=False)
+    return SmallModelDraft(llm, num_pred_tokens=num_pred_tokens)
+
+
+def check_draft_vocabulary(main: Llama, draft: SmallModelDraft):
+    """
+    Raise ValueError if the draft model doesn't share the main model's vocabulary.
+    """
+    if draft.llm.n_vocab() != main.n_vocab():
+        raise ValueError(
+            f"Draft model vocabulary ({draft.llm.n_vocab()}) differs from the main model ({main.n_vocab()}), "
+            "drafted token ids would be meaningless"
+        )
+
+
+def prompt_lookup_draft(num_pred_tokens: int = 10, max_ngram_size: int = 2) -> LlamaPromptLookupDecoding:
+    """
+    Draft by copying the continuation of the last n-gram found in the prompt. No extra model,
+    and well suited to RAG where answers quote the retrieved context.
+    """
+    return LlamaPromptLookupDecoding(num_pred_tokens=num_pred_tokens, max_ngram_size=max_ngram_size)
@@ -0,0 +1,84 @@
+"""
+Chunk representation memory benchmark.
+
+Builds the full corpus (data/metadatas) as LangChain Documents (transfo_list_into_Document) and as
+ChunkRecords (indexing.chunk_record) and reports, with tracemalloc:
+- total: memory allocated for the representation, chunk contents included,
+- overhead: total minus the chunk contents (what the representation itself costs),
+- overhead per chunk and build time.
+
+Every run parses data/metadatas again so both representations pay for their own strings.
+Documents are built from ChunkRecords and reuse their interned strings: the difference is the
+per-Document metadata dict and object.
+`--copies` builds the corpus several times, as when many search results stay referenced
+(retrieval cache, concurrent requests): ChunkRecords share their section tuples across copies.
+
+Example:
+    python benchmarks/chunk_memory.py --copies 1 10
+"""
+
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+
+from common import ROOT, print_table, save_results
+
+from indexing.upload import transfo_list_into_Document, transfo_list_into_records
+
+
+def measure(build, copies: int) -> dict:
+    """
+    Memory allocated by `copies` calls of build(chunks), each on a freshly parsed data/metadatas.
+    """
+    with open(ROOT / "data" / "metadatas", "r", encoding="utf-8") as f:
+        raw = f.read()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    kept, content_bytes, n_chunks = [], 0, 0
+    for _ in range(copies):
+        chunks = json.loads(raw)
+        content_bytes += sum(sys.getsizeof(chunk["content"]) for chunk in chunks)
+        n_chunks += len(chunks)
+        items, _ = build(chunks)
+        kept.append(items)
+        del chunks  # Only what the representation references stays allocated
+    elapsed = time.perf_counter() - start
+    total, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    overhead = total - content_bytes
+    return {
+        "chunks": n_chunks,
+        "total_mb": total / 1e6,
+        "overhead_mb": overhead / 1e6,
+        "bytes_per_chunk": overhead / n_chunks,
+        "build_ms": elapsed * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory of Documents vs ChunkRecords for the full corpus")
+    parser.add_argument("--copies", type=int, nargs="+", default=[1, 10])
+    parser.add_argument("--name", default="chunk_memory")
+    args = parser.parse_args()
+
+    rows = []
+    for copies in args.copies:
+        # Records first: the shared section table they fill is then counted in their allocations
+        records = measure(transfo_list_into_records, copies)
+        documents = measure(transfo_list_into_Document, copies)
+        for label, row in (("ChunkRecord", records), ("Document", documents)):
+            rows.append({"representation": label, "copies": copies, **row})
+        saved = documents["total_mb"] - records["total_mb"]
+        print(f"copies={copies}: ChunkRecords save {saved:.1f} MB ({saved / documents['total_mb']:.0%} of the Documents' memory)")
+
+    print_table(rows, ["representation", "copies", "chunks", "total_mb", "overhead_mb", "bytes_per_chunk", "build_ms"],
+                title="CHUNK REPRESENTATION MEMORY")
+    print(f"\nResults saved to {save_results({'rows': rows}, args.name)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Collection profile benchmark.
+
+Builds one temporary collection per profile of indexing.profiles (same dense vectors, embedded
+once), then compares on data/evaluation_set.yaml:
+- estimated memory: RAM / disk taken by the original vectors, the quantized vectors and the HNSW graph,
+- search latency p50/p90/p99 (query embeddings are precomputed, only the Qdrant call is timed),
+- recall@k against the evaluation set locations and overlap@k with an exact (brute force) search.
+
+Dense vectors only: quantization and HNSW settings don't apply to the sparse vectors.
+Quantization and HNSW are ignored by Qdrant's local mode, so this needs a Qdrant server
+(QDRANT_URL / QDRANT_API_KEY from .env, or --url, e.g. a local docker container).
+
+Example:
+    python benchmarks/collection_profiles.py --url http://localhost:6333 --profiles default scalar binary on_disk --k 10
+"""
+
+import argparse
+import json
+import time
+
+from common import ROOT, latency_summary, load_evaluation_set, print_table, save_results
+
+from qdrant_client import QdrantClient, models
+
+from embeddings.embedding import FastEmbedEmbeddings
+from indexing.collections_config import explore_collections_yaml
+from indexing.profiles import PROFILES, collection_kwargs, create_payload_indexes, dense_vector_params, resolve_profile, search_params
+from indexing.qdrant import get_qdrant_client
+from indexing.upload import transfo_list_into_Document
+
+
+def estimate_memory(n_points: int, dim: int, profile) -> dict:
+    """
+    Approximate storage of the dense vectors of a profile, in MB.
+    """
+    settings = resolve_profile(profile)
+    original = n_points * dim * 4
+    quantized = {"scalar": n_points * dim, "binary": n_points * dim / 8}.get(settings.get("quantization"), 0)
+    m = (settings.get("hnsw") or {}).get("m", 16)
+    graph = n_points * m * 2 * 4  # Level-0 links dominate: 2m neighbours of 4 bytes per point
+
+    ram = graph + (0 if settings.get("on_disk") else original) + (quantized if settings.get("always_ram") else 0)
+    disk = original + quantized + graph
+    return {"ram_mb": ram / 1e6, "disk_mb": disk / 1e6}
+
+
+def build_collection(client: QdrantClient, name: str, profile, vectors, docs, ids, batch_size: int = 128):
+    """
+    Create the collection of a profile and upload the precomputed vectors, then wait for its indexes.
+    """
+    if client.collection_exists(name):
+        client.delete_collection(name)
+
+    client.create_collection(
+        collection_name=name,
+        vectors_config={"": dense_vector_params(len(vectors[0]), profile)},
+        optimizers_config=models.OptimizersConfigDiff(indexing_threshold=1),  # Build the HNSW graph even for a small corpus
+        **collection_kwargs(profile),
+    )
+    create_payload_indexes(client, name, profile)
+
+    points = [
+        models.PointStruct(id=point_id, vector={"": vector}, payload={"page_content": doc.page_content, "metadata": doc.metadata})
+        for point_id, vector, doc in zip(ids, vectors, docs)
+    ]
+    for i in range(0, len(points), batch_size):
+        client.upsert(collection_name=name, points=points[i:i + batch_size], wait=True)
+
+    while client.get_collection(name).status != models.CollectionStatus.GREEN:
+        time.sleep(1)
+
+
+def search(client: QdrantClient, name: str, query_vector, k: int, params=None, query_filter=None):
+    start = time.perf_counter()
+    points = client.query_points(collection_name=name, query=query_vector, using="", limit=k,
+                                 search_params=params, query_filter=query_filter, with_payload=False).points
+    return [str(point.id) for point in points], (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory / latency / recall of Qdrant collection profiles")
+    parser.add_argument("--url", default=None, help="Qdrant URL (default: QDRANT_URL from .env)")
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES))
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs of the evaluation set per profile")
+    parser.add_argument("--filter-main", action="store_true", help="Filter on metadata.type == main, as production does")
+    parser.add_argument("--keep", action="store_true", help="Keep the benchmark collections")
+    parser.add_argument("--name", default="collection_profiles")
+    args = parser.parse_args()
+
+    client = get_qdrant_client(url=args.url)
+    config = next(col for col in explore_collections_yaml() if col["name"] == "RAG")
+    model = FastEmbedEmbeddings(model_name=config["dense"]["name"])
+
+    with open(ROOT / "data" / "metadatas", "r", encoding="utf-8") as f:
+        docs, ids = transfo_list_into_Document(json.load(f), use_prefix=True)
+    items = load_evaluation_set()
+
+    print(f"Embedding {len(docs)} chunks and {len(items)} questions once...")
+    vectors = model.embed_documents([doc.page_content for doc in docs])
+    queries = [model.embed_query(f"query: {item['question']}") for item in items]
+
+    query_filter = None
+    if args.filter_main:
+        query_filter = models.Filter(must=[models.FieldCondition(key="metadata.type", match=models.MatchValue(value="main"))])
+
+    table = []
+    results = {}
+    exact = None
+    for profile in args.profiles:
+        name = f"bench_profile_{profile}"
+        print(f"Building {name}...")
+        build_collection(client, name, profile, vectors, docs, ids)
+
+        if exact is None:  # Reference top-k: brute force on the original vectors
+            exact = [search(client, name, q, args.k, models.SearchParams(exact=True), query_filter)[0] for q in queries]
+
+        params = search_params(profile)
+        latencies = []
+        recall = overlap = 0.0
+        for _ in range(args.repeat):
+            for item, query, reference in zip(items, queries, exact):
+                found, ms = search(client, name, query, args.k, params, query_filter)
+                latencies.append(ms)
+                recall += item["location"] in found
+                overlap += len(set(found) & set(reference)) / max(len(reference), 1)
+
+        runs = args.repeat * len(items)
+        row = {
+            "profile": profile,
+            **estimate_memory(len(vectors), len(vectors[0]), profile),
+            **{key: value for key, value in latency_summary(latencies).items() if key in ("p50", "p90", "p99")},
+            f"recall@{args.k}": recall / runs,
+            f"overlap@{args.k}": overlap / runs,
+        }
+        table.append(row)
+        results[profile] = {"settings": resolve_profile(profile), **row}
+
+        if not args.keep:
+            client.delete_collection(name)
+
+    print_table(table, ["profile", "ram_mb", "disk_mb", "p50", "p90", "p99", f"recall@{args.k}", f"overlap@{args.k}"],
+                title=f"COLLECTION PROFILES ({len(vectors)} chunks, {len(items)} questions x {args.repeat})")
+    print(f"\nResults saved to {save_results(results, args.name)}")
+
+
+if __name__ == "__main__":
+    main()
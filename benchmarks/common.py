@@ -0,0 +1,117 @@
+"""
+Shared helpers for the benchmark scripts: evaluation set loading, latency percentiles,
+JSON baselines and regression checks.
+"""
+
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import yaml
+
+ROOT = Path(__file__).resolve().parent.parent
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+
+# Benchmarks are run as scripts (python benchmarks/xxx.py), make the project modules importable
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+
+def load_evaluation_set(path: Optional[str] = None) -> List[Dict]:
+    """
+    Load the evaluation questions (question / answer / location) from data/evaluation_set.yaml.
+    """
+    path = Path(path) if path else ROOT / "data" / "evaluation_set.yaml"
+    with open(path, "r") as f:
+        return yaml.safe_load(f)
+
+
+def latency_summary(values_ms: List[float]) -> Dict[str, float]:
+    """
+    Summarize latencies (in ms) with count, mean and p50/p90/p99/max.
+    """
+    if not values_ms:
+        return {"count": 0, "mean": 0.0, "p50": 0.0, "p90": 0.0, "p99": 0.0, "max": 0.0}
+
+    values = np.asarray(values_ms, dtype=float)
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {
+        "count": int(values.size),
+        "mean": float(values.mean()),
+        "p50": float(p50),
+        "p90": float(p90),
+        "p99": float(p99),
+        "max": float(values.max()),
+    }
+
+
+def save_results(results: Dict, name: str, path: Optional[str] = None) -> Path:
+    """
+    Save benchmark results as JSON, by default to benchmarks/baselines/<name>.json.
+    """
+    path = Path(path) if path else BASELINE_DIR / f"{name}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+    return path
+
+
+def load_results(name: str, path: Optional[str] = None) -> Optional[Dict]:
+    """
+    Load saved benchmark results, None if there is no baseline yet.
+    """
+    path = Path(path) if path else BASELINE_DIR / f"{name}.json"
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def find_regressions(
+    current: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    max_regression: float = 0.2,
+    metric: str = "p90",
+    min_delta_ms: float = 1.0
+) -> List[str]:
+    """
+    Compare per-stage latency summaries against a baseline.
+
+    A stage regresses when its `metric` grew by more than `max_regression` (relative) and by more
+    than `min_delta_ms` (absolute, so sub-millisecond stages don't fail on noise).
+
+    Returns:
+        One readable line per regressed stage (empty list if none)
+    """
+    regressions = []
+    for stage, summary in current.items():
+        if stage not in baseline:
+            continue
+        before = baseline[stage][metric]
+        after = summary[metric]
+        if after - before > min_delta_ms and after > before * (1 + max_regression):
+            regressions.append(f"{stage}: {metric} {before:.2f}ms -> {after:.2f}ms (+{(after / before - 1) * 100 if before else float('inf'):.0f}%)")
+    return regressions
+
+
+def print_table(rows: List[Dict], columns: List[str], title: str = ""):
+    """
+    Print a list of dicts as a fixed-width table.
+    """
+    if title:
+        print("\n" + "=" * 80)
+        print(title)
+        print("=" * 80)
+
+    def fmt(value):
+        if isinstance(value, float):
+            return f"{value:.2f}"
+        return str(value)
+
+    widths = {c: max(len(c), *(len(fmt(r.get(c, ""))) for r in rows)) if rows else len(c) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    print("  ".join("-" * widths[c] for c in columns))
+    for row in rows:
+        print("  ".join(fmt(row.get(c, "")).ljust(widths[c]) for c in columns))
@@ -0,0 +1,138 @@
+"""
+CPU budget benchmark.
+
+Runs the CPU-heavy stages of a request (dense query embedding, FlashRank reranking of k chunks,
+llama.cpp generation on the top chunks) for concurrent users, with:
+- "none": every component sized for the whole machine (the default), the LLM behind a plain lock
+  (one llama.cpp model can't run two generations at once),
+- "interleave" / "serialize": the plans of scheduling.cpu_budget, the models reloaded under the budget,
+and reports p50/p90/p99 request latency, per-stage p99 and throughput for each concurrency level.
+
+Runs offline: chunks are sampled from data/metadatas instead of searched, so only CPU contention is
+measured.
+
+Example:
+    python benchmarks/cpu_budget.py --concurrency 1 2 4 8 --plans none interleave serialize --pin
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from common import ROOT, latency_summary, load_evaluation_set, print_table, save_results
+
+from langchain_core.documents import Document
+
+from LLM.llm import import_llm
+from retriever.final_retriever import retrieve_FlashrankReranker
+from retriever.retrievers import get_collection_config, load_dense_model
+from scheduling.cpu_budget import disable_cpu_budget, enable_cpu_budget, get_cpu_budget, stage
+
+STAGES = ["embed", "rerank", "llm"]
+
+
+def load_components(plan: str, args):
+    """
+    (dense model, reranker, llm, llm slot factory) loaded under the plan's budget ("none" for no budget).
+    """
+    disable_cpu_budget()
+    if plan != "none":
+        enable_cpu_budget(plan, llm_share=args.llm_share, pin=args.pin)
+
+    load_dense_model.cache_clear()  # Thread counts are fixed when the model is loaded
+    dense = get_collection_config("RAG")["dense"]
+    model = load_dense_model(dense["name"], dense.get("variant", "fp32"))
+    reranker = retrieve_FlashrankReranker(None, model_name=args.rerank_model, top_n=args.top_n, threshold=0)
+    llm = import_llm(args.model, temperature=0.0, max_tokens=args.max_tokens)
+    lock = threading.Lock()
+    llm_slot = (lambda: lock) if plan == "none" else (lambda: stage("llm"))
+    return model, reranker, llm, llm_slot
+
+
+def run_request(components, question: str, docs, max_tokens: int) -> dict:
+    model, reranker, llm, llm_slot = components
+    timings = {}
+
+    start = time.perf_counter()
+    model.embed_query(question)
+    timings["embed"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    top = reranker.rerank(question, docs)
+    timings["rerank"] = (time.perf_counter() - start) * 1000
+
+    context = "\n\n".join(doc.page_content for doc in top)
+    start = time.perf_counter()
+    with llm_slot():
+        llm.invoke(f"Context:\n{context}\n\nQuestion: {question}\nAnswer:", max_tokens=max_tokens)
+    timings["llm"] = (time.perf_counter() - start) * 1000
+
+    timings["total"] = sum(timings[name] for name in STAGES)
+    return timings
+
+
+def run_level(components, workload, concurrency: int, max_tokens: int) -> dict:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        timings = list(executor.map(lambda item: run_request(components, *item, max_tokens), workload))
+    wall_time = time.perf_counter() - start
+
+    total = latency_summary([t["total"] for t in timings])
+    return {
+        "p50": total["p50"],
+        "p90": total["p90"],
+        "p99": total["p99"],
+        **{f"{name}_p99": latency_summary([t[name] for t in timings])["p99"] for name in STAGES},
+        "throughput_qps": len(workload) / wall_time,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Request latency under concurrency with and without a CPU budget")
+    parser.add_argument("--model", default="qwen2.5-0.5b-instruct", help="Model name from LLM/models.yaml or path to a GGUF file")
+    parser.add_argument("--rerank-model", default="ms-marco-TinyBERT-L-2-v2")
+    parser.add_argument("--plans", nargs="+", default=["none", "interleave", "serialize"], choices=["none", "interleave", "serialize"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--k", type=int, default=20, help="Chunks reranked per request")
+    parser.add_argument("--top-n", type=int, default=3, help="Reranked chunks given to the LLM")
+    parser.add_argument("--max-tokens", type=int, default=32, help="Generated tokens per request")
+    parser.add_argument("--requests", type=int, default=32, help="Requests per concurrency level")
+    parser.add_argument("--llm-share", type=float, default=0.5, help="Share of the cores given to the LLM by the interleave plan")
+    parser.add_argument("--pin", action="store_true", help="Pin each stage to its cores (Linux)")
+    parser.add_argument("--name", default="cpu_budget")
+    args = parser.parse_args()
+
+    with open(ROOT / "data" / "metadatas", "r", encoding="utf-8") as f:
+        contents = [chunk["content"] for chunk in json.load(f)]
+    questions = [f"query: {item['question']}" for item in load_evaluation_set()]
+    rng = random.Random(0)
+    workload = [(questions[i % len(questions)], [Document(page_content=c) for c in rng.sample(contents, args.k)])
+                for i in range(args.requests)]
+
+    rows, results = [], {"model": Path(args.model).name, "plans": {}}
+    for plan in args.plans:
+        components = load_components(plan, args)
+        run_request(components, *workload[0], args.max_tokens)  # Warm up
+        budget = get_cpu_budget()
+        results["plans"][plan] = {"budget": budget.describe() if budget else None, "levels": {}}
+
+        for concurrency in args.concurrency:
+            print(f"Running {plan} with {concurrency} concurrent users...")
+            level = run_level(components, workload, concurrency, args.max_tokens)
+            results["plans"][plan]["levels"][str(concurrency)] = level
+            rows.append({"plan": plan, "concurrency": concurrency, **level})
+
+        del components  # Free the weights before loading the next plan
+    disable_cpu_budget()
+
+    print_table(rows, ["plan", "concurrency", "p50", "p90", "p99", "embed_p99", "rerank_p99", "llm_p99", "throughput_qps"],
+                title=f"CPU BUDGET ({Path(args.model).name}, {args.requests} requests per level)")
+    print(f"\nResults saved to {save_results(results, args.name)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Embedding model benchmark.
+
+Embeds the corpus (data/metadatas) and the evaluation questions with each candidate dense model /
+variant and reports side by side:
+- docs/s when embedding the corpus,
+- query latency p50/p90 (one question at a time, as in production),
+- RAM: resident memory added by loading the model and embedding (each candidate runs in its own
+  process so they don't share memory),
+- recall@k of the evaluation set with a brute-force cosine search over the corpus embeddings.
+
+Candidates are "model_name" or "model_name:variant" (variant fp32 or int8, see
+embeddings.embedding.FastEmbedEmbeddings).
+
+Example:
+    python benchmarks/embedding_models.py --candidate snowflake/snowflake-arctic-embed-m \
+        --candidate snowflake/snowflake-arctic-embed-m:int8 --candidate BAAI/bge-small-en-v1.5 --threads 4
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import time
+
+from common import ROOT, latency_summary, load_evaluation_set, print_table, save_results
+
+import numpy as np
+
+try:
+    import psutil
+except ImportError:  # RAM is then reported as 0
+    psutil = None
+
+
+def rss_mb() -> float:
+    return psutil.Process(os.getpid()).memory_info().rss / 1e6 if psutil is not None else 0.0
+
+
+def benchmark_candidate(candidate: str, threads, doc_prefix: str, query_prefix: str, k: int) -> dict:
+    """
+    Run in a fresh process: load the model, embed corpus and questions, compute recall@k.
+    """
+    import sys
+    sys.path.insert(0, str(ROOT))
+    from embeddings.embedding import FastEmbedEmbeddings
+
+    model_name, _, variant = candidate.partition(":")
+    with open(ROOT / "data" / "metadatas", "r", encoding="utf-8") as f:
+        chunks = json.load(f)
+    items = load_evaluation_set()
+
+    ram_before = rss_mb()
+    start = time.perf_counter()
+    model = FastEmbedEmbeddings(model_name=model_name, variant=variant or "fp32", threads=threads)
+    load_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    doc_vectors = np.asarray(model.embed_documents([doc_prefix + chunk["content"] for chunk in chunks]), dtype=np.float32)
+    docs_per_s = len(chunks) / (time.perf_counter() - start)
+
+    query_vectors, latencies = [], []
+    for item in items:
+        start = time.perf_counter()
+        query_vectors.append(model.embed_query(query_prefix + item["question"]))
+        latencies.append((time.perf_counter() - start) * 1000)
+    ram = rss_mb() - ram_before
+
+    # Brute-force cosine: normalized dot products, top k per question
+    doc_vectors /= np.linalg.norm(doc_vectors, axis=1, keepdims=True)
+    query_vectors = np.asarray(query_vectors, dtype=np.float32)
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True)
+    top = np.argsort(-(query_vectors @ doc_vectors.T), axis=1)[:, :k]
+    ids = [chunk["qdrant_id"] for chunk in chunks]
+    recall = float(np.mean([item["location"] in {ids[i] for i in row} for item, row in zip(items, top)]))
+
+    summary = latency_summary(latencies)
+    return {
+        "candidate": candidate,
+        "dim": int(doc_vectors.shape[1]),
+        "load_s": load_s,
+        "docs_per_s": docs_per_s,
+        "query_p50_ms": summary["p50"],
+        "query_p90_ms": summary["p90"],
+        "ram_mb": ram,
+        f"recall@{k}": recall,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dense embedding models / variants: throughput, latency, RAM and recall")
+    parser.add_argument("--candidate", action="append", default=None, help="model_name[:variant], repeatable")
+    parser.add_argument("--threads", type=int, default=None, help="ONNX Runtime intra-op threads")
+    parser.add_argument("--doc-prefix", default="passage: ")
+    parser.add_argument("--query-prefix", default="query: ")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--name", default="embedding_models")
+    args = parser.parse_args()
+
+    candidates = args.candidate or ["snowflake/snowflake-arctic-embed-m", "snowflake/snowflake-arctic-embed-m:int8"]
+    ctx = mp.get_context("spawn")
+
+    rows = []
+    for candidate in candidates:
+        print(f"Benchmarking {candidate}...")
+        with ctx.Pool(1) as pool:
+            rows.append(pool.apply(benchmark_candidate, (candidate, args.threads, args.doc_prefix, args.query_prefix, args.k)))
+
+    print_table(rows, ["candidate", "dim", "load_s", "docs_per_s", "query_p50_ms", "query_p90_ms", "ram_mb", f"recall@{args.k}"],
+                title=f"EMBEDDING MODELS (threads={args.threads or 'default'})")
+    print(f"\nResults saved to {save_results({'threads': args.threads, 'rows': rows}, args.name)}")
+
+
+if __name__ == "__main__":
+    main()
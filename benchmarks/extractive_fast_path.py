@@ -0,0 +1,92 @@
+"""
+Extractive fast path benchmark.
+
+Runs the RAG chain on the evaluation set with and without the extractive fast path
+(rag.extractive) and reports how many questions skip generation, the latency saved on them, and
+whether the cited chunk is the expected one (the `location` of the evaluation set).
+
+Example:
+    python benchmarks/extractive_fast_path.py --model qwen2.5-0.5b-instruct --min-score 0.9 --min-margin 0.3
+"""
+
+import argparse
+import time
+from statistics import mean
+
+from common import latency_summary, load_evaluation_set, print_table, save_results
+
+from LLM.llm import import_llm
+from rag.chain import create_rag_chain
+from rag.extractive import ExtractiveAnswerer
+from rag.utils import map_citations, parse_structured_answer
+from retriever.final_retriever import production_retriever
+
+
+def run(chain, questions):
+    rows = []
+    for question in questions:
+        start = time.perf_counter()
+        result = chain.invoke(f"query: {question}")
+        rows.append({"ms": (time.perf_counter() - start) * 1000, "result": result})
+    return rows
+
+
+def cited_ids(result):
+    """
+    IDs (`_id`, the qdrant_id of data/metadatas) of the chunks cited by an extractive answer ("... [Source i]").
+    """
+    _, citations = parse_structured_answer(result["answer"])
+    return [str(doc.metadata.get("_id")) for doc in map_citations(citations, result["retrieved_documents"])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extractive fast path benchmark (share of questions answered without the LLM)")
+    parser.add_argument("--model", default="qwen2.5-0.5b-instruct", help="Model name from LLM/models.yaml")
+    parser.add_argument("--min-score", type=float, default=0.9)
+    parser.add_argument("--min-margin", type=float, default=0.3)
+    parser.add_argument("--limit", type=int, default=None, help="Only use the first N questions")
+    parser.add_argument("--name", default="extractive_fast_path")
+    args = parser.parse_args()
+
+    items = load_evaluation_set()[:args.limit]
+    questions = [item["question"] for item in items]
+
+    llm = import_llm(args.model, temperature=0.0)
+    retriever = production_retriever()
+    answerer = ExtractiveAnswerer(min_score=args.min_score, min_margin=args.min_margin)
+
+    print(f"Running {len(questions)} questions without the fast path...")
+    baseline = run(create_rag_chain(llm, retriever=retriever), questions)
+    print(f"Running {len(questions)} questions with the fast path...")
+    fast = run(create_rag_chain(llm, retriever=retriever, extractive_fast_path=answerer), questions)
+
+    taken = [i for i, row in enumerate(fast) if row["result"]["fast_path"]]
+    correct = [i for i in taken if items[i]["location"] in cited_ids(fast[i]["result"])]
+
+    table = [
+        {"setting": "no fast path", **latency_summary([row["ms"] for row in baseline])},
+        {"setting": "fast path", **latency_summary([row["ms"] for row in fast])},
+    ]
+    print_table(table, ["setting", "mean", "p50", "p90", "p99", "max"], title=f"EXTRACTIVE FAST PATH ({len(questions)} questions)")
+
+    saved = [baseline[i]["ms"] - fast[i]["ms"] for i in taken]
+    print(f"\nFast path taken: {len(taken)}/{len(questions)} questions ({len(taken) / len(questions) * 100:.0f}%)")
+    if taken:
+        print(f"Expected chunk cited: {len(correct)}/{len(taken)}")
+        print(f"Latency saved on these questions: {mean(saved):.0f} ms mean, {sum(saved):.0f} ms total")
+
+    results = {
+        "model": args.model,
+        "min_score": args.min_score,
+        "min_margin": args.min_margin,
+        "fast_path_questions": [questions[i] for i in taken],
+        "correct": len(correct),
+        "saved_ms": saved,
+        "baseline_ms": [row["ms"] for row in baseline],
+        "fast_path_ms": [row["ms"] for row in fast],
+    }
+    print(f"\nResults saved to {save_results(results, args.name)}")
+
+
+if __name__ == "__main__":
+    main()
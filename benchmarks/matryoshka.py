@@ -0,0 +1,133 @@
+"""
+Matryoshka (truncated vector) benchmark.
+
+Embeds the corpus once with the dense model of collections.yaml and stores, next to the full
+vector, one truncated renormalized copy per tested size. Then compares on data/evaluation_set.yaml:
+- full: search on the full vectors (reference),
+- short: search on the truncated vectors only,
+- two-stage: truncated vectors for `--factor * k` candidates, rescored with the full vectors
+  (what retriever.matryoshka.TwoStageRetriever does),
+reporting the memory of the vectors scanned by the first stage, latency p50/p90 and recall@k
+(against the evaluation set locations, and overlap with the full search).
+
+Runs against a local on-disk Qdrant by default (brute force, so latency follows the dimension),
+or a server with --url.
+
+snowflake-arctic-embed-m (v1) was not trained for truncation, expect larger recall losses than
+with Matryoshka-trained models such as snowflake-arctic-embed-m-v1.5.
+
+Example:
+    python benchmarks/matryoshka.py --dims 128 256 384 --k 10 --factor 4
+"""
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+from common import ROOT, latency_summary, load_evaluation_set, print_table, save_results
+
+from qdrant_client import QdrantClient, models
+
+from embeddings.embedding import FastEmbedEmbeddings
+from indexing.collections_config import explore_collections_yaml
+from indexing.matryoshka import truncate_vector
+from indexing.qdrant import get_qdrant_client
+from indexing.upload import transfo_list_into_Document
+
+LOCAL_PATH = Path(__file__).resolve().parent / ".qdrant_matryoshka"
+COLLECTION = "matryoshka_bench"
+
+
+def build_collection(client: QdrantClient, vectors, ids, dims, batch_size: int = 128):
+    """
+    One point per chunk with the full vector ("") and a truncated copy per size ("dense_<dim>").
+    """
+    if client.collection_exists(COLLECTION):
+        client.delete_collection(COLLECTION)
+
+    vectors_config = {"": models.VectorParams(size=len(vectors[0]), distance=models.Distance.COSINE)}
+    for dim in dims:
+        vectors_config[f"dense_{dim}"] = models.VectorParams(size=dim, distance=models.Distance.COSINE)
+    client.create_collection(collection_name=COLLECTION, vectors_config=vectors_config)
+
+    points = [
+        models.PointStruct(id=point_id, vector={"": vector, **{f"dense_{dim}": truncate_vector(vector, dim) for dim in dims}})
+        for point_id, vector in zip(ids, vectors)
+    ]
+    for i in range(0, len(points), batch_size):
+        client.upsert(collection_name=COLLECTION, points=points[i:i + batch_size], wait=True)
+
+
+def run(client: QdrantClient, queries, k: int, dim=None, candidates=None):
+    """
+    Search every query: full vectors if dim is None, short vectors only if candidates is None, two-stage otherwise.
+    """
+    results, latencies = [], []
+    for query in queries:
+        if dim is None:
+            request = {"query": query, "using": ""}
+        elif candidates is None:
+            request = {"query": truncate_vector(query, dim), "using": f"dense_{dim}"}
+        else:
+            request = {
+                "prefetch": models.Prefetch(query=truncate_vector(query, dim), using=f"dense_{dim}", limit=candidates),
+                "query": query,
+                "using": "",
+            }
+
+        start = time.perf_counter()
+        points = client.query_points(collection_name=COLLECTION, limit=k, with_payload=False, **request).points
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([str(point.id) for point in points])
+    return results, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory / latency / recall of truncated dense vectors")
+    parser.add_argument("--dims", type=int, nargs="+", default=[128, 256, 384])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--factor", type=int, default=4, help="Two-stage candidate pool = factor * k")
+    parser.add_argument("--url", default=None, help="Qdrant server URL (default: local on-disk index)")
+    parser.add_argument("--name", default="matryoshka")
+    args = parser.parse_args()
+
+    client = get_qdrant_client(url=args.url) if args.url else QdrantClient(path=str(LOCAL_PATH))
+    config = next(col for col in explore_collections_yaml() if col["name"] == "RAG")
+    model = FastEmbedEmbeddings(model_name=config["dense"]["name"])
+
+    with open(ROOT / "data" / "metadatas", "r", encoding="utf-8") as f:
+        docs, ids = transfo_list_into_Document(json.load(f), use_prefix=True)
+    items = load_evaluation_set()
+
+    print(f"Embedding {len(docs)} chunks and {len(items)} questions...")
+    vectors = model.embed_documents([doc.page_content for doc in docs])
+    queries = [model.embed_query(f"query: {item['question']}") for item in items]
+    build_collection(client, vectors, ids, args.dims)
+
+    full_dim = len(vectors[0])
+    reference, latencies = run(client, queries, args.k)
+    settings = [("full", full_dim, reference, latencies)]
+    for dim in args.dims:
+        settings.append((f"short {dim}", dim, *run(client, queries, args.k, dim)))
+        settings.append((f"two-stage {dim}", dim, *run(client, queries, args.k, dim, args.factor * args.k)))
+
+    table = []
+    for label, dim, found, latencies in settings:
+        summary = latency_summary(latencies)
+        table.append({
+            "setting": label,
+            "first_stage_mb": len(vectors) * dim * 4 / 1e6,
+            "p50": summary["p50"],
+            "p90": summary["p90"],
+            f"recall@{args.k}": sum(item["location"] in ids_ for item, ids_ in zip(items, found)) / len(items),
+            f"overlap@{args.k}": sum(len(set(a) & set(b)) / args.k for a, b in zip(found, reference)) / len(items),
+        })
+
+    print_table(table, ["setting", "first_stage_mb", "p50", "p90", f"recall@{args.k}", f"overlap@{args.k}"],
+                title=f"MATRYOSHKA ({config['dense']['name']}, {len(vectors)} chunks, {len(items)} questions)")
+    print(f"\nResults saved to {save_results({'model': config['dense']['name'], 'rows': table}, args.name)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+End-to-end RAG benchmark.
+
+Runs `create_rag_chain` over data/evaluation_set.yaml for one or several llama.cpp settings and
+records, per question: retrieval time, prompt tokens, prompt-eval tokens/s, generated tokens/s,
+time-to-first-token and total latency. Prints a comparison table across settings.
+`--compress both` also runs each setting with the query-relevance context compression of
+rag.compression, to compare prompt tokens and latency with and without it.
+
+Each setting is a comma-separated list of LlamaCpp parameters overriding the auto-tuned ones, e.g.:
+    python benchmarks/rag_end_to_end.py --model qwen2.5-0.5b-instruct \
+        --setting n_threads=4,n_ctx=4096,n_batch=512 --setting n_threads=8,n_ctx=4096,n_batch=1024 --limit 10
+"""
+
+import argparse
+import time
+from pathlib import Path
+from statistics import mean, median
+from typing import Dict, List
+
+from common import load_evaluation_set, print_table, save_results
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from LLM.llm import import_llm
+
+from rag.chain import create_rag_chain
+from retriever.final_retriever import production_retriever
+
+
+class GenerationTimer(BaseCallbackHandler):
+    """
+    Callback recording prompt, first token and end timestamps of every LLM call (needs streaming=True).
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.prompt = None
+        self.start = None
+        self.first_token = None
+        self.end = None
+        self.generated_tokens = 0
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.prompt = prompts[0]
+        self.start = time.perf_counter()
+
+    def on_llm_new_token(self, token: str, **kwargs):
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+        self.generated_tokens += 1
+
+    def on_llm_end(self, response, **kwargs):
+        self.end = time.perf_counter()
+
+
+class TimedRetriever:
+    """
+    Wrap a retriever to record the duration of its last call.
+    """
+
+    def __init__(self, retriever):
+        self.retriever = retriever
+        self.last_ms = 0.0
+
+    def invoke(self, query):
+        start = time.perf_counter()
+        docs = self.retriever.invoke(query)
+        self.last_ms = (time.perf_counter() - start) * 1000
+        return docs
+
+
+def parse_setting(setting: str) -> Dict[str, int]:
+    """
+    Parse "n_threads=4,n_ctx=4096" into {"n_threads": 4, "n_ctx": 4096}.
+    """
+    params = {}
+    for part in setting.split(","):
+        if part.strip():
+            key, value = part.split("=")
+            params[key.strip()] = int(value)
+    return params
+
+
+def load_llm(model: str, params: Dict[str, int], max_tokens: int):
+    """
+    Load through import_llm, the setting only overrides the auto-tuned parameters it names.
+    """
+    return import_llm(
+        model,
+        temperature=0.0,  # Deterministic output so settings are compared on the same generations
+        max_tokens=max_tokens,
+        streaming=True,   # Token callbacks are needed for the time-to-first-token
+        **params
+    )
+
+
+def benchmark_setting(llm, retriever: TimedRetriever, questions: List[str], generation_control: bool = True,
+                      compress_context: bool = False, context_budget: int = 800) -> List[Dict[str, float]]:
+    """
+    Run the chain on every question and return one row of measures per question.
+    """
+    chain = create_rag_chain(llm, retriever=retriever, generation_control=generation_control,
+                             compress_context=compress_context, context_budget=context_budget)
+    timer = GenerationTimer()
+    rows = []
+
+    for question in questions:
+        timer.reset()
+
+        start = time.perf_counter()
+        result = chain.invoke(f"query: {question}", config={"callbacks": [timer]})
+        total_ms = (time.perf_counter() - start) * 1000
+
+        prompt_tokens = llm.get_num_tokens(timer.prompt) if timer.prompt else 0
+        if timer.start is None:  # Refused without calling the LLM (nothing retrieved)
+            ttft_s = generation_s = 0.0
+        else:
+            first_token = timer.first_token or timer.end
+            ttft_s = first_token - timer.start
+            generation_s = timer.end - first_token
+
+        rows.append({
+            "retrieval_ms": retriever.last_ms,
+            "prompt_tokens": prompt_tokens,
+            "ttft_ms": ttft_s * 1000,
+            "prompt_eval_tps": prompt_tokens / ttft_s if ttft_s > 0 else 0.0,
+            "generated_tokens": timer.generated_tokens,
+            "generation_tps": (timer.generated_tokens - 1) / generation_s if generation_s > 0 and timer.generated_tokens > 1 else 0.0,
+            "total_ms": total_ms,
+            "llm_called": timer.start is not None,
+            "answer_chars": len(result["answer"]),
+            "answer": result["answer"],
+        })
+
+    return rows
+
+
+def summarize(setting: str, rows: List[Dict[str, float]]) -> Dict[str, float]:
+    """
+    One table row per setting: medians for latencies, means for throughputs and token counts.
+    """
+    return {
+        "setting": setting,
+        "retrieval_ms": median(r["retrieval_ms"] for r in rows),
+        "prompt_tokens": mean(r["prompt_tokens"] for r in rows),
+        "prompt_eval_tps": mean(r["prompt_eval_tps"] for r in rows),
+        "ttft_ms": median(r["ttft_ms"] for r in rows),
+        "generated_tokens": mean(r["generated_tokens"] for r in rows),
+        "generation_tps": mean(r["generation_tps"] for r in rows),
+        "total_ms": median(r["total_ms"] for r in rows),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end RAG benchmark (retrieval + llama.cpp generation)")
+    parser.add_argument("--model", default="qwen2.5-0.5b-instruct", help="Model name from LLM/models.yaml or path to a GGUF file")
+    parser.add_argument("--setting", action="append", default=None, help="LlamaCpp parameters, e.g. n_threads=4,n_ctx=4096,n_batch=512")
+    parser.add_argument("--max-tokens", type=int, default=2048, help="LLM default budget, the generation control lowers it per prompt type")
+    parser.add_argument("--limit", type=int, default=None, help="Only use the first N questions")
+    parser.add_argument("--generation-control", default="on", choices=["on", "off", "both"],
+                        help="Per-template generation limits of rag.generation; 'both' runs each setting with and without")
+    parser.add_argument("--compress", default="off", choices=["on", "off", "both"],
+                        help="Query-relevance context compression of rag.compression; 'both' runs each setting with and without")
+    parser.add_argument("--context-budget", type=int, default=800, help="Token budget of the compressed context")
+    parser.add_argument("--name", default="rag_end_to_end")
+    args = parser.parse_args()
+
+    settings = args.setting or [""]  # "" = auto-tuned settings of import_llm
+    questions = [item["question"] for item in load_evaluation_set()][:args.limit]
+
+    retriever = TimedRetriever(production_retriever())
+    results = {"model": Path(args.model).name, "settings": {}}
+    table = []
+
+    controls = {"on": [True], "off": [False], "both": [False, True]}[args.generation_control]
+    compressions = {"on": [True], "off": [False], "both": [False, True]}[args.compress]
+
+    for setting in settings:
+        llm = load_llm(args.model, parse_setting(setting), args.max_tokens)
+
+        for compress in compressions:
+            for control in controls:
+                label = (setting or "auto") + ("" if control else " (no control)")
+                label += f" (compressed {args.context_budget})" if compress else ""
+                print(f"\nRunning {label} on {len(questions)} questions...")
+                rows = benchmark_setting(llm, retriever, questions, generation_control=control,
+                                         compress_context=compress, context_budget=args.context_budget)
+
+                results["settings"][label] = rows
+                table.append(summarize(label, rows))
+
+            if len(controls) == 2:
+                saved = table[-2]["generated_tokens"] - table[-1]["generated_tokens"]
+                print(f"Generation control saves {saved:.1f} generated tokens per answer "
+                      f"({saved / table[-2]['generated_tokens'] * 100 if table[-2]['generated_tokens'] else 0:.0f}%)")
+
+        if len(compressions) == 2:
+            before, after = table[-len(controls) - 1], table[-1]  # Last control setting, without and with compression
+            saved = before["prompt_tokens"] - after["prompt_tokens"]
+            print(f"Context compression saves {saved:.0f} prompt tokens per question "
+                  f"({saved / before['prompt_tokens'] * 100 if before['prompt_tokens'] else 0:.0f}%), "
+                  f"total latency {before['total_ms']:.0f} ms -> {after['total_ms']:.0f} ms")
+
+        del llm  # Free the weights before loading the next setting
+
+    print_table(table, ["setting", "retrieval_ms", "prompt_tokens", "prompt_eval_tps", "ttft_ms",
+                        "generated_tokens", "generation_tps", "total_ms"],
+                title=f"RAG END-TO-END ({Path(args.model).name}, {len(questions)} questions)")
+
+    print(f"\nPer-question results saved to {save_results(results, args.name)}")
+
+
+if __name__ == "__main__":
+    main()
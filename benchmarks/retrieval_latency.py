@@ -0,0 +1,219 @@
+"""
+Retrieval latency benchmark.
+
+Breaks the retrieval of every evaluation question down by stage (dense query embedding,
+sparse query embedding, vector search, reranking, context formatting), reports p50/p90/p99
+and throughput for several concurrency levels, stores the results as a JSON baseline and
+fails (exit code 1) when a stage regresses beyond a threshold.
+
+Runs offline by default against a local on-disk Qdrant built from data/metadatas.
+`--payload local` only asks Qdrant for IDs and scores and reads the chunks from the local chunk
+store (retriever.payload_light); the vector_search stage includes that hydration.
+
+Example:
+    python benchmarks/retrieval_latency.py --concurrency 1 4 --save-baseline
+    python benchmarks/retrieval_latency.py --concurrency 1 4 --compare --max-regression 0.2
+    python benchmarks/retrieval_latency.py --concurrency 1 4 --payload local --name retrieval_latency_local
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from common import ROOT, find_regressions, latency_summary, load_evaluation_set, load_results, print_table, save_results
+
+from langchain_qdrant import FastEmbedSparse, QdrantVectorStore, RetrievalMode
+from qdrant_client import QdrantClient, models
+
+from embeddings.embedding import FastEmbedEmbeddings
+from indexing.chunk_store import STORE_FILE, ChunkStore, build_chunk_store
+from indexing.collections_config import explore_collections_yaml
+from indexing.upload import transfo_list_into_Document
+from rag.utils import format_docs
+from retriever.final_retriever import filters, retrieve_FlashrankReranker
+from retriever.payload_light import hydrate_points
+from retriever.retrievers import load_vector_store_from_config, points_to_documents, search_points
+
+STAGES = ["embed_dense", "embed_sparse", "vector_search", "rerank", "format"]
+LOCAL_INDEX_PATH = Path(__file__).resolve().parent / ".qdrant_local"
+
+
+def build_local_index(path: Path, collection_name: str = "RAG", batch_size: int = 64) -> QdrantClient:
+    """
+    Open (and build on first use) an on-disk Qdrant index of data/metadatas with the models of collections.yaml,
+    with its chunk store (path / chunk_store.bin).
+    """
+    client = QdrantClient(path=str(path))
+    with open(ROOT / "data" / "metadatas", "r", encoding="utf-8") as f:
+        list_docs = json.load(f)
+    docs, ids = transfo_list_into_Document(list_docs, use_prefix=True)
+
+    if not (path / "chunk_store.bin").exists():
+        build_chunk_store(docs, ids, path / "chunk_store.bin")
+    if client.collection_exists(collection_name):
+        return client
+
+    config = next(col for col in explore_collections_yaml() if col["name"] == collection_name)
+    model_dense = FastEmbedEmbeddings(model_name=config["dense"]["name"])
+    model_sparse = FastEmbedSparse(model_name=config["sparse"]["name"])
+
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config={"": models.VectorParams(size=model_dense.size, distance=models.Distance.COSINE)},
+        sparse_vectors_config={"langchain-sparse": models.SparseVectorParams()},
+    )
+    vector_store = QdrantVectorStore(
+        client=client,
+        collection_name=collection_name,
+        retrieval_mode=RetrievalMode.HYBRID,
+        embedding=model_dense,
+        sparse_embedding=model_sparse,
+    )
+
+    print(f"Building local index in {path} ({len(docs)} chunks)...")
+    for i in range(0, len(docs), batch_size):
+        vector_store.add_documents(documents=docs[i:i + batch_size], ids=ids[i:i + batch_size])
+
+    return client
+
+
+def run_query(vector_store, reranker, query: str, k: int, store=None) -> dict:
+    """
+    Retrieve for one query, timing each stage separately (in ms).
+    With a ChunkStore, Qdrant returns IDs and scores only and the chunks are read from the store.
+    """
+    timings = {}
+    mode = vector_store.retrieval_mode
+
+    start = time.perf_counter()
+    dense = vector_store.embeddings.embed_query(query) if mode != RetrievalMode.SPARSE else None
+    timings["embed_dense"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    sparse = vector_store.sparse_embeddings.embed_query(query) if mode != RetrievalMode.DENSE else None
+    timings["embed_sparse"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    points = search_points(vector_store, query, k=k, query_filter=filters, dense_vector=dense, sparse_vector=sparse,
+                           with_payload=store is None)
+    if store is None:
+        docs = points_to_documents(points, vector_store.collection_name)
+    else:
+        docs = hydrate_points(points, store, vector_store.client, vector_store.collection_name)
+    timings["vector_search"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    if reranker is not None:
+        docs = reranker.rerank(query, docs)
+    timings["rerank"] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    format_docs(docs)
+    timings["format"] = (time.perf_counter() - start) * 1000
+
+    timings["total"] = sum(timings[stage] for stage in STAGES)
+    return timings
+
+
+def run_benchmark(vector_store, reranker, queries, k: int, concurrency: int, repeat: int, store=None) -> dict:
+    """
+    Run every query `repeat` times with `concurrency` parallel workers and summarize latencies per stage.
+    """
+    workload = [q for _ in range(repeat) for q in queries]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        all_timings = list(executor.map(lambda q: run_query(vector_store, reranker, q, k, store), workload))
+    wall_time = time.perf_counter() - start
+
+    stages = {stage: latency_summary([t[stage] for t in all_timings]) for stage in STAGES + ["total"]}
+    return {
+        "stages": stages,
+        "throughput_qps": len(workload) / wall_time,
+        "wall_time_s": wall_time,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage retrieval latency benchmark")
+    parser.add_argument("--retrieval-mode", default="hybrid", choices=["hybrid", "dense", "sparse"])
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--rerank-model", default=None, help="FlashRank model, e.g. ms-marco-TinyBERT-L-2-v2 (no reranking if omitted)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--repeat", type=int, default=3, help="Number of passes over the evaluation set per concurrency level")
+    parser.add_argument("--remote", action="store_true", help="Use the Qdrant server from .env instead of the local index")
+    parser.add_argument("--local-path", default=str(LOCAL_INDEX_PATH))
+    parser.add_argument("--payload", default="qdrant", choices=["qdrant", "local"],
+                        help="Read chunk payloads from Qdrant or from the local chunk store")
+    parser.add_argument("--name", default="retrieval_latency", help="Baseline name (benchmarks/baselines/<name>.json)")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true", help="Fail if a stage regresses against the saved baseline")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed relative slowdown per stage")
+    parser.add_argument("--metric", default="p90", choices=["p50", "p90", "p99", "mean"])
+    args = parser.parse_args()
+
+    client = None if args.remote else build_local_index(Path(args.local_path))
+    vector_store = load_vector_store_from_config("RAG", client=client, force_retrieval_mode=args.retrieval_mode)
+    store = None
+    if args.payload == "local":
+        store = ChunkStore(STORE_FILE if args.remote else Path(args.local_path) / "chunk_store.bin")
+    reranker = retrieve_FlashrankReranker(None, model_name=args.rerank_model, top_n=args.k, threshold=0) if args.rerank_model else None
+
+    queries = [f"query: {item['question']}" for item in load_evaluation_set()]
+
+    # Warm up ONNX sessions and connections
+    for query in queries[:3]:
+        run_query(vector_store, reranker, query, args.k, store)
+
+    results = {
+        "meta": {
+            "retrieval_mode": args.retrieval_mode,
+            "k": args.k,
+            "rerank_model": args.rerank_model,
+            "backend": "remote" if args.remote else "local",
+            "payload": args.payload,
+            "queries": len(queries),
+            "repeat": args.repeat,
+            "machine": platform.platform(),
+        },
+        "levels": {},
+    }
+
+    for concurrency in args.concurrency:
+        level = run_benchmark(vector_store, reranker, queries, args.k, concurrency, args.repeat, store)
+        results["levels"][str(concurrency)] = level
+
+        rows = [{"stage": stage, **summary} for stage, summary in level["stages"].items()]
+        print_table(rows, ["stage", "count", "mean", "p50", "p90", "p99", "max"],
+                    title=f"concurrency={concurrency}  throughput={level['throughput_qps']:.1f} q/s")
+
+    exit_code = 0
+    if args.compare:
+        baseline = load_results(args.name)
+        if baseline is None:
+            print(f"\nNo baseline named '{args.name}' yet, run with --save-baseline first")
+        else:
+            regressions = []
+            for concurrency, level in results["levels"].items():
+                if concurrency in baseline["levels"]:
+                    regressions += [f"[c={concurrency}] {line}" for line in find_regressions(
+                        level["stages"], baseline["levels"][concurrency]["stages"],
+                        max_regression=args.max_regression, metric=args.metric)]
+            if regressions:
+                print("\nRegressions:\n  " + "\n  ".join(regressions))
+                exit_code = 1
+            else:
+                print("\nNo stage regressed beyond the threshold")
+
+    if args.save_baseline:
+        print(f"\nBaseline saved to {save_results(results, args.name)}")
+
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Retriever parity check.
+
+production_retriever's custom retrievers (two-stage, payload-light, source-routed, federated,
+multi-query searches, see PATHS) call Qdrant through retriever.retrievers.search_points instead of
+LangChain. Their `threshold` must keep the meaning it has in the default path, LangChain's
+"similarity_score_threshold" search type (a relevance score, not a raw Qdrant score). Run with the
+options that make them equivalent to the default path, each of them must return the same IDs, in
+the same order, for every question of the evaluation set.
+
+Runs offline by default against the local on-disk index of benchmarks/retrieval_latency.py. Exits
+with status 1 on a mismatch.
+
+Example:
+    python benchmarks/retriever_parity.py --retrieval-modes hybrid dense
+"""
+
+import argparse
+import sys
+
+from common import load_evaluation_set, print_table, save_results
+from retrieval_latency import LOCAL_INDEX_PATH, build_local_index
+
+from indexing.chunk_store import STORE_FILE, ChunkStore
+from indexing.qdrant import get_qdrant_client
+from retriever.federated import FederatedRetriever
+from retriever.final_retriever import default_threshold, filters
+from retriever.matryoshka import TwoStageRetriever
+from retriever.multi_query import MultiQueryRetriever
+from retriever.payload_light import PayloadLightRetriever
+from retriever.retrievers import load_vector_store_from_config
+from retriever.source_router import SourceRoutedRetriever, SourceRouter
+
+
+class GlobalRouter(SourceRouter):
+    """
+    Router never restricting the search (routed searches only differ by their filter).
+    """
+
+    def route(self, query, query_vector=None):
+        return None, "global"
+
+
+# Custom retrievers, built so that they should match the default path: (vector_store, k, threshold, chunk store) -> retriever
+PATHS = {
+    "two_stage": lambda vector_store, k, threshold, store: TwoStageRetriever(vector_store, None, k=k, threshold=threshold, filter=filters),
+    "payload_light": lambda vector_store, k, threshold, store: PayloadLightRetriever(vector_store, store, k=k, threshold=threshold, filter=filters),
+    "source_routed": lambda vector_store, k, threshold, store: SourceRoutedRetriever(vector_store, GlobalRouter(centroids={}), k=k, threshold=threshold, filter=filters),
+    "federated": lambda vector_store, k, threshold, store: FederatedRetriever({"RAG": vector_store}, k=k, threshold=threshold, filter=filters, normalization="none"),
+    "multi_query": lambda vector_store, k, threshold, store: MultiQueryRetriever(vector_store, k=k, threshold=threshold, filter=filters, expander=lambda query, n: [query]),
+}
+
+
+def ids(docs) -> list:
+    return [str(doc.metadata.get("_id")) for doc in docs]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that the custom retrievers match the default LangChain path")
+    parser.add_argument("--retrieval-modes", nargs="+", default=["hybrid", "dense"], choices=["hybrid", "dense", "sparse"])
+    parser.add_argument("--paths", nargs="+", default=list(PATHS), choices=list(PATHS))
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--threshold", type=float, default=None, help="Relevance threshold (production default of the mode if unset)")
+    parser.add_argument("--remote", action="store_true", help="Use the Qdrant server from .env instead of the local index")
+    parser.add_argument("--name", default="retriever_parity")
+    args = parser.parse_args()
+
+    client = get_qdrant_client() if args.remote else build_local_index(LOCAL_INDEX_PATH)
+    store = ChunkStore(STORE_FILE if args.remote else LOCAL_INDEX_PATH / "chunk_store.bin")
+    queries = [f"query: {item['question']}" for item in load_evaluation_set()]
+
+    rows = []
+    for mode in args.retrieval_modes:
+        vector_store = load_vector_store_from_config("RAG", client=client, force_retrieval_mode=mode)
+        threshold = args.threshold if args.threshold is not None else default_threshold(mode)
+        reference = vector_store.as_retriever(search_type="similarity_score_threshold",
+                                              search_kwargs={"k": args.k, "score_threshold": threshold, "filter": filters})
+        expected = [ids(reference.invoke(query)) for query in queries]
+
+        for path in args.paths:
+            retriever = PATHS[path](vector_store, args.k, threshold, store)
+            found = [ids(retriever.invoke(query)) for query in queries]
+            rows.append({
+                "mode": mode,
+                "path": path,
+                "threshold": threshold,
+                "reference_kept": sum(map(len, expected)) / len(queries),
+                "path_kept": sum(map(len, found)) / len(queries),
+                "mismatches": sum(a != b for a, b in zip(expected, found)),
+            })
+
+    print_table(rows, ["mode", "path", "threshold", "reference_kept", "path_kept", "mismatches"],
+                title=f"RETRIEVER PARITY (k={args.k}, {len(queries)} questions, mean documents kept)")
+    print(f"\nResults saved to {save_results({'k': args.k, 'rows': rows}, args.name)}")
+    if any(row["mismatches"] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Source router benchmark.
+
+Runs the evaluation set through a global search (production filter only) and through
+retriever.source_router.SourceRoutedRetriever for several classifier margins, and reports:
+- routing: share of questions routed by regex / classifier, routing accuracy (the expected chunk's
+  source is among the predicted ones),
+- latency p50/p90 of the whole retrieval (query embedding included, so routing overhead counts),
+- recall@k of the expected chunk.
+
+Runs offline by default against the local on-disk index of benchmarks/retrieval_latency.py; the
+source centroids are computed from its vectors.
+
+Example:
+    python benchmarks/source_router.py --margins 0.01 0.02 0.05 --k 20
+"""
+
+import argparse
+import json
+import time
+
+from common import ROOT, latency_summary, load_evaluation_set, print_table, save_results
+from retrieval_latency import LOCAL_INDEX_PATH, build_local_index
+
+from indexing.qdrant import get_qdrant_client
+from indexing.source_centroids import CENTROIDS_FILE, build_source_centroids
+from retriever.final_retriever import filters
+from retriever.retrievers import load_vector_store_from_config, points_to_documents, search_points
+from retriever.source_router import SourceRoutedRetriever, SourceRouter
+
+
+def evaluate(retrieve, items, k: int) -> dict:
+    latencies, found = [], 0
+    for item in items:
+        start = time.perf_counter()
+        docs = retrieve(f"query: {item['question']}")
+        latencies.append((time.perf_counter() - start) * 1000)
+        found += item["location"] in {str(doc.metadata.get("_id")) for doc in docs[:k]}
+    summary = latency_summary(latencies)
+    return {"p50": summary["p50"], "p90": summary["p90"], f"recall@{k}": found / len(items)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency / recall impact of source routing")
+    parser.add_argument("--retrieval-mode", default="hybrid", choices=["hybrid", "dense"])
+    parser.add_argument("--margins", type=float, nargs="+", default=[0.01, 0.02, 0.05])
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--remote", action="store_true", help="Use the Qdrant server from .env instead of the local index")
+    parser.add_argument("--name", default="source_router")
+    args = parser.parse_args()
+
+    client = get_qdrant_client() if args.remote else build_local_index(LOCAL_INDEX_PATH)
+    vector_store = load_vector_store_from_config("RAG", client=client, force_retrieval_mode=args.retrieval_mode)
+    centroids = build_source_centroids(client, "RAG", path=CENTROIDS_FILE if args.remote else LOCAL_INDEX_PATH / "source_centroids.json")
+
+    with open(ROOT / "data" / "metadatas", "r", encoding="utf-8") as f:
+        source_of = {chunk["qdrant_id"]: chunk["source"] for chunk in json.load(f)}
+    items = load_evaluation_set()
+    query_vectors = [vector_store.embeddings.embed_query(f"query: {item['question']}") for item in items]
+
+    def global_search(query):
+        dense = vector_store.embeddings.embed_query(query)
+        points = search_points(vector_store, query, k=args.k, query_filter=filters, dense_vector=dense)
+        return points_to_documents(points, vector_store.collection_name)
+
+    global_search("query: warm up")
+    rows = [{"setting": "global", "regex": 0.0, "classifier": 0.0, "route_accuracy": "-", **evaluate(global_search, items, args.k)}]
+
+    for margin in args.margins:
+        router = SourceRouter(centroids, min_margin=margin)
+        routes = [router.route(f"query: {item['question']}", vector) for item, vector in zip(items, query_vectors)]
+        routed = [(item, sources) for item, (sources, _) in zip(items, routes) if sources]
+        retriever = SourceRoutedRetriever(vector_store, router=router, k=args.k, filter=filters)
+
+        rows.append({
+            "setting": f"routed (margin {margin})",
+            "regex": sum(method == "regex" for _, method in routes) / len(items),
+            "classifier": sum(method == "classifier" for _, method in routes) / len(items),
+            "route_accuracy": sum(source_of[item["location"]] in sources for item, sources in routed) / max(len(routed), 1),
+            **evaluate(retriever.invoke, items, args.k),
+        })
+
+    print_table(rows, ["setting", "regex", "classifier", "route_accuracy", "p50", "p90", f"recall@{args.k}"],
+                title=f"SOURCE ROUTER ({len(items)} questions, sources: {', '.join(sorted(centroids or {}))})")
+    print(f"\nResults saved to {save_results({'rows': rows}, args.name)}")
+
+
+if __name__ == "__main__":
+    main()
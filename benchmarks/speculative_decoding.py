@@ -0,0 +1,70 @@
+"""
+Speculative decoding benchmark.
+
+Runs the RAG chain on the evaluation set with greedy decoding, once without drafting and once per
+draft mode, then compares generation tokens/s and checks that answers stay the same
+(exact match rate and mean character similarity against the run without drafting).
+
+Example:
+    python benchmarks/speculative_decoding.py --model qwen3-1.7b --draft qwen2.5-0.5b-instruct --draft prompt_lookup --limit 20
+"""
+
+import argparse
+from difflib import SequenceMatcher
+from statistics import mean
+
+from common import load_evaluation_set, print_table, save_results
+from rag_end_to_end import TimedRetriever, benchmark_setting, summarize
+
+from LLM.llm import import_llm
+from retriever.final_retriever import production_retriever
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Speculative decoding benchmark (tokens/s and answer equivalence)")
+    parser.add_argument("--model", default="qwen3-1.7b", help="Main model name from LLM/models.yaml")
+    parser.add_argument("--draft", action="append", default=None, help="Draft model name or prompt_lookup (repeatable)")
+    parser.add_argument("--num-pred-tokens", type=int, default=None)
+    parser.add_argument("--max-tokens", type=int, default=256)
+    parser.add_argument("--limit", type=int, default=None, help="Only use the first N questions")
+    parser.add_argument("--name", default="speculative_decoding")
+    args = parser.parse_args()
+
+    drafts = [None] + (args.draft or ["qwen2.5-0.5b-instruct"])
+    questions = [item["question"] for item in load_evaluation_set()][:args.limit]
+    retriever = TimedRetriever(production_retriever())
+
+    runs = {}
+    for draft in drafts:
+        label = draft or "none"
+        print(f"\nRunning draft={label} on {len(questions)} questions...")
+        llm = import_llm(
+            args.model,
+            draft=draft,
+            num_pred_tokens=args.num_pred_tokens,
+            temperature=0.0,  # Greedy: speculative decoding must then give the same answers
+            max_tokens=args.max_tokens,
+            streaming=True,
+        )
+        runs[label] = benchmark_setting(llm, retriever, questions)
+        del llm
+
+    reference = [row["answer"] for row in runs["none"]]
+    table = []
+    for label, rows in runs.items():
+        answers = [row["answer"] for row in rows]
+        summary = summarize(label, rows)
+        summary["speedup"] = summary["generation_tps"] / table[0]["generation_tps"] if table else 1.0
+        summary["exact_match"] = mean(a == b for a, b in zip(answers, reference))
+        summary["similarity"] = mean(SequenceMatcher(None, a, b).ratio() for a, b in zip(answers, reference))
+        table.append(summary)
+
+    print_table(table, ["setting", "generated_tokens", "generation_tps", "speedup", "ttft_ms", "total_ms",
+                        "exact_match", "similarity"],
+                title=f"SPECULATIVE DECODING ({args.model}, {len(questions)} questions)")
+
+    print(f"\nPer-question results saved to {save_results({'model': args.model, 'runs': runs}, args.name)}")
+
+
+if __name__ == "__main__":
+    main()
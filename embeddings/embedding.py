@@ -2,8 +2,13 @@ import joblib
 from pathlib import Path
 
 from fastembed import TextEmbedding, SparseTextEmbedding
-from typing import List
+from typing import List, Optional
 from langchain_core.embeddings import Embeddings
+from langchain_qdrant import FastEmbedSparse
+from langchain_qdrant.sparse_embeddings import SparseVector
+
+from monitoring.tracing import span
+from scheduling.cpu_budget import stage
 
 #from sentence_transformers import SentenceTransformer
 #from sklearn.feature_extraction.text import TfidfVectorizer
@@ -19,6 +24,22 @@ def output_supported_models(type : str):
         return [[i["model"],f"Size:{i['size_in_GB']}", f'Desc {i["description"]}'] for i in SparseTextEmbedding.list_supported_models()]
 
 
+GRAPH_OPTIMIZATION_LEVELS = {"disable": "ORT_DISABLE_ALL", "basic": "ORT_ENABLE_BASIC", "extended": "ORT_ENABLE_EXTENDED", "all": "ORT_ENABLE_ALL"}
+
+
+def quantize_onnx_model(model_path: Path) -> Path:
+    """
+    Dynamic int8 quantization of an ONNX model (weights stored as int8, activations quantized at run time).
+    The quantized model is written once next to the original and reused afterwards.
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantized_path = model_path.with_name(f"{model_path.stem}_int8.onnx")
+    if not quantized_path.exists():
+        quantize_dynamic(str(model_path), str(quantized_path), weight_type=QuantType.QInt8)
+    return quantized_path
+
+
 class FastEmbedEmbeddings(Embeddings):
     """Lightweight wrapper around `fastembed` dense embeddings for LangChain.
 
@@ -26,20 +47,82 @@ class FastEmbedEmbeddings(Embeddings):
 
     Args:
         model_name: FastEmbed model id to load (defaults to BGE small English v1.5).
+        variant: "fp32" (the model as published) or "int8" (dynamically quantized copy, smaller and
+            faster on CPU, slightly different vectors: index and queries should use the same variant).
+        threads: ONNX Runtime intra-op threads (fastembed default if None).
+        inter_op_threads: ONNX Runtime inter-op threads (parallel execution of independent graph nodes).
+        graph_optimization: ONNX Runtime graph optimization level: "disable", "basic", "extended" or "all".
 
     Attributes:
         model: Underlying `TextEmbedding` instance.
         size: Dimensionality of the generated embeddings.
     """
-    def __init__(self, model_name: str = "BAAI/bge-small-en-v1.5"):
-        self.model = TextEmbedding(model_name=model_name)
+    def __init__(self, model_name: str = "BAAI/bge-small-en-v1.5", variant: str = "fp32", threads: Optional[int] = None,
+                 inter_op_threads: Optional[int] = None, graph_optimization: str = "all"):
+        if variant not in ("fp32", "int8"):
+            raise ValueError(f"Unknown variant '{variant}'. Use 'fp32' or 'int8'.")
+        if graph_optimization not in GRAPH_OPTIMIZATION_LEVELS:
+            raise ValueError(f"Unknown graph_optimization '{graph_optimization}'. Use one of: {', '.join(GRAPH_OPTIMIZATION_LEVELS)}.")
+
+        self.model = TextEmbedding(model_name=model_name, threads=threads)
         self.size = self.model.get_embedding_size(model_name=model_name)
+        self.variant = variant
+
+        #fastembed only exposes the intra-op thread count, other session options need a new session
+        if variant != "fp32" or inter_op_threads or graph_optimization != "all":
+            self._rebuild_session(threads, inter_op_threads, graph_optimization)
+
+    def _rebuild_session(self, threads, inter_op_threads, graph_optimization):
+        """
+        Replace the ONNX Runtime session of the fastembed model (quantized model and/or custom session options).
+        """
+        import onnxruntime as ort
+
+        onnx_model = self.model.model
+        model_path = Path(onnx_model._model_dir) / onnx_model.model_description.model_file
+        if self.variant == "int8":
+            model_path = quantize_onnx_model(model_path)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = getattr(ort.GraphOptimizationLevel, GRAPH_OPTIMIZATION_LEVELS[graph_optimization])
+        if threads:
+            options.intra_op_num_threads = threads
+        if inter_op_threads:
+            options.inter_op_num_threads = inter_op_threads
+            options.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+
+        onnx_model.model = ort.InferenceSession(str(model_path), sess_options=options, providers=["CPUExecutionProvider"])
     
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        return [list(embedding) for embedding in self.model.embed(texts)]
+        with span("embed", kind="dense", texts=len(texts)), stage("embed"):
+            return [list(embedding) for embedding in self.model.embed(texts)]
     
     def embed_query(self, text: str) -> List[float]:
-        return list(next(self.model.embed([text])))
+        with span("embed", kind="dense", texts=1), stage("embed"):
+            return list(next(self.model.embed([text])))
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed several queries in one batch (one ONNX Runtime call)."""
+        with span("embed", kind="dense", texts=len(texts)), stage("embed"):
+            return [list(embedding) for embedding in self.model.embed(texts)]
+
+
+class FastEmbedSparseEmbeddings(FastEmbedSparse):
+    """`langchain_qdrant.FastEmbedSparse` with its embedding calls traced as `embed` spans."""
+
+    def embed_documents(self, texts):
+        with span("embed", kind="sparse", texts=len(texts)), stage("embed"):
+            return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        with span("embed", kind="sparse", texts=1), stage("embed"):
+            return super().embed_query(text)
+
+    def embed_queries(self, texts):
+        """Embed several queries in one batch, with the model's query encoding (as embed_query)."""
+        with span("embed", kind="sparse", texts=len(texts)), stage("embed"):
+            return [SparseVector(indices=result.indices.tolist(), values=result.values.tolist())
+                    for result in self._model.query_embed(texts)]
 
 
 
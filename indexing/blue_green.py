@@ -0,0 +1,313 @@
+"""
+Blue/green re-indexing.
+
+Queries always go through the collection name of collections.yaml ("RAG"), which becomes a Qdrant
+alias of a versioned collection ("RAG_v3"). Re-indexing builds the next version next to the live
+one, validates it on the evaluation set, then switches the alias in a single atomic
+update_collection_aliases call: the UI never sees a missing or half-filled collection.
+
+The upload uses the bulk path: HNSW indexing is disabled (indexing_threshold=0) while points are
+written, and enabled again once, at the end.
+
+The lookup files derived from the chunks (paragraph index, section tree, chunk store, source
+centroids) are built per version in data/RAG_v3/ and copied over the live ones in data/ when the
+alias switches, so they always describe the collection being served, rollback included.
+
+Versions and the active one are recorded in collections.yaml (`versions`, `active`); the last
+`keep` versions stay in Qdrant (and their files in data/) for rollback.
+
+Usage:
+    python -m indexing.blue_green                   # build, validate and switch to a new version
+    python -m indexing.blue_green --rollback        # switch back to the previous version
+"""
+
+import argparse
+import os
+import shutil
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Optional
+
+import yaml
+from langchain_qdrant import QdrantVectorStore, RetrievalMode
+from qdrant_client import QdrantClient, models
+
+from embeddings.embedding import FastEmbedEmbeddings, FastEmbedSparseEmbeddings
+from indexing.collections_config import bump_collection_version, get_collection_versions, record_collection_versions
+from indexing.matryoshka import short_vector_config
+from indexing.profiles import collection_kwargs, create_payload_indexes, dense_vector_params
+from indexing.qdrant import get_qdrant_client
+from indexing.upload import ARTIFACT_FILES, upload_points
+from retriever.retrievers import good_path
+
+INDEXING_THRESHOLD = 20000  # Qdrant default, restored after the bulk upload
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+
+_executor = ThreadPoolExecutor(max_workers=1)  # One re-indexing at a time
+
+
+def version_name(alias: str, version: int) -> str:
+    return f"{alias}_v{version}"
+
+
+def artifacts_dir(alias: str, version: int) -> Path:
+    """
+    Directory of the lookup files built for a version (data/RAG_v3).
+    """
+    return DATA_DIR / version_name(alias, version)
+
+
+def promote_artifacts(alias: str, version: int):
+    """
+    Copy the lookup files of `version` over the live ones in data/. Each file is replaced with
+    os.replace, so readers see either the previous file or the new one. A file the version doesn't
+    have (source centroids of a sparse-only collection) is removed.
+
+    Raises:
+        ValueError: If the version has no lookup files (versions built before they were kept)
+    """
+    directory = artifacts_dir(alias, version)
+    if not directory.is_dir():
+        raise ValueError(f"No lookup files for {version_name(alias, version)} in {directory}")
+
+    for file in ARTIFACT_FILES:
+        source = directory / file.name
+        if not source.exists():
+            file.unlink(missing_ok=True)
+            continue
+        tmp = file.with_name(file.name + ".tmp")
+        shutil.copy2(source, tmp)
+        os.replace(tmp, file)
+
+
+def load_collection_config(alias: str) -> Dict:
+    with open(good_path) as f:
+        for col in yaml.safe_load(f) or []:
+            if col["name"] == alias:
+                return col
+    raise ValueError(f"Collection '{alias}' not found in collections.yaml")
+
+
+def create_bulk_collection(client: QdrantClient, name: str, config: Dict):
+    """
+    Create an empty collection with the vectors and profile of `config`, HNSW indexing disabled for the upload.
+    """
+    profile = config.get("profile")
+    vectors_config = {}
+    sparse_vectors_config = None
+    if config.get("dense"):
+        vectors_config = {"": dense_vector_params(config["dense"]["size"], profile), **short_vector_config(config)}
+    if config.get("sparse"):
+        sparse_vectors_config = {"langchain-sparse": models.SparseVectorParams()}
+
+    client.create_collection(
+        collection_name=name,
+        vectors_config=vectors_config,
+        sparse_vectors_config=sparse_vectors_config,
+        optimizers_config=models.OptimizersConfigDiff(indexing_threshold=0),
+        **collection_kwargs(profile),
+    )
+    create_payload_indexes(client, name, profile)
+
+
+def wait_until_indexed(client: QdrantClient, name: str, timeout: float = 600, poll: float = 2.0):
+    """
+    Enable HNSW indexing and wait until the collection is green (all segments indexed).
+    """
+    client.update_collection(collection_name=name, optimizers_config=models.OptimizersConfigDiff(indexing_threshold=INDEXING_THRESHOLD))
+
+    deadline = time.monotonic() + timeout
+    while client.get_collection(name).status != models.CollectionStatus.GREEN:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Collection {name} still not indexed after {timeout}s")
+        time.sleep(poll)
+
+
+def build_vector_store(client: QdrantClient, name: str, config: Dict) -> QdrantVectorStore:
+    """
+    Vector store on a versioned collection, with the embedding models of its alias.
+    """
+    dense = FastEmbedEmbeddings(model_name=config["dense"]["name"], variant=config["dense"].get("variant", "fp32")) if config.get("dense") else None
+    sparse = FastEmbedSparseEmbeddings(model_name=config["sparse"]["name"]) if config.get("sparse") else None
+    mode = RetrievalMode.HYBRID if dense and sparse else RetrievalMode.DENSE if dense else RetrievalMode.SPARSE
+    return QdrantVectorStore(client=client, collection_name=name, retrieval_mode=mode, embedding=dense, sparse_embedding=sparse)
+
+
+def evaluate_recall(vector_store: QdrantVectorStore, k: int = 10, query_prefix: str = "query: ") -> float:
+    """
+    Recall@k of the evaluation set on a collection (share of questions whose chunk is in the top k).
+    """
+    from retriever.simple_evaluation import calculate_recall_at_k, evaluation_set
+
+    recalls = []
+    for item in evaluation_set:
+        docs = vector_store.similarity_search(query_prefix + item["question"], k=k)
+        recalls.append(calculate_recall_at_k([doc.metadata["_id"] for doc in docs], item["location"], k))
+    return sum(recalls) / len(recalls)
+
+
+def is_legacy_collection(client: QdrantClient, alias: str) -> bool:
+    """
+    True if `alias` is still a real collection (created before versioning) rather than an alias.
+    """
+    return alias in [col.name for col in client.get_collections().collections]
+
+
+def swap_alias(client: QdrantClient, alias: str, collection_name: str):
+    """
+    Point `alias` to `collection_name` atomically (delete + create in one request).
+
+    Raises:
+        ValueError: If a real collection still uses the alias name (see migrate_legacy_collection)
+    """
+    if is_legacy_collection(client, alias):
+        raise ValueError(
+            f"'{alias}' is a collection, not an alias. Run `python -m indexing.blue_green --migrate` once "
+            "to replace it by an alias (the only step with a short downtime)."
+        )
+
+    operations = []
+    if alias in [a.alias_name for a in client.get_aliases().aliases]:
+        operations.append(models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=alias)))
+    operations.append(models.CreateAliasOperation(create_alias=models.CreateAlias(collection_name=collection_name, alias_name=alias)))
+    client.update_collection_aliases(change_aliases_operations=operations)
+
+
+def migrate_legacy_collection(client: QdrantClient, alias: str, collection_name: str):
+    """
+    Replace the pre-versioning collection named `alias` by an alias of `collection_name`.
+    """
+    if is_legacy_collection(client, alias):
+        client.delete_collection(alias)
+    swap_alias(client, alias, collection_name)
+
+
+def prune_versions(client: QdrantClient, alias: str, versions, active: int, keep: int):
+    """
+    Delete the versions older than the `keep` previous ones. Returns the versions kept.
+    """
+    previous = sorted(v for v in versions if v != active)
+    for version in previous[:max(0, len(previous) - keep)]:
+        client.delete_collection(version_name(alias, version))
+        shutil.rmtree(artifacts_dir(alias, version), ignore_errors=True)
+    return previous[max(0, len(previous) - keep):] + [active]
+
+
+def reindex(
+    alias: str = "RAG",
+    client: Optional[QdrantClient] = None,
+    batch_size: int = 256,
+    use_prefix: bool = True,
+    min_recall: float = 0.5,
+    max_recall_drop: float = 0.05,
+    keep: int = 2,
+    migrate: bool = False,
+) -> Dict:
+    """
+    Build a new version of `alias`, validate it and switch the alias to it.
+
+    The new version is rejected (and deleted) if its recall@10 on the evaluation set is below
+    `min_recall` or more than `max_recall_drop` below the active version's.
+
+    Args:
+        alias: Collection name used by the retrievers (entry of collections.yaml)
+        client: QdrantClient (shared client of indexing.qdrant if None)
+        batch_size: Upload batch size
+        use_prefix: Add the "passage: " prefix to documents (snowflake-arctic-embed)
+        min_recall: Minimum recall@10 of the new version
+        max_recall_drop: Maximum recall@10 loss against the active version
+        keep: Number of previous versions kept for rollback
+        migrate: Replace a pre-versioning collection named `alias` by the alias
+
+    Returns:
+        Dict with version, collection, recall, previous_recall and swapped
+    """
+    client = client or get_qdrant_client()
+    config = load_collection_config(alias)
+    versions, active = get_collection_versions(alias)
+
+    legacy = is_legacy_collection(client, alias)
+    if legacy and not migrate:
+        raise ValueError(f"'{alias}' is a collection, not an alias: run with migrate=True (--migrate) the first time")
+
+    version = max(versions, default=0) + 1
+    name = version_name(alias, version)
+
+    create_bulk_collection(client, name, config)
+    vector_store = build_vector_store(client, name, config)
+    upload_points(vector_store, batch_size=batch_size, use_prefix=use_prefix, artifacts_dir=artifacts_dir(alias, version))
+    wait_until_indexed(client, name)
+
+    recall = evaluate_recall(vector_store)
+    live = alias if legacy else version_name(alias, active) if active else None
+    previous_recall = evaluate_recall(build_vector_store(client, live, config)) if live else None
+    if recall < min_recall or (previous_recall is not None and recall < previous_recall - max_recall_drop):
+        client.delete_collection(name)
+        shutil.rmtree(artifacts_dir(alias, version), ignore_errors=True)
+        return {"version": version, "collection": name, "recall": recall, "previous_recall": previous_recall, "swapped": False}
+
+    if legacy:
+        migrate_legacy_collection(client, alias, name)
+    else:
+        swap_alias(client, alias, name)
+    promote_artifacts(alias, version)
+
+    versions = prune_versions(client, alias, versions + [version], version, keep)
+    record_collection_versions(alias, versions, version)
+    bump_collection_version(alias)  # Cached retrieval results refer to the previous version
+
+    return {"version": version, "collection": name, "recall": recall, "previous_recall": previous_recall, "swapped": True}
+
+
+def reindex_in_background(alias: str = "RAG", **kwargs) -> Future:
+    """
+    Run `reindex` in a background thread; the live alias keeps serving queries meanwhile.
+    """
+    return _executor.submit(reindex, alias, **kwargs)
+
+
+def rollback(alias: str = "RAG", version: Optional[int] = None, client: Optional[QdrantClient] = None) -> int:
+    """
+    Point `alias` back to `version` (default: the newest version before the active one) and
+    restore its lookup files.
+
+    Returns:
+        The version now active
+    """
+    client = client or get_qdrant_client()
+    versions, active = get_collection_versions(alias)
+    if version is None:
+        older = [v for v in versions if active is None or v < active]
+        if not older:
+            raise ValueError(f"No previous version of '{alias}' to roll back to (versions: {versions})")
+        version = max(older)
+    elif version not in versions:
+        raise ValueError(f"Version {version} of '{alias}' doesn't exist (versions: {versions})")
+
+    if not artifacts_dir(alias, version).is_dir():
+        raise ValueError(f"No lookup files for {version_name(alias, version)} in {artifacts_dir(alias, version)}")
+
+    swap_alias(client, alias, version_name(alias, version))
+    promote_artifacts(alias, version)
+    record_collection_versions(alias, versions, version)
+    bump_collection_version(alias)
+    return version
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Blue/green re-indexing of a Qdrant collection behind an alias")
+    parser.add_argument("--alias", default="RAG")
+    parser.add_argument("--rollback", action="store_true", help="Switch back to the previous version")
+    parser.add_argument("--version", type=int, default=None, help="Version to roll back to")
+    parser.add_argument("--keep", type=int, default=2, help="Previous versions kept for rollback")
+    parser.add_argument("--min-recall", type=float, default=0.5)
+    parser.add_argument("--migrate", action="store_true", help="First run: replace the existing collection by an alias")
+    args = parser.parse_args()
+
+    if args.rollback:
+        print(f"'{args.alias}' now points to version {rollback(args.alias, args.version)}")
+    else:
+        result = reindex(args.alias, min_recall=args.min_recall, keep=args.keep, migrate=args.migrate)
+        status = "now active" if result["swapped"] else "rejected"
+        print(f"{result['collection']}: recall@10 {result['recall']:.3f} (active: {result['previous_recall']}), {status}")
@@ -0,0 +1,118 @@
+"""
+Compact chunk representation.
+
+A LangChain Document carries its own metadata dict, repeating the same source / type / title /
+subtitle / subsection / subsubsection strings for every chunk of a section. ChunkRecord keeps the
+fields in `__slots__` and points to one shared, interned section tuple per section, so ingestion,
+the chunk store build and the retrieval cache hold one copy of each section path.
+
+Records are not used in the query hot path: search results, reranking (retrieve_FlashrankReranker)
+and context formatting (format_docs) still work on LangChain Documents. Records convert to
+Documents (`to_document`) where LangChain APIs or callers expect them. Measure the difference with
+benchmarks/chunk_memory.py.
+"""
+
+import sys
+from typing import Dict, Iterable, List, Optional
+
+from langchain_core.documents import Document
+
+SECTION_FIELDS = ("source", "type", "title", "subtitle", "subsection", "subsubsection")
+
+_sections: Dict[tuple, tuple] = {}
+
+
+def intern_value(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def intern_section(values: Iterable) -> tuple:
+    """
+    Shared tuple of (source, type, title, subtitle, subsection, subsubsection) with interned strings.
+    """
+    section = tuple(intern_value(value) for value in values)
+    return _sections.setdefault(section, section)
+
+
+class ChunkRecord:
+    """
+    One chunk: content, shared section path and the few per-chunk fields.
+
+    Search results (collection set) also carry `_id` and `_collection_name` in their metadata, as
+    QdrantVectorStore results do; other metadata keys (expanded_from, ...) are kept in `extra`.
+    """
+
+    __slots__ = ("id", "page_content", "section", "paragraph", "chunk_id", "collection", "extra")
+
+    def __init__(self, id, page_content: str, section: tuple, paragraph: Optional[str] = None,
+                 chunk_id: Optional[int] = None, collection: Optional[str] = None, extra: Optional[dict] = None):
+        self.id = id
+        self.page_content = page_content
+        self.section = section
+        self.paragraph = intern_value(paragraph)
+        self.chunk_id = chunk_id
+        self.collection = intern_value(collection)
+        self.extra = extra or None
+
+    def __getattr__(self, name):
+        # source / type / title / ... read from the shared section tuple
+        if name in SECTION_FIELDS:
+            return self.section[SECTION_FIELDS.index(name)]
+        raise AttributeError(name)
+
+    def __repr__(self):
+        return f"ChunkRecord(id={self.id!r}, section={self.section!r}, chunk_id={self.chunk_id!r})"
+
+    @classmethod
+    def from_chunk(cls, chunk: Dict, prefix: str = "") -> "ChunkRecord":
+        """
+        Record of a data/metadatas entry, `prefix` added to its content (e.g. "passage: ").
+        """
+        content = chunk.get("content")
+        if prefix and content:
+            content = prefix + content
+        return cls(chunk.get("qdrant_id"), content, intern_section(chunk.get(field) for field in SECTION_FIELDS),
+                   chunk.get("paragraph"), chunk.get("chunk_id"))
+
+    @classmethod
+    def from_document(cls, doc: Document, exclude: Iterable[str] = ()) -> "ChunkRecord":
+        """
+        Record of a Document, without the metadata keys in `exclude` (e.g. per-query scores).
+        """
+        metadata = {key: value for key, value in doc.metadata.items() if key not in exclude}
+        section = intern_section(metadata.pop(field, None) for field in SECTION_FIELDS)
+        collection = metadata.pop("_collection_name", None)
+        point_id = metadata.pop("_id", None) if collection is not None else metadata.get("_id")
+        return cls(point_id, doc.page_content, section, metadata.pop("paragraph", None),
+                   metadata.pop("chunk_id", None), collection, metadata)
+
+    @property
+    def metadata(self) -> dict:
+        """
+        Metadata dict as stored in the Qdrant payload (plus `_id` / `_collection_name` for search results).
+        `paragraph` and `chunk_id` are left out when unset. A new dict on each access.
+        """
+        metadata = dict(zip(SECTION_FIELDS, self.section))
+        if self.paragraph is not None:
+            metadata["paragraph"] = self.paragraph
+        if self.chunk_id is not None:
+            metadata["chunk_id"] = self.chunk_id
+        if self.extra:
+            metadata.update(self.extra)
+        if self.collection is not None:
+            metadata["_id"] = self.id
+            metadata["_collection_name"] = self.collection
+        return metadata
+
+    def to_document(self, score: Optional[float] = None) -> Document:
+        """
+        LangChain Document of the record, with `score` in its metadata if given.
+        """
+        metadata = self.metadata
+        if score is not None:
+            metadata["score"] = score
+        return Document(page_content=self.page_content, metadata=metadata)
+
+
+def records_to_documents(records: List[ChunkRecord]) -> List[Document]:
+    return [record.to_document() for record in records]
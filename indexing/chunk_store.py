@@ -0,0 +1,149 @@
+"""
+Local chunk store.
+
+Keeps a copy of every uploaded payload ({"page_content", "metadata"}, as stored in Qdrant) in one
+file, data/chunk_store.bin, built at ingest by upload_points:
+
+    [record 0][record 1]...[offset index][footer]
+
+Records are UTF-8 JSON payloads, the offset index a JSON object {qdrant_id: [offset, length]} and
+the footer two little-endian uint64 (index offset, index length). The file is memory-mapped, so
+searches can ask Qdrant for IDs and scores only (with_payload=False) and read the few payloads
+they need from the page cache (see retriever.payload_light).
+
+The file is replaced atomically on rebuild; open stores pick the new one up on their next lookup.
+
+Build it:
+    python -m indexing.chunk_store --prefix
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+from langchain_core.documents import Document
+
+from indexing.chunk_record import ChunkRecord
+
+ROOT = Path(__file__).resolve().parent.parent
+METADATA_FILE = ROOT / "data" / "metadatas"
+STORE_FILE = ROOT / "data" / "chunk_store.bin"
+
+FOOTER = struct.Struct("<QQ")
+
+
+def build_chunk_store(docs: List[Union[Document, ChunkRecord]], ids: Iterable, path: Optional[str] = None) -> "ChunkStore":
+    """
+    Write the payloads of the uploaded Documents (or ChunkRecords) to the chunk store.
+
+    Args:
+        docs: Documents / ChunkRecords as uploaded (page_content with its prefix, if any)
+        ids: Their qdrant_id
+        path: Output file (defaults to data/chunk_store.bin)
+
+    Returns:
+        The opened ChunkStore
+    """
+    path = Path(path) if path else STORE_FILE
+    tmp = path.with_suffix(path.suffix + ".tmp")
+
+    offsets = {}
+    with open(tmp, "wb") as f:
+        for point_id, doc in zip(ids, docs):
+            record = json.dumps({"page_content": doc.page_content, "metadata": doc.metadata}, ensure_ascii=False).encode("utf-8")
+            offsets[str(point_id)] = [f.tell(), len(record)]
+            f.write(record)
+
+        index = json.dumps(offsets).encode("utf-8")
+        index_offset = f.tell()
+        f.write(index)
+        f.write(FOOTER.pack(index_offset, len(index)))
+
+    os.replace(tmp, path) # Readers keep their mapping of the previous file
+    return ChunkStore(path)
+
+
+class ChunkStore:
+    """
+    Read-only, memory-mapped view of the chunk store. Safe to share between threads.
+
+    Args:
+        path: Store file (defaults to data/chunk_store.bin)
+
+    Raises:
+        FileNotFoundError: If the store wasn't built
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = Path(path) if path else STORE_FILE
+        if not self.path.exists():
+            raise FileNotFoundError(f"Chunk store {self.path} not built: run `python -m indexing.chunk_store --prefix` "
+                                    "(or upload the collection)")
+        self._lock = threading.Lock()
+        self._stat = None
+        self._load()
+
+    def _load(self):
+        with open(self.path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        index_offset, index_length = FOOTER.unpack(data[-FOOTER.size:])
+        offsets: Dict[str, List[int]] = json.loads(data[index_offset:index_offset + index_length])
+        self._view = (offsets, data) # Swapped as one reference, lookups never mix two files
+        self._stat = (stat.st_ino, stat.st_mtime_ns)
+
+    def refresh(self) -> bool:
+        """
+        Reopen the store if the file was rebuilt since it was loaded. Returns True if it was.
+        """
+        stat = os.stat(self.path)
+        if (stat.st_ino, stat.st_mtime_ns) == self._stat:
+            return False
+        with self._lock:
+            if (stat.st_ino, stat.st_mtime_ns) != self._stat:
+                self._load()
+        return True
+
+    def __len__(self) -> int:
+        return len(self._view[0])
+
+    def __contains__(self, point_id) -> bool:
+        return str(point_id) in self._view[0]
+
+    def get(self, point_id) -> Optional[Dict]:
+        """
+        Payload of a point ({"page_content", "metadata"}), None if it isn't in the store.
+        """
+        offsets, data = self._view
+        entry = offsets.get(str(point_id))
+        if entry is None:
+            return None
+        offset, length = entry
+        return json.loads(data[offset:offset + length])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build data/chunk_store.bin from data/metadatas")
+    parser.add_argument("--prefix", action="store_true", help="Add the 'passage: ' prefix, as uploaded with use_prefix=True")
+    args = parser.parse_args()
+
+    from indexing.paragraph_index import assign_paragraphs
+    from indexing.upload import transfo_list_into_records
+
+    with open(METADATA_FILE, "r", encoding="utf-8") as f:
+        chunks = json.load(f)
+    assign_paragraphs(chunks)
+    records, ids = transfo_list_into_records(chunks, use_prefix=args.prefix)
+
+    store = build_chunk_store(records, ids)
+    print(f"Chunk store: {len(store)} chunks, {store.path.stat().st_size / 1e6:.1f} MB -> {store.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,8 @@ def del_collection_yaml(collection_name) :
     with open(path) as f :
         collection_config = yaml.safe_load(f)
 
+    retire_collection_version(collection_name, get_collection_version(collection_name))
+
     #Check each iteration of models
     for idx, col in enumerate(collection_config) : 
         if col["name"] == collection_name :
@@ -32,8 +34,110 @@ def del_collection_yaml(collection_name) :
             return True
 
     return False
+
+def load_retired_versions() -> dict :
+    """
+    Versions of deleted collections ({name: version}), from indexing/retired_versions.yaml.
+    """
+    path = Path(__file__).resolve().parent / "retired_versions.yaml"
+
+    if not path.exists():
+        return {}
+
+    with open(path) as f :
+        return yaml.safe_load(f) or {}
+
+def retire_collection_version(collection_name : str, version : int) :
+    """
+    Remember the version of a deleted collection, plus one: a collection recreated under the same name
+    starts from there, so its versions never repeat ones that retrieval caches may still hold entries for.
+    """
+    retired = load_retired_versions()
+    retired[collection_name] = max(retired.get(collection_name, 0), version + 1)
+
+    with open(Path(__file__).resolve().parent / "retired_versions.yaml", "w") as f :
+        yaml.safe_dump(retired, f, sort_keys=True)
     
-def store_info_collections(collection_name : str, model_dense = None, model_sparse = None) :
+def get_collection_version(collection_name : str) -> int :
+    """
+    Return the data version of a collection recorded in collections.yaml (0 if never bumped).
+    Versions keep increasing across deletions of the collection (see retire_collection_version).
+    """
+    path = Path(__file__).resolve().parent / "collections.yaml"
+    retired = load_retired_versions().get(collection_name, 0)
+
+    if not path.exists():
+        return retired
+
+    with open(path) as f :
+        collection_config = yaml.safe_load(f) or []
+
+    for col in collection_config :
+        if col["name"] == collection_name :
+            return max(col.get("version", 0), retired)
+
+    return retired
+
+def bump_collection_version(collection_name : str) -> int :
+    """
+    Increment the data version of a collection in collections.yaml, every time its points are modified.
+    Retrieval caches use this version in their keys, so bumping it invalidates stale results.
+    """
+    path = Path(__file__).resolve().parent / "collections.yaml"
+
+    with open(path) as f :
+        collection_config = yaml.safe_load(f) or []
+
+    for col in collection_config :
+        if col["name"] == collection_name :
+            col["version"] = max(col.get("version", 0), load_retired_versions().get(collection_name, 0)) + 1
+
+            with open(path, "w") as f :
+                yaml.safe_dump(collection_config, f, sort_keys=False)
+            return col["version"]
+
+    return 0
+
+def get_collection_versions(collection_name : str) :
+    """
+    Return (versions, active) of a blue/green collection: the versioned collections
+    `<name>_v<version>` built for it and the one its alias points to (see indexing.blue_green).
+    """
+    path = Path(__file__).resolve().parent / "collections.yaml"
+
+    if not path.exists():
+        return [], None
+
+    with open(path) as f :
+        collection_config = yaml.safe_load(f) or []
+
+    for col in collection_config :
+        if col["name"] == collection_name :
+            return list(col.get("versions", [])), col.get("active")
+
+    return [], None
+
+def record_collection_versions(collection_name : str, versions, active) -> bool :
+    """
+    Record the versioned collections and the active one of a blue/green collection in collections.yaml.
+    """
+    path = Path(__file__).resolve().parent / "collections.yaml"
+
+    with open(path) as f :
+        collection_config = yaml.safe_load(f) or []
+
+    for col in collection_config :
+        if col["name"] == collection_name :
+            col["versions"] = sorted(versions)
+            col["active"] = active
+
+            with open(path, "w") as f :
+                yaml.safe_dump(collection_config, f, sort_keys=False)
+            return True
+
+    return False
+
+def store_info_collections(collection_name : str, model_dense = None, model_sparse = None, profile = None, short_dim = None) :
 
     """
     Store the collection information in a collections.yaml file, if it doesn't exist, it creates it, 
@@ -57,6 +161,13 @@ def store_info_collections(collection_name : str, model_dense = None, model_spar
                 "name": sparse_name
             }
         }
+    if profile is not None :
+        COLLECTIONS_CONFIG["profile"] = profile
+    if short_dim :
+        COLLECTIONS_CONFIG["dense"]["short"] = short_dim
+    retired = load_retired_versions().get(collection_name)
+    if retired : #Recreated collection, continue from the version of the deleted one
+        COLLECTIONS_CONFIG["version"] = retired
     
     path = Path(__file__).resolve().parent
     for file in path.iterdir() : #Check if a collections.yaml file already exists
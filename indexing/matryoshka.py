@@ -0,0 +1,84 @@
+"""
+Truncated ("Matryoshka") dense vectors.
+
+A collection whose collections.yaml entry sets `dense.short` (e.g. 256) stores, next to the full
+dense vector, a named vector "dense_short" made of the first `short` dimensions renormalized to
+unit length. Searches first scan the short vectors for a larger candidate pool, then rescore the
+candidates with the full vectors (see retriever.retrievers.search_points).
+
+The short vectors are derived from the stored full vectors, no re-embedding needed.
+Works best with models trained for truncation (Matryoshka representation learning, e.g.
+snowflake-arctic-embed-m-v1.5); for other models check the recall with benchmarks/matryoshka.py.
+"""
+
+import math
+from typing import Dict, List, Optional
+
+from qdrant_client import QdrantClient, models
+
+SHORT_VECTOR_NAME = "dense_short"
+
+
+def truncate_vector(vector: List[float], dim: int) -> List[float]:
+    """
+    First `dim` dimensions of a vector, renormalized to unit length.
+    """
+    vector = list(vector[:dim])
+    norm = math.sqrt(sum(x * x for x in vector))
+    return [x / norm for x in vector] if norm else vector
+
+
+def short_vector_config(config: Dict) -> Dict[str, models.VectorParams]:
+    """
+    Named vector config of the short vector for a collections.yaml entry ({} if it has none).
+    """
+    short = (config.get("dense") or {}).get("short")
+    if not short:
+        return {}
+    return {SHORT_VECTOR_NAME: models.VectorParams(size=short, distance=models.Distance.COSINE)}
+
+
+def get_short_dim(client: QdrantClient, collection_name: str) -> Optional[int]:
+    """
+    Size of the collection's short vector, None if it has none.
+    """
+    vectors = client.get_collection(collection_name).config.params.vectors
+    if isinstance(vectors, dict) and SHORT_VECTOR_NAME in vectors:
+        return vectors[SHORT_VECTOR_NAME].size
+    return None
+
+
+def fill_short_vectors(client: QdrantClient, collection_name: str, dim: Optional[int] = None, vector_name: str = "", batch_size: int = 256) -> int:
+    """
+    Compute the short vector of every point from its stored full vector.
+
+    Args:
+        client: QdrantClient
+        collection_name: Collection with a "dense_short" named vector
+        dim: Short vector size (read from the collection if None)
+        vector_name: Name of the full dense vector ("" for LangChain collections)
+        batch_size: Points read and updated per request
+
+    Returns:
+        Number of points updated
+    """
+    dim = dim or get_short_dim(client, collection_name)
+    if dim is None:
+        raise ValueError(f"Collection '{collection_name}' has no '{SHORT_VECTOR_NAME}' vector")
+
+    updated = 0
+    offset = None
+    while True:
+        points, offset = client.scroll(collection_name=collection_name, limit=batch_size, offset=offset,
+                                       with_payload=False, with_vectors=[vector_name])
+        if points:
+            client.update_vectors(
+                collection_name=collection_name,
+                points=[
+                    models.PointVectors(id=point.id, vector={SHORT_VECTOR_NAME: truncate_vector(point.vector[vector_name], dim)})
+                    for point in points
+                ],
+            )
+            updated += len(points)
+        if offset is None:
+            return updated
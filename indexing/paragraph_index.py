@@ -0,0 +1,156 @@
+"""
+Paragraph-reference index.
+
+Maps (source, paragraph number) to the chunk IDs of that paragraph, e.g. "IFRS_9|5.5.3" -> [ids],
+so questions citing a paragraph ("IFRS 9 paragraph 5.5.3", "B3.2.1") are answered by a direct
+lookup instead of a vector search. Built at ingest from the `paragraph` metadata written by
+preprocessing.parsing (derived from the chunk content for older metadata files).
+
+Build it:
+    python -m indexing.paragraph_index
+"""
+
+import json
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+METADATA_FILE = ROOT / "data" / "metadatas"
+INDEX_FILE = ROOT / "data" / "paragraph_index.json"
+
+CHUNK_HEADER = re.compile(r"^(?:[^|\n]*\|){2}\s*")  # "IFRS_9 | Objective | "
+# Same numbering as preprocessing.parsing item_pattern: 13D / 3.2.1 / 2.3 / B3.2.1 / 4.1.2A
+# (parsing joins the lines of an item without separator, hence "B3.2.1The following ...")
+PARAGRAPH_START = re.compile(r"^([A-Z]?\d+[A-Z]?(?:\.\d+[A-Z]?)*)\.?(?:\s+|(?=[A-Z][a-z]))")
+
+PARAGRAPH = r"[A-Z]{0,2}\d+[A-Z]?(?:\.\d+[A-Z]?)*(?:\([a-z]{1,4}\))*"
+# "paragraph 5.5.3", "paragraphs 3.2.4 and 3.2.5", "para. 13D", "§ 4.1.2A"
+EXPLICIT_REFERENCE = re.compile(
+    rf"\b(?:paragraphs?|paras?\.?|§)\s*({PARAGRAPH}(?:\s*(?:,|and|or|to|-)\s*{PARAGRAPH})*)",
+    re.IGNORECASE,
+)
+# Numbers that can only be paragraphs without the word: B3.2.1, 5.5.3, 3.2.6(a)
+BARE_REFERENCE = re.compile(r"(?<![\w.])([A-Z]{1,2}\d+(?:\.\d+)+[A-Z]?|\d+\.\d+\.\d+[A-Z]?)(?:\([a-z]{1,4}\))*(?![\w.])")
+SOURCE_REFERENCE = re.compile(r"\b(IFRS|IAS)[\s_]?(\d+)\b", re.IGNORECASE)
+
+
+def normalize_paragraph(reference: str) -> str:
+    """
+    "3.2.6(a)" -> "3.2.6": sub-items (a), (b)(i) are part of their paragraph's chunk.
+    """
+    return reference.split("(", 1)[0].strip().rstrip(".").upper()
+
+
+def paragraph_from_content(content: str) -> Optional[str]:
+    """
+    Paragraph number starting a chunk's content (after its "SOURCE | section |" header), if any.
+    """
+    m = PARAGRAPH_START.match(CHUNK_HEADER.sub("", content or ""))
+    return m.group(1) if m else None
+
+
+def assign_paragraphs(chunks: List[Dict]) -> List[Dict]:
+    """
+    Fill the `paragraph` field of chunks missing it, in place.
+
+    Chunks split from the same paragraph (chunk_id > 0) follow it in the metadata file and
+    inherit its number.
+
+    Args:
+        chunks: Chunk dicts as produced by preprocessing.chunking.chunking_text, in file order
+
+    Returns:
+        The same list
+    """
+    previous = None
+    for chunk in chunks:
+        if not chunk.get("paragraph"):
+            if chunk.get("chunk_id") and previous is not None and previous.get("source") == chunk.get("source"):
+                chunk["paragraph"] = previous.get("paragraph")
+            else:
+                chunk["paragraph"] = paragraph_from_content(chunk.get("content"))
+        previous = chunk
+    return chunks
+
+
+def build_paragraph_index(chunks: Optional[List[Dict]] = None, path: Optional[str] = None) -> Dict[str, List[str]]:
+    """
+    Build and save the "SOURCE|paragraph" -> chunk IDs index.
+
+    Args:
+        chunks: Chunk dicts (defaults to data/metadatas)
+        path: Output JSON file (defaults to data/paragraph_index.json)
+
+    Returns:
+        The index
+    """
+    if chunks is None:
+        with open(METADATA_FILE, "r", encoding="utf-8") as f:
+            chunks = json.load(f)
+
+    index: Dict[str, List[str]] = {}
+    for chunk in assign_paragraphs(chunks):
+        if chunk.get("paragraph"):
+            key = f"{chunk['source']}|{normalize_paragraph(chunk['paragraph'])}"
+            index.setdefault(key, []).append(chunk["qdrant_id"])
+
+    path = Path(path) if path else INDEX_FILE
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=1)
+
+    return index
+
+
+def find_paragraph_references(query: str) -> Tuple[Optional[str], List[str]]:
+    """
+    Extract the standard and paragraph numbers cited in a query.
+
+    Returns:
+        Tuple of (source such as "IFRS_9" or None, normalized paragraph numbers in order of appearance)
+    """
+    references = []
+    for match in EXPLICIT_REFERENCE.finditer(query):
+        references += re.findall(PARAGRAPH, match.group(1))
+    references += [m.group(1) for m in BARE_REFERENCE.finditer(query)]
+
+    paragraphs = list(dict.fromkeys(normalize_paragraph(r) for r in references if r))
+    source = SOURCE_REFERENCE.search(query)
+    return (f"{source.group(1).upper()}_{source.group(2)}" if source else None), paragraphs
+
+
+class ParagraphIndex:
+    """
+    In-memory paragraph index with O(1) lookups.
+
+    Args:
+        path: Index JSON file built by build_paragraph_index
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        path = Path(path) if path else INDEX_FILE
+        with open(path, "r", encoding="utf-8") as f:
+            self.by_source: Dict[str, List[str]] = json.load(f)
+
+        # Same paragraph number in every standard, for queries that don't name one
+        self.by_paragraph: Dict[str, List[str]] = {}
+        for key, ids in self.by_source.items():
+            self.by_paragraph.setdefault(key.split("|", 1)[1], []).extend(ids)
+
+    def lookup(self, query: str) -> List[str]:
+        """
+        Chunk IDs of the paragraphs cited in the query, in citation order (empty if none is known).
+        """
+        source, paragraphs = find_paragraph_references(query)
+        ids = []
+        for paragraph in paragraphs:
+            if source is not None:
+                ids += self.by_source.get(f"{source}|{paragraph}", [])
+            else:
+                ids += self.by_paragraph.get(paragraph, [])
+        return list(dict.fromkeys(ids))
+
+
+if __name__ == "__main__":
+    index = build_paragraph_index()
+    print(f"{len(index)} paragraphs indexed in {INDEX_FILE}")
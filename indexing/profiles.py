@@ -0,0 +1,126 @@
+"""
+Collection profiles: storage and search settings of a Qdrant collection.
+
+A collections.yaml entry selects one with `profile:`, either the name of a predefined profile
+below or an inline mapping with the same keys:
+- quantization: null, "scalar" (int8, 4x smaller) or "binary" (1 bit per dimension, 32x smaller)
+- always_ram: keep the quantized vectors in RAM (the point of quantizing when on_disk is set)
+- on_disk: store the original float32 vectors on disk (memory-mapped) instead of RAM
+- hnsw: {m, ef_construct} graph parameters (null = Qdrant defaults, m=16 / ef_construct=100)
+- payload_indexes: payload keys indexed as keywords, so filters (metadata.type, metadata.source)
+  don't scan every payload
+- search: {rescore, oversampling, hnsw_ef} used at query time; with quantization, Qdrant
+  searches the quantized vectors for limit * oversampling candidates and rescores them with
+  the original vectors
+"""
+
+from typing import Dict, Optional, Union
+
+from qdrant_client import QdrantClient, models
+
+PAYLOAD_INDEXES = ["metadata.type", "metadata.source"]
+
+PROFILES = {
+    "default": {},
+    "indexed": {
+        "payload_indexes": PAYLOAD_INDEXES,
+    },
+    "scalar": {
+        "quantization": "scalar",
+        "always_ram": True,
+        "payload_indexes": PAYLOAD_INDEXES,
+        "search": {"rescore": True, "oversampling": 2.0},
+    },
+    "binary": {
+        "quantization": "binary",
+        "always_ram": True,
+        "payload_indexes": PAYLOAD_INDEXES,
+        "search": {"rescore": True, "oversampling": 3.0},
+    },
+    "on_disk": {
+        "quantization": "scalar",
+        "always_ram": True,
+        "on_disk": True,
+        "payload_indexes": PAYLOAD_INDEXES,
+        "search": {"rescore": True, "oversampling": 2.0},
+    },
+    "compact_hnsw": {
+        "hnsw": {"m": 8, "ef_construct": 64},
+        "payload_indexes": PAYLOAD_INDEXES,
+        "search": {"hnsw_ef": 64},
+    },
+}
+
+
+def resolve_profile(profile: Union[str, Dict, None]) -> Dict:
+    """
+    Profile settings from a profile name, an inline mapping or None (default profile).
+
+    Raises:
+        ValueError: If the profile name is unknown
+    """
+    if profile is None:
+        return {}
+    if isinstance(profile, dict):
+        return profile
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown collection profile '{profile}'. Available profiles: {', '.join(PROFILES)}")
+    return PROFILES[profile]
+
+
+def dense_vector_params(size: int, profile: Union[str, Dict, None] = None) -> models.VectorParams:
+    """
+    VectorParams of the dense vector for a profile.
+    """
+    settings = resolve_profile(profile)
+    return models.VectorParams(size=size, distance=models.Distance.COSINE, on_disk=settings.get("on_disk") or None)
+
+
+def collection_kwargs(profile: Union[str, Dict, None] = None) -> Dict:
+    """
+    Extra create_collection arguments (quantization_config, hnsw_config) for a profile.
+    """
+    settings = resolve_profile(profile)
+    kwargs = {}
+
+    quantization = settings.get("quantization")
+    always_ram = settings.get("always_ram")
+    if quantization == "scalar":
+        kwargs["quantization_config"] = models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=0.99, always_ram=always_ram)
+        )
+    elif quantization == "binary":
+        kwargs["quantization_config"] = models.BinaryQuantization(
+            binary=models.BinaryQuantizationConfig(always_ram=always_ram)
+        )
+    elif quantization is not None:
+        raise ValueError(f"Unknown quantization '{quantization}'. Use 'scalar', 'binary' or null.")
+
+    if settings.get("hnsw"):
+        kwargs["hnsw_config"] = models.HnswConfigDiff(**settings["hnsw"])
+
+    return kwargs
+
+
+def create_payload_indexes(client: QdrantClient, collection_name: str, profile: Union[str, Dict, None] = None):
+    """
+    Create the keyword payload indexes of a profile on an existing collection.
+    """
+    for field in resolve_profile(profile).get("payload_indexes", []):
+        client.create_payload_index(collection_name=collection_name, field_name=field, field_schema=models.PayloadSchemaType.KEYWORD)
+
+
+def search_params(profile: Union[str, Dict, None] = None) -> Optional[models.SearchParams]:
+    """
+    Query-time SearchParams of a profile (None when it has no search settings).
+    """
+    settings = resolve_profile(profile)
+    search = settings.get("search") or {}
+    if not search:
+        return None
+
+    quantization = None
+    if settings.get("quantization"):
+        quantization = models.QuantizationSearchParams(rescore=search.get("rescore", True), oversampling=search.get("oversampling"))
+
+    return models.SearchParams(hnsw_ef=search.get("hnsw_ef"), quantization=quantization)
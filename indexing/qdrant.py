@@ -1,25 +1,129 @@
+"""
+Qdrant client factory and collection management.
+
+`get_qdrant_client()` returns one client per process (per settings), so retrieval, evaluation
+and upload share its pooled keep-alive connections instead of opening new ones on each call.
+Settings come from .env:
+- QDRANT_URL, QDRANT_API_KEY
+- QDRANT_PREFER_GRPC (default false), QDRANT_GRPC_PORT (default 6334): gRPC transport
+- QDRANT_TIMEOUT (seconds, default 10), QDRANT_RETRIES (connection retries, default 3)
+- QDRANT_POOL_SIZE (max keep-alive connections, default 20)
+"""
+
+import asyncio
 import os
+import threading
+import weakref
+from typing import Dict, Optional
 
+import httpx
 from dotenv import load_dotenv
-from qdrant_client import QdrantClient, models
+from qdrant_client import AsyncQdrantClient, QdrantClient, models
 from indexing.collections_config import store_info_collections, del_collection_yaml
+from indexing.profiles import collection_kwargs, create_payload_indexes, dense_vector_params
+from indexing.matryoshka import SHORT_VECTOR_NAME
 
-def load_qdrant_client() -> QdrantClient:
+KEEPALIVE_EXPIRY = 60 #Seconds an idle connection stays open
+GRPC_KEEPALIVE_OPTIONS = {
+    "grpc.keepalive_time_ms": 30000,
+    "grpc.keepalive_timeout_ms": 10000,
+    "grpc.keepalive_permit_without_calls": 1,
+}
+
+_lock = threading.Lock()
+_env_loaded = False
+_clients: Dict[tuple, QdrantClient] = {}
+_async_clients = weakref.WeakKeyDictionary() #Event loop -> {settings: AsyncQdrantClient}
+
+
+def _env_flag(name: str, default: bool = False) -> bool:
+    value = os.getenv(name)
+    return default if value is None else value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def client_settings(url: Optional[str] = None, prefer_grpc: Optional[bool] = None,
+                    timeout: Optional[int] = None, retries: Optional[int] = None) -> dict:
     """
-    Load and return a QdrantClient using QDRANT_API_KEY and QDRANT_URL from .env.
+    Client settings from .env (loaded once per process), overridden by the non-None arguments.
     """
-    
-    load_dotenv() 
+    global _env_loaded
+    if not _env_loaded:
+        load_dotenv()
+        _env_loaded = True
 
-    api_key = os.getenv("QDRANT_API_KEY")
-    url = os.getenv("QDRANT_URL")
+    return {
+        "url": url or os.getenv("QDRANT_URL"),
+        "api_key": os.getenv("QDRANT_API_KEY"),
+        "prefer_grpc": _env_flag("QDRANT_PREFER_GRPC") if prefer_grpc is None else prefer_grpc,
+        "grpc_port": int(os.getenv("QDRANT_GRPC_PORT", 6334)),
+        "timeout": int(os.getenv("QDRANT_TIMEOUT", 10)) if timeout is None else timeout,
+        "retries": int(os.getenv("QDRANT_RETRIES", 3)) if retries is None else retries,
+        "pool_size": int(os.getenv("QDRANT_POOL_SIZE", 20)),
+    }
 
-    qdrant_client = QdrantClient(
-        url= url, 
-        api_key= api_key,
-    )
-    
-    return qdrant_client
+
+def _client_kwargs(settings: dict, transport) -> dict:
+    """
+    Keyword arguments of QdrantClient / AsyncQdrantClient; extra keywords are passed to the httpx client.
+    """
+    limits = httpx.Limits(max_connections=settings["pool_size"], max_keepalive_connections=settings["pool_size"],
+                          keepalive_expiry=KEEPALIVE_EXPIRY)
+    return {
+        "url": settings["url"],
+        "api_key": settings["api_key"],
+        "prefer_grpc": settings["prefer_grpc"],
+        "grpc_port": settings["grpc_port"],
+        "timeout": settings["timeout"],
+        "grpc_options": GRPC_KEEPALIVE_OPTIONS if settings["prefer_grpc"] else None,
+        "transport": transport(retries=settings["retries"], limits=limits), #Retries failed connections only
+    }
+
+
+def get_qdrant_client(url: Optional[str] = None, prefer_grpc: Optional[bool] = None,
+                      timeout: Optional[int] = None, retries: Optional[int] = None) -> QdrantClient:
+    """
+    Shared QdrantClient of the process for these settings (see the module docstring), created on first use.
+    Thread-safe: the client can be used from several threads.
+    """
+    settings = client_settings(url, prefer_grpc, timeout, retries)
+    key = tuple(sorted(settings.items()))
+    with _lock:
+        if key not in _clients:
+            _clients[key] = QdrantClient(**_client_kwargs(settings, httpx.HTTPTransport))
+        return _clients[key]
+
+
+def get_async_qdrant_client(url: Optional[str] = None, prefer_grpc: Optional[bool] = None,
+                            timeout: Optional[int] = None, retries: Optional[int] = None) -> AsyncQdrantClient:
+    """
+    Shared AsyncQdrantClient for these settings and the running event loop
+    (async connections can't be shared across loops). Must be called from a coroutine.
+    """
+    loop = asyncio.get_running_loop()
+    settings = client_settings(url, prefer_grpc, timeout, retries)
+    key = tuple(sorted(settings.items()))
+    with _lock:
+        clients = _async_clients.setdefault(loop, {})
+        if key not in clients:
+            clients[key] = AsyncQdrantClient(**_client_kwargs(settings, httpx.AsyncHTTPTransport))
+        return clients[key]
+
+
+def close_qdrant_clients():
+    """
+    Close the shared synchronous clients (e.g. at shutdown or after changing .env); the next call creates new ones.
+    """
+    with _lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+
+
+def load_qdrant_client() -> QdrantClient:
+    """
+    Return the shared QdrantClient configured by QDRANT_API_KEY and QDRANT_URL from .env (see get_qdrant_client).
+    """
+    return get_qdrant_client()
 
 def check_collection_type(client, collection_name: str) -> str:
     """
@@ -54,9 +158,11 @@ def guess_collection_type(model_dense = None, model_sparse = None) :
     else :
         raise ValueError("At least one of model_dense or model_sparse must be provided.")
 
-def create_qdrant_collection(client, collection_name : str, model_dense = None, model_sparse = None) :
+def create_qdrant_collection(client, collection_name : str, model_dense = None, model_sparse = None, profile = None, short_dim = None) :
     """
     Create a Qdrant collection named by collection_name configured for dense, sparse, or both modes.
+    profile (name or mapping, see indexing.profiles) sets quantization, on-disk storage, HNSW and payload indexes.
+    short_dim adds a truncated copy of the dense vector for a cheap first-stage search (see indexing.matryoshka).
     """
 
     try :
@@ -66,25 +172,32 @@ def create_qdrant_collection(client, collection_name : str, model_dense = None,
 
     except :
         mode = guess_collection_type(model_dense, model_sparse) #Guess type
-        collections_config = store_info_collections(collection_name, model_dense, model_sparse)
+        collections_config = store_info_collections(collection_name, model_dense, model_sparse, profile=profile, short_dim=short_dim)
+
+        dense_vectors = {}
+        if model_dense is not None :
+            dense_vectors[""] = dense_vector_params(model_dense.size, profile)
+            if short_dim : #Filled from the full vectors after upload (upload_points)
+                dense_vectors[SHORT_VECTOR_NAME] = models.VectorParams(size=short_dim, distance=models.Distance.COSINE)
 
         if mode == "dense" :             
             client.create_collection(collection_name=collection_name,
-                vectors_config={"": models.VectorParams(size=model_dense.size,distance=models.Distance.COSINE)
-                                })
+                vectors_config=dense_vectors, **collection_kwargs(profile))
     
         elif mode == "sparse" :
             client.create_collection(collection_name=collection_name,
                 sparse_vectors_config={"langchain-sparse": models.SparseVectorParams()
-                                })
+                                }, **collection_kwargs(profile))
 
         elif mode == "both" :
             client.create_collection(collection_name=collection_name,
-                vectors_config={"": models.VectorParams(size=model_dense.size, distance=models.Distance.COSINE)},
+                vectors_config=dense_vectors,
                 sparse_vectors_config={"langchain-sparse": models.SparseVectorParams()
-                                })
+                                }, **collection_kwargs(profile))
         else : 
             raise ValueError(f"Unsupported mode '{mode}'. Use one of: dense, sparse, both.")
+
+        create_payload_indexes(client, collection_name, profile)
         
         return collections_config
 
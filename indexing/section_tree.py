@@ -0,0 +1,220 @@
+"""
+Section tree index.
+
+Array-backed view of the document structure recorded by preprocessing.parsing
+(source / type / title / subtitle / subsection / subsubsection), built once at ingest and saved as
+data/section_tree.npz. Chunks are stored in file order, so a paragraph and a section are
+contiguous position ranges:
+- `paragraph[i]`: paragraph group of chunk i (chunks split from the same paragraph share it),
+- `section[i]`: deepest section of chunk i, `section_start`/`section_end`: its chunk range,
+- `section_parent[s]`: parent section of section s (-1 for a document root),
+  `subtree_start`/`subtree_end`: chunk range of section s and all its subsections,
+- `tokens[i]`: approximate token count of chunk i, for expansion budgets.
+
+Build it:
+    python -m indexing.section_tree
+"""
+
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+METADATA_FILE = ROOT / "data" / "metadatas"
+TREE_FILE = ROOT / "data" / "section_tree.npz"
+
+LEVELS = ("title", "subtitle", "subsection", "subsubsection")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count (~1.3 tokens per word for English regulatory text).
+    """
+    return int(len(text.split()) * 1.3) + 1
+
+
+def strip_empty_levels(path: tuple) -> tuple:
+    while len(path) > 2 and not path[-1]:
+        path = path[:-1]
+    return path
+
+
+def section_path(chunk: Dict) -> tuple:
+    """
+    (source, type, title, subtitle, ...) without the trailing empty levels.
+    """
+    return strip_empty_levels((chunk.get("source"), chunk.get("type")) + tuple(chunk.get(level) for level in LEVELS))
+
+
+def build_section_tree(chunks: Optional[List[Dict]] = None, path: Optional[str] = None) -> "SectionTree":
+    """
+    Build and save the section tree of the chunks.
+
+    Args:
+        chunks: Chunk dicts in file order (defaults to data/metadatas)
+        path: Output npz file (defaults to data/section_tree.npz)
+
+    Returns:
+        The loaded SectionTree
+    """
+    if chunks is None:
+        with open(METADATA_FILE, "r", encoding="utf-8") as f:
+            chunks = json.load(f)
+
+    n = len(chunks)
+    paragraph = np.empty(n, dtype=np.int32)
+    section = np.empty(n, dtype=np.int32)
+    tokens = np.empty(n, dtype=np.int32)
+
+    sections: Dict[tuple, int] = {}
+    parents: List[int] = []
+
+    def section_index(key: tuple) -> int:
+        if key not in sections:
+            parent = section_index(strip_empty_levels(key[:-1])) if len(key) > 2 else -1 # Parents are registered first
+            sections[key] = len(parents)
+            parents.append(parent)
+        return sections[key]
+
+    group = -1
+    for i, chunk in enumerate(chunks):
+        if not chunk.get("chunk_id") or i == 0 or section_path(chunk) != section_path(chunks[i - 1]):
+            group += 1 # chunk_id 0 starts a new paragraph, the next ones were split from it
+        paragraph[i] = group
+        section[i] = section_index(section_path(chunk))
+        tokens[i] = estimate_tokens(chunk.get("content") or "")
+
+    # Chunk ranges per section, without and with its subsections (sections are contiguous in file order)
+    section_start = np.full(len(parents), -1, dtype=np.int32)
+    section_end = np.full(len(parents), -1, dtype=np.int32)
+    subtree_start = np.full(len(parents), -1, dtype=np.int32)
+    subtree_end = np.full(len(parents), -1, dtype=np.int32)
+    for i in range(n):
+        s = section[i]
+        if section_start[s] < 0:
+            section_start[s] = i
+        section_end[s] = i + 1
+        while s >= 0:
+            if subtree_start[s] < 0:
+                subtree_start[s] = i
+            subtree_end[s] = i + 1
+            s = parents[s]
+
+    path = Path(path) if path else TREE_FILE
+    np.savez_compressed(
+        path,
+        ids=np.array([chunk["qdrant_id"] for chunk in chunks]),
+        paragraph=paragraph,
+        section=section,
+        tokens=tokens,
+        section_parent=np.array(parents, dtype=np.int32),
+        section_start=section_start,
+        section_end=section_end,
+        subtree_start=subtree_start,
+        subtree_end=subtree_end,
+    )
+    return SectionTree(path)
+
+
+class SectionTree:
+    """
+    Section tree loaded from data/section_tree.npz.
+
+    Args:
+        path: npz file built by build_section_tree
+
+    Raises:
+        FileNotFoundError: If the tree wasn't built
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        path = Path(path) if path else TREE_FILE
+        if not path.exists():
+            raise FileNotFoundError(f"Section tree {path} not built: run `python -m indexing.section_tree`")
+        data = np.load(path)
+        self.ids = data["ids"]
+        self.paragraph = data["paragraph"]
+        self.section = data["section"]
+        self.tokens = data["tokens"]
+        self.section_parent = data["section_parent"]
+        self.section_start = data["section_start"]
+        self.section_end = data["section_end"]
+        self.subtree_start = data["subtree_start"]
+        self.subtree_end = data["subtree_end"]
+        self.positions = {str(point_id): i for i, point_id in enumerate(self.ids)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def position(self, point_id) -> Optional[int]:
+        return self.positions.get(str(point_id))
+
+    def paragraph_range(self, pos: int) -> range:
+        """
+        Positions of the chunks split from the same paragraph as chunk `pos`.
+        """
+        start, end = pos, pos + 1
+        while start > 0 and self.paragraph[start - 1] == self.paragraph[pos]:
+            start -= 1
+        while end < len(self.ids) and self.paragraph[end] == self.paragraph[pos]:
+            end += 1
+        return range(start, end)
+
+    def siblings(self, pos: int) -> range:
+        """
+        Positions of the chunks of the same (deepest) section as chunk `pos`.
+        """
+        s = self.section[pos]
+        return range(self.section_start[s], self.section_end[s])
+
+    def ancestors(self, pos: int, levels: int) -> List[range]:
+        """
+        Chunk ranges of up to `levels` ancestor sections of chunk `pos` (subsections included), closest first.
+        The document root (source and type) isn't a section: it would add the whole document.
+        """
+        ranges = []
+        s = self.section_parent[self.section[pos]]
+        while s >= 0 and self.section_parent[s] >= 0 and len(ranges) < levels:
+            ranges.append(range(self.subtree_start[s], self.subtree_end[s]))
+            s = self.section_parent[s]
+        return ranges
+
+    def expansion(self, pos: int, mode: str = "paragraph", window: int = 1, levels: int = 1) -> List[int]:
+        """
+        Candidate positions to add around chunk `pos`, most relevant first.
+
+        Args:
+            pos: Position of the retrieved chunk
+            mode: "paragraph" (rest of its paragraph), "neighbours" (paragraph, then `window` chunks on
+                each side within the section) or "section" (paragraph, then the whole section, then
+                the rest of its parent sections up to `levels` levels up, closest first)
+            window: Number of neighbours on each side for "neighbours"
+            levels: Parent levels added by "section" (0 to stay within the chunk's own section)
+        """
+        if mode not in ("paragraph", "neighbours", "section"):
+            raise ValueError(f"Unknown expansion mode: '{mode}'. Use 'paragraph', 'neighbours' or 'section'.")
+
+        candidates = [p for p in self.paragraph_range(pos) if p != pos]
+        if mode == "paragraph":
+            return candidates
+
+        scopes = [self.siblings(pos)]
+        if mode == "section":
+            scopes += self.ancestors(pos, levels)
+
+        seen = set(candidates)
+        for scope in scopes:
+            limit = window if mode == "neighbours" else len(scope)
+            for offset in range(1, limit + 1):
+                for p in (pos - offset, pos + offset):
+                    if scope.start <= p < scope.stop and p not in seen:
+                        seen.add(p)
+                        candidates.append(p)
+        return candidates
+
+
+if __name__ == "__main__":
+    tree = build_section_tree()
+    print(f"{len(tree)} chunks in {len(tree.section_parent)} sections saved to {TREE_FILE}")
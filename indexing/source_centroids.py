@@ -0,0 +1,92 @@
+"""
+Source centroids.
+
+Mean dense vector of the chunks of each source (metadata.source: "IFRS_9", "IFRS_13", ...), read
+from the vectors stored in Qdrant (no re-embedding) and saved as data/source_centroids.json.
+retriever.source_router compares query embeddings to them to guess which regulation a question
+is about when it doesn't name one.
+
+Built by upload_points, or:
+    python -m indexing.source_centroids
+"""
+
+import json
+import math
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from qdrant_client import QdrantClient
+
+ROOT = Path(__file__).resolve().parent.parent
+CENTROIDS_FILE = ROOT / "data" / "source_centroids.json"
+
+
+def normalize(vector: List[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vector))
+    return [x / norm for x in vector] if norm else list(vector)
+
+
+def build_source_centroids(client: QdrantClient, collection_name: str = "RAG", vector_name: str = "",
+                           path: Optional[str] = None, batch_size: int = 256) -> Optional[Dict[str, List[float]]]:
+    """
+    Compute and save the unit-length centroid of each source's dense vectors.
+
+    Args:
+        client: QdrantClient
+        collection_name: Collection (or alias) holding the chunks
+        vector_name: Name of the dense vector ("" for LangChain collections)
+        path: Output JSON file (defaults to data/source_centroids.json)
+        batch_size: Points read per request
+
+    Returns:
+        {source: centroid}, None if the collection has no dense vector
+    """
+    vectors = client.get_collection(collection_name).config.params.vectors
+    if not isinstance(vectors, dict) or vector_name not in vectors:
+        return None
+
+    sums: Dict[str, List[float]] = {}
+    counts: Dict[str, int] = {}
+    offset = None
+    while True:
+        points, offset = client.scroll(collection_name=collection_name, limit=batch_size, offset=offset,
+                                       with_payload=["metadata.source"], with_vectors=[vector_name])
+        for point in points:
+            source = ((point.payload or {}).get("metadata") or {}).get("source")
+            vector = (point.vector or {}).get(vector_name)
+            if source is None or vector is None:
+                continue
+            if source not in sums:
+                sums[source] = [0.0] * len(vector)
+                counts[source] = 0
+            sums[source] = [a + b for a, b in zip(sums[source], vector)]
+            counts[source] += 1
+        if offset is None:
+            break
+
+    centroids = {source: normalize(total) for source, total in sums.items()}
+    path = Path(path) if path else CENTROIDS_FILE
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"collection": collection_name, "counts": counts, "centroids": centroids}, f)
+    return centroids
+
+
+def load_source_centroids(path: Optional[str] = None) -> Optional[Dict[str, List[float]]]:
+    """
+    {source: centroid} saved by build_source_centroids, None if it wasn't built.
+    """
+    path = Path(path) if path else CENTROIDS_FILE
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["centroids"]
+
+
+if __name__ == "__main__":
+    from indexing.qdrant import get_qdrant_client
+
+    centroids = build_source_centroids(get_qdrant_client())
+    if centroids is None:
+        print("The collection has no dense vector, nothing to build")
+    else:
+        print(f"{len(centroids)} source centroids saved to {CENTROIDS_FILE}: {', '.join(sorted(centroids))}")
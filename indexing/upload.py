@@ -1,8 +1,33 @@
 from tqdm import tqdm
-from langchain_core.documents import Document
 from pathlib import Path
 import json
 
+from indexing.collections_config import bump_collection_version
+from indexing.chunk_record import ChunkRecord, records_to_documents
+from indexing.paragraph_index import INDEX_FILE, assign_paragraphs, build_paragraph_index
+from indexing.section_tree import TREE_FILE, build_section_tree
+from indexing.chunk_store import STORE_FILE, build_chunk_store
+from indexing.source_centroids import CENTROIDS_FILE, build_source_centroids
+from indexing.matryoshka import fill_short_vectors, get_short_dim
+
+#Files derived from the indexed chunks, read next to the collection at query time
+ARTIFACT_FILES = (INDEX_FILE, TREE_FILE, STORE_FILE, CENTROIDS_FILE)
+
+def transfo_list_into_records(list_chunk, use_prefix: bool = False, prefix: str = "passage: ") :
+    """
+    Transform list of chunks into compact ChunkRecord objects (see indexing.chunk_record).
+
+    Args:
+        list_chunk: List of dictionaries containing document data
+        use_prefix: Whether to add a prefix to the page_content (default: False)
+        prefix: The prefix to add if use_prefix=True (default: "passage: ")
+
+    Returns:
+        Tuple of (records, list_ids)
+    """
+    records = [ChunkRecord.from_chunk(elem, prefix if use_prefix else "") for elem in list_chunk]
+    return records, [record.id for record in records]
+
 def transfo_list_into_Document(list_chunk, use_prefix: bool = False, prefix: str = "passage: ") :
     """
     Transform list of chunks into LangChain Document objects.
@@ -15,32 +40,36 @@ def transfo_list_into_Document(list_chunk, use_prefix: bool = False, prefix: str
     Returns:
         Tuple of (docs, list_ids)
     """
-    docs = []
-    list_ids = []
-    for elem in list_chunk :
-        # Get content and optionally add prefix
-        content = elem.get("content")
-        if use_prefix and content:
-            content = prefix + content
-
-        doc = Document(page_content=content,
-                       metadata = {
-                        "source": elem.get("source"),
-                        "type": elem.get("type"),
-                        "title": elem.get("title"),
-                        "subtitle": elem.get("subtitle"),
-                        "subsection": elem.get("subsection"),
-                        "subsubsection": elem.get("subsubsection"),
-                        "chunk_id" : elem.get("chunk_id")
-                       })
-
-        docs.append(doc)
-
-        list_ids.append(elem.get("qdrant_id"))
-
-    return docs, list_ids
-
-def upload_points(vector_store, batch_size: int = 50, use_prefix: bool = False, prefix: str = "passage: ") :
+    records, list_ids = transfo_list_into_records(list_chunk, use_prefix=use_prefix, prefix=prefix)
+    return records_to_documents(records), list_ids
+
+def build_artifacts(client, collection_name: str, list_docs, records, ids, directory=None) :
+    """
+    Build the lookup files of a collection (ARTIFACT_FILES).
+
+    Args:
+        client: QdrantClient holding the collection
+        collection_name: Collection the chunks were uploaded to (read for the source centroids)
+        list_docs: Chunk dictionaries of data/metadatas
+        records: Their ChunkRecords
+        ids: Their point IDs
+        directory: Output directory (default: data/, the files read by the retrievers)
+    """
+    paths = [Path(directory) / file.name for file in ARTIFACT_FILES] if directory else [None] * len(ARTIFACT_FILES)
+    if directory :
+        Path(directory).mkdir(parents=True, exist_ok=True)
+    index_path, tree_path, store_path, centroids_path = paths
+
+    #Exact lookup table for queries citing a paragraph
+    build_paragraph_index(list_docs, path=index_path)
+    #Chunk positions in the section hierarchy, for context expansion
+    build_section_tree(list_docs, path=tree_path)
+    #Local copy of the payloads, for payload-light searches
+    build_chunk_store(records, ids, path=store_path)
+    #Mean dense vector per regulation, for source routing
+    build_source_centroids(client, collection_name, path=centroids_path)
+
+def upload_points(vector_store, batch_size: int = 50, use_prefix: bool = False, prefix: str = "passage: ", artifacts_dir=None) :
     """
     Upload documents to the vector store.
 
@@ -50,6 +79,7 @@ def upload_points(vector_store, batch_size: int = 50, use_prefix: bool = False,
         use_prefix: Whether to add a prefix to document content (default: False)
                    Set to True for models like snowflake-arctic-embed that require prefixes
         prefix: The prefix to add to documents (default: "passage: ")
+        artifacts_dir: Directory of the lookup files built after the upload (default: data/, see build_artifacts)
 
     Example:
         # Without prefix (for models like bge-base-en-v1.5)
@@ -63,14 +93,26 @@ def upload_points(vector_store, batch_size: int = 50, use_prefix: bool = False,
     with open(file, "r", encoding="utf-8") as f:
         list_docs = json.load(f)
 
-    docs, ids = transfo_list_into_Document(list_docs, use_prefix=use_prefix, prefix=prefix)
+    assign_paragraphs(list_docs) #Metadata files written before the paragraph field existed
+
+    records, ids = transfo_list_into_records(list_docs, use_prefix=use_prefix, prefix=prefix)
 
     for i in tqdm(range(0, len(ids), batch_size), desc="Uploading batches"):
-        chunk = docs[i:i+batch_size]
+        chunk = records_to_documents(records[i:i+batch_size]) #Documents only live for their batch
         batch_ids = ids[i:i+batch_size]
         vector_store.add_documents(
             documents=chunk,
             ids=batch_ids,
         )
 
+    #Truncated vectors are computed from the stored full ones
+    short_dim = get_short_dim(vector_store.client, vector_store.collection_name)
+    if short_dim :
+        fill_short_vectors(vector_store.client, vector_store.collection_name, short_dim)
+
+    #Points changed, invalidate every retrieval cache built on this collection
+    bump_collection_version(vector_store.collection_name)
+
+    build_artifacts(vector_store.client, vector_store.collection_name, list_docs, records, ids, directory=artifacts_dir)
+
     return
\ No newline at end of file
@@ -0,0 +1,297 @@
+"""
+Per-stage tracing and metrics for the RAG pipeline.
+
+Stages (embed, search, rerank, format, prompt_eval, generate) are recorded as spans and events
+(cache hits, tokens...) as counters. Everything goes to an in-process `Collector`, optionally to
+a JSONL file, and can be exported in Prometheus text format.
+
+Tracing is disabled by default: `span()` then returns a shared no-op context manager and
+`incr()` returns immediately, so instrumented code pays one global lookup per call.
+
+Example:
+    from monitoring.tracing import enable_tracing
+
+    tracer = enable_tracing(jsonl_path="traces.jsonl")
+    chain.invoke("query: What is the main objective of IFRS 9?")
+    print(tracer.collector.summary())
+    print(tracer.collector.to_prometheus())
+"""
+
+import contextvars
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from functools import wraps
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from langchain_core.callbacks import BaseCallbackHandler
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Collector:
+    """
+    In-process store of the latest spans and of all counters.
+
+    Args:
+        max_spans: Number of spans kept (oldest are dropped), bounds memory on long-running apps.
+    """
+
+    def __init__(self, max_spans: int = 10000):
+        self.spans = deque(maxlen=max_spans)
+        self.counters: Dict[str, float] = defaultdict(float)
+        self._lock = threading.Lock()
+
+    def add_span(self, record: dict):
+        with self._lock:
+            self.spans.append(record)
+
+    def incr(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] += value
+
+    def durations(self) -> Dict[str, List[float]]:
+        """
+        Span durations in ms grouped by span name.
+        """
+        with self._lock:
+            spans = list(self.spans)
+        grouped = defaultdict(list)
+        for record in spans:
+            grouped[record["name"]].append(record["duration_ms"])
+        return grouped
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """
+        Count, total and p50/p90/p99 duration (ms) per span name, plus the counters.
+        """
+        summary = {}
+        for name, values in self.durations().items():
+            p50, p90, p99 = np.percentile(values, [50, 90, 99])
+            summary[name] = {"count": len(values), "total_ms": float(sum(values)),
+                             "p50": float(p50), "p90": float(p90), "p99": float(p99)}
+        summary["counters"] = dict(self.counters)
+        return summary
+
+    def to_prometheus(self, prefix: str = "rag") -> str:
+        """
+        Export spans as a summary metric and counters as counter metrics, in Prometheus text format.
+        """
+        lines = [
+            f"# HELP {prefix}_span_duration_seconds Duration of RAG pipeline stages.",
+            f"# TYPE {prefix}_span_duration_seconds summary",
+        ]
+        for name, values in sorted(self.durations().items()):
+            for quantile, value in zip(("0.5", "0.9", "0.99"), np.percentile(values, [50, 90, 99])):
+                lines.append(f'{prefix}_span_duration_seconds{{span="{name}",quantile="{quantile}"}} {value / 1000:.6f}')
+            lines.append(f'{prefix}_span_duration_seconds_sum{{span="{name}"}} {sum(values) / 1000:.6f}')
+            lines.append(f'{prefix}_span_duration_seconds_count{{span="{name}"}} {len(values)}')
+
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value:g}")
+
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            self.spans.clear()
+            self.counters.clear()
+
+
+class JsonlExporter:
+    """
+    Append every span and counter increment as one JSON line to a file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def export(self, record: dict):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "attributes", "start", "token", "parent")
+
+    def __init__(self, tracer, name: str, attributes: dict):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self):
+        self.parent = _current_span.get()
+        self.token = _current_span.set(self.name)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        _current_span.reset(self.token)
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        self.tracer.record(self.name, self.start, end, parent=self.parent, **self.attributes)
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Tracer:
+    """
+    Record spans and counters to a collector and to the optional exporters.
+    """
+
+    def __init__(self, collector: Optional[Collector] = None, exporters: Optional[list] = None):
+        self.collector = collector if collector is not None else Collector()
+        self.exporters = exporters or []
+
+    def span(self, name: str, **attributes) -> _Span:
+        return _Span(self, name, attributes)
+
+    def record(self, name: str, start: float, end: float, parent: Optional[str] = None, **attributes):
+        """
+        Record an already measured span (perf_counter timestamps), e.g. from callbacks.
+        """
+        record = {"type": "span", "name": name, "parent": parent, "time": time.time(),
+                  "duration_ms": (end - start) * 1000, **attributes}
+        self.collector.add_span(record)
+        for exporter in self.exporters:
+            exporter.export(record)
+
+    def incr(self, name: str, value: float = 1):
+        self.collector.incr(name, value)
+        for exporter in self.exporters:
+            exporter.export({"type": "counter", "name": name, "time": time.time(), "value": value})
+
+    def close(self):
+        for exporter in self.exporters:
+            exporter.close()
+
+
+_tracer: Optional[Tracer] = None
+
+
+def enable_tracing(jsonl_path: Optional[str] = None, max_spans: int = 10000) -> Tracer:
+    """
+    Turn tracing on for the whole process and return the tracer (its collector holds the results).
+    """
+    global _tracer
+    exporters = [JsonlExporter(jsonl_path)] if jsonl_path else []
+    _tracer = Tracer(Collector(max_spans=max_spans), exporters)
+    return _tracer
+
+
+def disable_tracing():
+    global _tracer
+    if _tracer is not None:
+        _tracer.close()
+    _tracer = None
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _tracer
+
+
+def span(name: str, **attributes):
+    """
+    Context manager timing a stage, no-op when tracing is disabled.
+    """
+    tracer = _tracer
+    if tracer is None:
+        return _NOOP_SPAN
+    return tracer.span(name, **attributes)
+
+
+def incr(name: str, value: float = 1):
+    """
+    Increment a counter, no-op when tracing is disabled.
+    """
+    tracer = _tracer
+    if tracer is not None:
+        tracer.incr(name, value)
+
+
+def traced(name: str) -> Callable:
+    """
+    Decorator wrapping a function call in a span.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """
+    LangChain callback turning LLM calls into `prompt_eval` and `generate` spans and token counters.
+
+    `prompt_eval` goes from the call start to the first streamed token, `generate` from the first
+    token to the end. LLMs from LLM.llm.import_llm stream; for one that doesn't, the whole call is
+    recorded as `generate` and generated tokens are counted from the output with `count_tokens`.
+
+    Args:
+        count_tokens: Optional function returning the number of tokens of a prompt (e.g. `llm.get_num_tokens`).
+    """
+
+    def __init__(self, count_tokens: Optional[Callable[[str], int]] = None):
+        self.count_tokens = count_tokens
+        self._runs = {}
+
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        if _tracer is None:
+            return
+        self._runs[run_id] = {"start": time.perf_counter(), "first_token": None, "tokens": 0}
+        if self.count_tokens is not None:
+            incr("prompt_tokens", sum(self.count_tokens(prompt) for prompt in prompts))
+
+    def on_llm_new_token(self, token: str, *, run_id, **kwargs):
+        run = self._runs.get(run_id)
+        if run is None:
+            return
+        if run["first_token"] is None:
+            run["first_token"] = time.perf_counter()
+        run["tokens"] += 1
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        run = self._runs.pop(run_id, None)
+        tracer = _tracer
+        if run is None or tracer is None:
+            return
+
+        end = time.perf_counter()
+        if run["first_token"] is not None:
+            tracer.record("prompt_eval", run["start"], run["first_token"])
+            tracer.record("generate", run["first_token"], end, tokens=run["tokens"])
+            tracer.incr("generated_tokens", run["tokens"])
+        else:
+            tracer.record("generate", run["start"], end)
+            if self.count_tokens is not None:
+                tracer.incr("generated_tokens", sum(self.count_tokens(generation.text)
+                                                    for generations in response.generations for generation in generations))
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._runs.pop(run_id, None)
@@ -98,6 +98,7 @@ def chunking_text(
                 "subtitle": elem.get("subtitle"),
                 "subsection": elem.get("subsection"),
                 "subsubsection": elem.get("subsubsection"),
+                "paragraph": elem.get("paragraph"),
                 "qdrant_id" : str(id_),
                 "chunk_id": idx,
                 "content": context_header + chunk
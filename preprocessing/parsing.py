@@ -55,6 +55,7 @@ def parse(text, name, appendix = False):
 
             for it in items:
 #            block = split_numbered_items(block,item_pattern)
+                m = item_pattern.match(it) #Paragraph number, used for direct lookups (indexing.paragraph_index)
                 final.append({
                 "source": source, 
                 "type": txt_type, 
@@ -62,6 +63,7 @@ def parse(text, name, appendix = False):
                 "subtitle": current_subtitle,
                 "subsection": current_subsection,
                 "subsubsection": current_subsub,
+                "paragraph": m.group(1).rstrip(".") if m else None,
                 "content": it
              })
 
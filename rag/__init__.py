@@ -7,6 +7,6 @@ This module contains the RAG chain components including:
 - Utilities for document formatting
 """
 
-from rag.chain import create_rag_chain, get_rag_response
+from rag.chain import create_rag_chain
 
-__all__ = ["create_rag_chain", "get_rag_response"]
+__all__ = ["create_rag_chain"]
@@ -5,18 +5,23 @@ This module contains the main RAG chain construction and execution logic.
 """
 
 from typing import Optional, Dict, Any, List
-from langchain_core.runnables import RunnablePassthrough, RunnableParallel
+from langchain_core.runnables import RunnablePassthrough, RunnableParallel, RunnableBranch, RunnableLambda
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.documents import Document
 
-from prompts import get_prompt_template
-from utils import format_docs, deduplicate_docs, prepare_response_with_sources
 import sys
 from pathlib import Path
 
 # Add parent directory to path to import retriever module
 sys.path.insert(0, str(Path(__file__).parent.parent))
+from rag.prompts import get_prompt_template, REFUSAL_MESSAGE
+from rag.generation import GenerationController, is_refusal
+from rag.extractive import ExtractiveAnswerer
+from rag.compression import ContextCompressor
+from rag.utils import format_docs, deduplicate_docs, prepare_response_with_sources, parse_structured_answer, map_citations
 from retriever.final_retriever import production_retriever
+from monitoring.tracing import span, TracingCallbackHandler
+from scheduling.cpu_budget import stage
 
 
 def create_rag_chain(
@@ -25,18 +30,46 @@ def create_rag_chain(
     prompt_type: str = "default",
     k: int = 6,
     threshold: float = 0.6,
-    include_sources: bool = False
+    include_sources: bool = False,
+    cache=None,
+    generation_control: bool = True,
+    structured_output: bool = False,
+    extractive_fast_path=False,
+    multi_query: bool = False,
+    multi_query_budget_ms: float = 250,
+    compress_context=False,
+    context_budget: int = 800
 ):
     """
     Create a complete RAG chain.
 
     Args:
-        llm: Language model to use for generation
+        llm: Language model to use for generation (from LLM.llm.import_llm, or LLM.server.RemoteLLM
+            to target resident worker processes)
         retriever: Optional custom retriever. If None, uses production retriever
         prompt_type: Type of prompt template ("default", "detailed", "comparison", "definition")
         k: Number of documents to retrieve (if using default retriever)
         threshold: Similarity threshold for retrieval (if using default retriever)
         include_sources: Whether to include source information in the response
+        cache: Optional RetrievalCache used by the default retriever (see retriever.cache)
+        generation_control: Enforce the prompt type's token budget, sentence limit and stop sequences
+            (rag.prompts.GENERATION_CONFIGS), and answer the refusal message without generating when
+            nothing is retrieved
+        structured_output: Generate a JSON answer with the numbers of the cited sources (grammar-constrained
+            with llama.cpp, uses the "structured" prompt type). The response then also contains "citations",
+            "cited_documents" and "cited_chunk_ids", and sources are taken from the cited documents only
+        extractive_fast_path: Answer definition-style questions with the best sentences of the top
+            document (with its citation) without calling the LLM when the reranker is confident.
+            True for the default thresholds, or an ExtractiveAnswerer. The response then contains
+            "fast_path" (True when the LLM was skipped)
+        multi_query: Also search rule-based variants of the question (IFRS synonyms, keywords) concurrently and
+            fuse the results (default retriever only, see retriever.multi_query)
+        multi_query_budget_ms: Retrieval time budget of multi_query, late variant searches are dropped
+        compress_context: Before generation, keep only the sentences of the retrieved documents most similar
+            to the question (scored with the retriever's dense model), within context_budget tokens. True for
+            the default compressor, or a ContextCompressor (see rag.compression). "retrieved_documents" then
+            holds the compressed documents, as given to the LLM
+        context_budget: Approximate token budget of the compressed context
 
     Returns:
         Configured RAG chain ready for invocation. The chain always returns
@@ -47,25 +80,71 @@ def create_rag_chain(
     """
     # Get retriever
     if retriever is None:
-        retriever = production_retriever(k=k, threshold=threshold)
+        retriever = production_retriever(k=k, threshold=threshold, cache=cache, multi_query=multi_query,
+                                         multi_query_budget_ms=multi_query_budget_ms)
 
     # Get prompt template
+    if structured_output:
+        prompt_type = "structured"
     prompt = get_prompt_template(prompt_type)
 
+    # Records prompt_eval / generate spans when tracing is enabled (see monitoring.tracing)
+    llm_traced = llm
+    if hasattr(llm, "with_config"):
+        llm_traced = llm.with_config(callbacks=[TracingCallbackHandler(count_tokens=getattr(llm, "get_num_tokens", None))])
+
+    extractive = extractive_fast_path
+    if extractive_fast_path is True:
+        extractive = ExtractiveAnswerer()
+
+    compressor = compress_context
+    if compress_context is True:
+        compressor = ContextCompressor(token_budget=context_budget)
+
     def retrieve_and_format(question):
-        docs = deduplicate_docs(retriever.invoke(question))
+        with span("search"):
+            docs = deduplicate_docs(retriever.invoke(question))
+        answered = extractive.try_answer(question, docs) if extractive else None
+        if compressor and answered is None: # Only the LLM reads the context
+            docs = compressor.compress(question, docs)
+        with span("format"):
+            context = format_docs(docs)
         return {
-            "context": format_docs(docs),
+            "context": context,
             "question": question,
             "_docs": docs,
+            "_extractive": answered,
         }
 
-    def model_chain():
-        return (
+    def generate(prompt_value, config):
+        with stage("llm"): # Waits for the LLM's CPU slot when a budget is enabled (see scheduling.cpu_budget)
+            return llm_traced.invoke(prompt_value, config=config)
+
+    def generation_chain():
+        if not generation_control:
+            return (
+                {"context": lambda x: x["context"], "question": lambda x: x["question"]}
+                | prompt
+                | RunnableLambda(generate)
+                | StrOutputParser()
+            )
+
+        controller = GenerationController(llm_traced, prompt_type, client=getattr(llm, "client", None),
+                                          forward_schema=getattr(llm, "accepts_json_schema", False))
+        return RunnableBranch(
+            (lambda x: not x["_docs"], lambda x: REFUSAL_MESSAGE), # Nothing retrieved, no need to run the LLM
             {"context": lambda x: x["context"], "question": lambda x: x["question"]}
             | prompt
-            | llm
-            | StrOutputParser()
+            | controller.as_runnable(),
+        )
+
+    def model_chain():
+        if not extractive:
+            return generation_chain()
+
+        return RunnableBranch(
+            (lambda x: x["_extractive"] is not None, lambda x: x["_extractive"]["answer"]), # Answer taken from the top document
+            generation_chain(),
         )
 
     def base_parallel():
@@ -78,13 +157,39 @@ def create_rag_chain(
             context=lambda x: x["context"],
             question=lambda x: x["question"],
             _docs=lambda x: x["_docs"],
+            fast_path=lambda x: x["_extractive"] is not None,
             prompt_input=lambda x: {"context": x["context"], "question": x["question"]},
         )
 
+    def parse_citations(output):
+        """
+        Split the structured answer into text and cited documents (no regex pass over free text needed).
+        """
+        if not structured_output:
+            return output
+        answer, citations = parse_structured_answer(output["answer"])
+        if not answer or is_refusal(answer):
+            answer, citations = REFUSAL_MESSAGE, []
+        return {
+            **output,
+            "answer": answer,
+            "citations": citations,
+            "cited_documents": map_citations(citations, output.get("_docs", [])),
+        }
+
+    def add_citations(response, output):
+        if extractive:
+            response["fast_path"] = output["fast_path"]
+        if structured_output:
+            response["citations"] = output["citations"]
+            response["cited_documents"] = output["cited_documents"]
+            response["cited_chunk_ids"] = [doc.metadata.get("_id") for doc in output["cited_documents"]]
+        return response
+
     def process_output_with_sources(output):
         answer = output["answer"]
         docs = output.get("_docs", [])
-        response = prepare_response_with_sources(answer, docs)
+        response = prepare_response_with_sources(answer, output["cited_documents"] if structured_output else docs)
         response.update(
             {
                 "context": output.get("context"),
@@ -93,21 +198,22 @@ def create_rag_chain(
                 "prompt_input": output.get("prompt_input"),
             }
         )
-        return response
+        return add_citations(response, output)
 
     def process_output_without_sources(output):
-        return {
+        response = {
             "answer": output["answer"],
             "context": output.get("context"),
             "question": output.get("question"),
             "retrieved_documents": output.get("_docs", []),
             "prompt_input": output.get("prompt_input"),
         }
+        return add_citations(response, output)
 
     # Create the chain based on whether we need sources
     if include_sources:
-        chain = retrieve_and_format | base_parallel() | process_output_with_sources
+        chain = retrieve_and_format | base_parallel() | parse_citations | process_output_with_sources
     else:
-        chain = retrieve_and_format | base_parallel() | process_output_without_sources
+        chain = retrieve_and_format | base_parallel() | parse_citations | process_output_without_sources
 
     return chain
\ No newline at end of file
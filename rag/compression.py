@@ -0,0 +1,124 @@
+"""
+Query-relevance context compression.
+
+Prompt evaluation on CPU scales with every token of the context, and most of a ~400-token chunk is
+usually unrelated to the question. Before generation, the sentences of the retrieved chunks are
+scored against the question with the dense embedding model the retriever already loaded (one batch,
+cosine similarities as a single matrix product), and only the best ones are kept within a token
+budget:
+- every kept document keeps its "SOURCE | section | paragraph" header and its best sentence first,
+  so its [Source i] number and paragraph reference survive,
+- the rest of the budget goes to the best remaining sentences of the kept documents,
+- kept sentences stay in their original order.
+
+Documents are processed in rank order and the first one whose best sentence doesn't fit ends the
+context, so the kept documents are a prefix of the retrieved ones and their numbering is unchanged.
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from indexing.section_tree import estimate_tokens
+from monitoring.tracing import incr, span
+from rag.extractive import CHUNK_HEADER, PARAGRAPH_NUMBER, SENTENCE_SPLIT
+
+
+def split_chunk(content: str) -> Tuple[str, List[str]]:
+    """
+    Split a chunk's text into its header ("IFRS_9 | Objective | 5.5.3 ") and its sentences.
+    """
+    content = content.strip()
+    header = CHUNK_HEADER.match(content)
+    end = header.end() if header else 0
+    number = PARAGRAPH_NUMBER.match(content[end:])  # Anchored with ^, so not match(content, end)
+    end += number.end() if number else 0
+    sentences = [sentence.strip() for sentence in SENTENCE_SPLIT.split(content[end:]) if sentence.strip()]
+    return content[:end], sentences
+
+
+def default_embeddings(collection_name: str = "RAG"):
+    """
+    Dense model of a collection in collections.yaml (the retriever's instance, models are loaded once per process).
+    """
+    from retriever.retrievers import get_collection_config, load_dense_model
+
+    dense = get_collection_config(collection_name).get("dense")
+    if not dense:
+        raise ValueError(f"Dense embeddings not configured for '{collection_name}', pass an embedding model.")
+    return load_dense_model(dense["name"], dense.get("variant", "fp32"))
+
+
+class ContextCompressor:
+    """
+    Keep the sentences of the retrieved documents most similar to the question, within a token budget.
+
+    Args:
+        embeddings: Dense embedding model (the "RAG" collection's model, loaded on first use, if None)
+        token_budget: Maximum approximate tokens of the compressed documents' contents
+        prefix: Prefix added to the sentences before embedding (e.g. "passage: " for models indexed with it)
+    """
+
+    def __init__(self, embeddings=None, token_budget: int = 800, prefix: str = ""):
+        self.embeddings = embeddings
+        self.token_budget = token_budget
+        self.prefix = prefix
+
+    def similarities(self, question: str, sentences: List[str]) -> np.ndarray:
+        """
+        Cosine similarity of each sentence to the question, the question and sentences embedded in one batch.
+        """
+        if self.embeddings is None:
+            self.embeddings = default_embeddings()
+
+        # FastEmbed embeds queries and documents alike, the question is embedded as is ("query: " prefix kept)
+        vectors = np.asarray(self.embeddings.embed_documents([question] + [self.prefix + s for s in sentences]), dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+        return vectors[1:] @ vectors[0]
+
+    def compress(self, question: str, docs: List[Document]) -> List[Document]:
+        """
+        Compressed copies of the documents (metadata kept, plus "compressed": True), unchanged if they fit the budget.
+        """
+        chunks = [split_chunk(doc.page_content) for doc in docs]
+        costs = [[estimate_tokens(sentence) for sentence in sentences] for _, sentences in chunks]
+        if sum(estimate_tokens(header) + sum(cost) for (header, _), cost in zip(chunks, costs)) <= self.token_budget:
+            return docs
+
+        with span("compress", documents=len(docs)):
+            owners = [(i, j) for i, (_, sentences) in enumerate(chunks) for j in range(len(sentences))]
+            if not owners:
+                return docs
+            scores = self.similarities(question, [chunks[i][1][j] for i, j in owners])
+            order = np.argsort(-scores, kind="stable")
+
+            best = {}
+            for position in order:  # Best sentence of each document
+                best.setdefault(owners[position][0], owners[position][1])
+
+            kept = [set() for _ in docs]
+            used, n_docs = 0, 0
+            for i, (header, _) in enumerate(chunks):
+                cost = estimate_tokens(header) + (costs[i][best[i]] if i in best else 0)
+                if used + cost > self.token_budget and n_docs:
+                    break
+                if i in best:
+                    kept[i].add(best[i])
+                used += cost
+                n_docs += 1
+
+            for position in order:  # Then the best remaining sentences of the kept documents
+                i, j = owners[position]
+                if i < n_docs and j not in kept[i] and used + costs[i][j] <= self.token_budget:
+                    kept[i].add(j)
+                    used += costs[i][j]
+
+        incr("compressed_documents", n_docs)
+        return [
+            Document(
+                page_content=chunks[i][0] + " ".join(chunks[i][1][j] for j in sorted(kept[i])),
+                metadata={**docs[i].metadata, "compressed": True},
+            )
+            for i in range(n_docs)
+        ]
@@ -0,0 +1,141 @@
+"""
+Extractive fast path for the RAG chain.
+
+Definition-style questions ("What is the objective of IFRS 9?", "What is meant by ...?") are often
+answered verbatim by a single chunk. When the reranker is confident about that chunk (high top
+score and clear margin over the runner-up), the best-matching sentences of the chunk are returned
+directly with their citation, and the LLM is not called at all.
+"""
+
+import re
+from typing import Dict, List, Optional
+
+from langchain_core.documents import Document
+
+from monitoring.tracing import span
+from scheduling.cpu_budget import budget_ranker, stage
+
+# Questions asking for a definition, objective or meaning
+DEFINITION_PATTERN = re.compile(
+    r"^(?:what\s+(?:is|are)\s+(?:the\s+)?(?:definition|meaning|main\s+objective|objective|purpose)\b"
+    r"|what\s+(?:is|are)\s+(?:an?\s+|the\s+)?[\w\s'-]{1,60}\?$"
+    r"|what\s+is\s+meant\s+by\b"
+    r"|what\s+does\s+.+\s+mean\b"
+    r"|how\s+(?:is|are)\s+.+\s+defined\b"
+    r"|define\b"
+    r"|definition\s+of\b)",
+    re.IGNORECASE,
+)
+QUERY_PREFIX = re.compile(r"^\s*query\s*:\s*", re.IGNORECASE)
+CHUNK_HEADER = re.compile(r"^(?:[^|\n]*\|){2}\s*")  # "IFRS_9 | Objective | "
+PARAGRAPH_NUMBER = re.compile(r"^[A-Z]{0,2}\d+(?:\.\d+)*[A-Z]?\s+")  # "1 ", "5.5.3 ", "B3.2.1 "
+SENTENCE_SPLIT = re.compile(r"(?<!\be\.g)(?<!\bi\.e)(?<=[.;])\s+(?=[A-Z(])")
+WORD = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = {
+    "a", "an", "the", "of", "to", "in", "on", "for", "and", "or", "is", "are", "be", "by", "with",
+    "what", "which", "how", "does", "do", "when", "under", "according", "that", "this", "as", "at",
+    "it", "its", "meant", "mean", "define", "defined", "definition", "ifrs", "ias", "standard",
+}
+
+
+def is_definition_question(question: str) -> bool:
+    return bool(DEFINITION_PATTERN.match(QUERY_PREFIX.sub("", question).strip()))
+
+
+def content_words(text: str) -> set:
+    return {word for word in WORD.findall(text.lower()) if word not in STOPWORDS}
+
+
+def chunk_sentences(content: str) -> List[str]:
+    """
+    Split a chunk's text into sentences, without the "SOURCE | section |" header and paragraph number.
+    """
+    text = PARAGRAPH_NUMBER.sub("", CHUNK_HEADER.sub("", content.strip()))
+    return [sentence.strip() for sentence in SENTENCE_SPLIT.split(text) if sentence.strip()]
+
+
+def best_sentences(question: str, content: str, max_sentences: int = 2) -> List[str]:
+    """
+    Sentences of the chunk with the highest lexical overlap with the question, in their original order.
+    """
+    query_words = content_words(QUERY_PREFIX.sub("", question))
+    sentences = chunk_sentences(content)
+    if not query_words or not sentences:
+        return []
+
+    scores = [len(query_words & content_words(sentence)) / len(query_words) for sentence in sentences]
+    top = sorted(range(len(sentences)), key=lambda i: scores[i], reverse=True)[:max_sentences]
+    return [sentences[i] for i in sorted(top) if scores[i] > 0]
+
+
+class ExtractiveAnswerer:
+    """
+    Decide whether a question can be answered extractively from the retrieved documents.
+
+    Uses the documents' `rerank_score` metadata when the retriever reranked them (retrieve_FlashrankReranker),
+    otherwise reranks the top candidates with its own FlashRank model (loaded on first use).
+
+    Args:
+        min_score: Minimum rerank score of the best document
+        min_margin: Minimum gap between the best and second best rerank scores
+        max_sentences: Maximum number of sentences returned
+        min_overlap: Minimum share of the question's content words found in the returned sentences
+        ranker: Optional already loaded flashrank.Ranker
+        model_name: FlashRank model loaded when no ranker is given
+    """
+
+    def __init__(self, min_score: float = 0.9, min_margin: float = 0.3, max_sentences: int = 2,
+                 min_overlap: float = 0.5, ranker=None, model_name: str = "ms-marco-TinyBERT-L-2-v2"):
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self.max_sentences = max_sentences
+        self.min_overlap = min_overlap
+        self.ranker = ranker
+        self.model_name = model_name
+
+    def rerank_scores(self, question: str, docs: List[Document], top_n: int = 5) -> List[float]:
+        if all("rerank_score" in doc.metadata for doc in docs):
+            return [doc.metadata["rerank_score"] for doc in docs]
+
+        from flashrank import Ranker, RerankRequest
+        if self.ranker is None:
+            self.ranker = budget_ranker(Ranker(model_name=self.model_name))
+
+        candidates = docs[:top_n]
+        passages = [{"id": i, "text": doc.page_content} for i, doc in enumerate(candidates)]
+        with span("rerank", candidates=len(passages)), stage("rerank"):
+            results = self.ranker.rerank(RerankRequest(query=QUERY_PREFIX.sub("", question), passages=passages))
+
+        scores = [0.0] * len(docs)
+        for result in results:
+            scores[result["id"]] = float(result["score"])
+        return scores
+
+    def try_answer(self, question: str, docs: List[Document]) -> Optional[Dict]:
+        """
+        Return {"answer", "source_index", "score", "margin"} if the fast path applies, None otherwise.
+        `source_index` starts at 1, as the [Source i] numbering of rag.utils.format_docs.
+        """
+        if not docs or not is_definition_question(question):
+            return None
+
+        with span("extractive"):
+            scores = self.rerank_scores(question, docs)
+            ranked = sorted(range(len(docs)), key=lambda i: scores[i], reverse=True)
+            best = ranked[0]
+            margin = scores[best] - (scores[ranked[1]] if len(ranked) > 1 else 0.0)
+            if scores[best] < self.min_score or margin < self.min_margin:
+                return None
+
+            sentences = best_sentences(question, docs[best].page_content, self.max_sentences)
+            query_words = content_words(QUERY_PREFIX.sub("", question))
+            if not sentences or len(query_words & content_words(" ".join(sentences))) < self.min_overlap * len(query_words):
+                return None
+
+        return {
+            "answer": f"{' '.join(sentences)} [Source {best + 1}]",
+            "source_index": best + 1,
+            "score": scores[best],
+            "margin": margin,
+        }
@@ -0,0 +1,127 @@
+"""
+Generation control for the RAG chain.
+
+Enforces the per-template limits of `rag.prompts.GENERATION_CONFIGS` so small models stop as soon
+as the answer is complete instead of rambling until the token cap:
+- token budget (max_tokens) and stop sequences,
+- early termination once `max_sentences` sentences are complete (llama.cpp stopping criteria),
+- refusal short-circuit: generation stops as soon as the model starts the refusal message,
+  and no generation at all when nothing was retrieved,
+- JSON output constrained by a llama.cpp grammar for the structured prompt type.
+"""
+
+import json
+import re
+from typing import Optional
+
+from langchain_core.runnables import RunnableLambda
+
+from rag.prompts import REFUSAL_MESSAGE, get_generation_config
+from scheduling.cpu_budget import stage
+
+# End of sentence: ., ! or ? followed by a space or the end of the text (not "e.g." / "i.e.")
+SENTENCE_END = re.compile(r"(?<!\be\.g)(?<!\bi\.e)[.!?](?=\s|$)")
+REFUSAL_PREFIX = "i cannot find sufficient information"
+
+
+def count_sentences(text: str) -> int:
+    return len(SENTENCE_END.findall(text.strip()))
+
+
+def truncate_sentences(text: str, max_sentences: Optional[int]) -> str:
+    """
+    Keep the first `max_sentences` sentences of text.
+    """
+    if not max_sentences:
+        return text
+    for i, match in enumerate(SENTENCE_END.finditer(text)):
+        if i + 1 == max_sentences:
+            return text[:match.end()]
+    return text
+
+
+def is_refusal(text: str) -> bool:
+    return text.strip().lower().startswith(REFUSAL_PREFIX)
+
+
+class SentenceStoppingCriteria:
+    """
+    llama.cpp stopping criteria: stop once `max_sentences` sentences are complete or a refusal started.
+
+    llama.cpp calls it after each sampled token with every token evaluated so far; the first call
+    gives the prompt length. One instance per generation.
+    """
+
+    def __init__(self, client, max_sentences: Optional[int]):
+        self.client = client
+        self.max_sentences = max_sentences
+        self.prompt_len = None
+
+    def __call__(self, input_ids, logits) -> bool:
+        if self.prompt_len is None:
+            self.prompt_len = len(input_ids)
+            return False
+
+        text = self.client.detokenize(list(input_ids[self.prompt_len:])).decode("utf-8", errors="ignore")
+        if is_refusal(text):
+            return True
+        return self.max_sentences is not None and count_sentences(text) >= self.max_sentences
+
+
+class GenerationController:
+    """
+    Wrap an LLM with the generation limits of a prompt type.
+
+    With a llama.cpp LLM (LangChain `LlamaCpp`, which exposes `client`) the sentence limit stops
+    generation early; with any other LLM only max_tokens and stop sequences are passed, and
+    the answer is trimmed afterwards.
+
+    Args:
+        llm: LLM (or LLM runnable) used for generation
+        prompt_type: Key of rag.prompts.GENERATION_CONFIGS
+        client: llama_cpp.Llama used to detokenize in the stopping criteria (defaults to llm.client)
+        forward_schema: Pass the JSON schema of the prompt type to the LLM call as `json_schema`, for LLMs
+            without a local client that build the grammar themselves (LLM.server.RemoteLLM)
+    """
+
+    def __init__(self, llm, prompt_type: str = "default", client=None, forward_schema: bool = False):
+        self.llm = llm
+        self.config = get_generation_config(prompt_type)
+        self.client = client if client is not None else getattr(llm, "client", None)
+        self.forward_schema = forward_schema
+
+        # Grammar compiled once, reused by every call
+        self.grammar = None
+        if self.config.get("json_schema") and self.client is not None:
+            from llama_cpp import LlamaGrammar
+            self.grammar = LlamaGrammar.from_json_schema(json.dumps(self.config["json_schema"]), verbose=False)
+
+    def generate(self, prompt_value, config=None) -> str:
+        kwargs = {"max_tokens": self.config["max_tokens"]}
+        if self.config["stop"]:
+            kwargs["stop"] = self.config["stop"]
+
+        if self.grammar is not None:
+            kwargs["grammar"] = self.grammar
+        elif self.forward_schema and self.config.get("json_schema"):
+            kwargs["json_schema"] = self.config["json_schema"]
+        elif self.client is not None:
+            from llama_cpp import StoppingCriteriaList
+            kwargs["stopping_criteria"] = StoppingCriteriaList([SentenceStoppingCriteria(self.client, self.config["max_sentences"])])
+
+        with stage("llm"):
+            output = self.llm.invoke(prompt_value, config=config, **kwargs)
+        return self.finalize(getattr(output, "content", output))
+
+    def finalize(self, text: str) -> str:
+        """
+        Trim the answer to the sentence limit and normalize refusals (structured output is parsed by the chain).
+        """
+        if self.config.get("json_schema"):
+            return text.strip()
+        if is_refusal(text):
+            return REFUSAL_MESSAGE
+        return truncate_sentences(text, self.config["max_sentences"]).strip()
+
+    def as_runnable(self) -> RunnableLambda:
+        return RunnableLambda(self.generate)
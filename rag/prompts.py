@@ -7,6 +7,9 @@ when working with IFRS standards documentation.
 
 from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
 
+# Answer expected from the model when the context is not enough (also returned without generation when nothing is retrieved)
+REFUSAL_MESSAGE = "I cannot find sufficient information to answer this question accurately."
+
 # Default RAG prompt for IFRS standards
 DEFAULT_RAG_TEMPLATE = """You are a financial expert assistant specializing in International Financial Reporting Standards (IFRS).
 Your provide accurate answers derived directly using the provided context (from the IFRS documentation).
@@ -44,13 +47,79 @@ Provide a detailed analysis that includes:
 
 Analysis:"""
 
+# Structured prompt: answer + cited source numbers as JSON (constrained by STRUCTURED_ANSWER_SCHEMA with llama.cpp)
+STRUCTURED_RAG_TEMPLATE = """You are a financial expert assistant specializing in International Financial Reporting Standards (IFRS).
+Your provide accurate answers derived directly using the provided context (from the IFRS documentation).
+
+Context from IFRS standards:
+{context}
+
+Question: {question}
+
+Instructions:
+- Be precise and use technical terminology when appropriate
+- Answer briefly in 3 sentences max, using the information provided in the context above
+- If the context doesn't contain enough information to answer the question, answer "I cannot find sufficient information to answer this question accurately." with no citations
+- Reply only with a JSON object: {{"answer": "<your answer>", "citations": [<numbers of the sources used>]}}
+
+JSON:"""
+
+# JSON schema of the structured answer, at most 5 cited sources
+STRUCTURED_ANSWER_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "answer": {"type": "string"},
+        "citations": {"type": "array", "items": {"type": "integer"}, "maxItems": 5},
+    },
+    "required": ["answer", "citations"],
+}
+
+# Generation limits per template, enforced by rag.generation.GenerationController:
+# - max_tokens: hard token budget of the answer
+# - max_sentences: stop as soon as this many sentences are complete (None = no limit)
+# - stop: stop sequences (the model starting a new prompt section)
+# - json_schema: constrain the output to this schema (llama.cpp grammar)
+GENERATION_CONFIGS = {
+    "default": {
+        "max_tokens": 192,
+        "max_sentences": 3,
+        "stop": ["\nQuestion:", "\nContext", "\nInstructions:", "\n\n\n"],
+    },
+    "detailed": {
+        "max_tokens": 768,
+        "max_sentences": None,
+        "stop": ["\nQuestion:", "\nContext:", "\n\n\n\n"],
+    },
+    "structured": {
+        "max_tokens": 256,
+        "max_sentences": None,
+        "stop": [],
+        "json_schema": STRUCTURED_ANSWER_SCHEMA,
+    },
+}
+
+
+def get_generation_config(template_type: str = "default") -> dict:
+    """
+    Get the generation limits (max_tokens, max_sentences, stop) of a prompt type.
+    """
+    if template_type not in GENERATION_CONFIGS:
+        raise ValueError(
+            f"Unknown template type: {template_type}. "
+            f"Available options: {', '.join(GENERATION_CONFIGS.keys())}"
+        )
+
+    return dict(GENERATION_CONFIGS[template_type])
+
+
 def get_prompt_template(template_type: str = "default") -> ChatPromptTemplate:
     """
     Get a prompt template based on the specified type.
     """
     templates = {
         "default": DEFAULT_RAG_TEMPLATE,
-        "detailed": DETAILED_ANALYSIS_TEMPLATE
+        "detailed": DETAILED_ANALYSIS_TEMPLATE,
+        "structured": STRUCTURED_RAG_TEMPLATE
     }
 
     if template_type not in templates:
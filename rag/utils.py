@@ -5,7 +5,9 @@ This module contains helper functions for document formatting,
 context preparation, and response processing.
 """
 
-from typing import List, Dict, Any
+import json
+import re
+from typing import List, Dict, Any, Tuple
 from langchain_core.documents import Document
 
 
@@ -111,7 +113,7 @@ def extract_source_info(docs: List[Document]) -> List[Dict[str, Any]]:
 
 def deduplicate_docs(docs: List[Document]) -> List[Document]:
     """
-    Remove duplicate documents based on their IDs.
+    Remove duplicate documents based on their IDs, in one pass (first occurrence kept, order preserved).
 
     Args:
         docs: List of documents
@@ -119,19 +121,12 @@ def deduplicate_docs(docs: List[Document]) -> List[Document]:
     Returns:
         List of documents with duplicates removed
     """
-    seen_ids = set()
-    deduped = []
-
+    unique = {}
     for doc in docs:
-        doc_id = doc.metadata.get('_id', None)
-        if doc_id and doc_id not in seen_ids:
-            seen_ids.add(doc_id)
-            deduped.append(doc)
-        elif not doc_id:
-            # If no ID, keep the document anyway
-            deduped.append(doc)
+        # If no ID, keep the document anyway
+        unique.setdefault(doc.metadata.get('_id') or id(doc), doc)
 
-    return deduped
+    return list(unique.values())
 
 
 def create_context_dict(question: str, retriever) -> Dict[str, str]:
@@ -173,3 +168,47 @@ def prepare_response_with_sources(answer: str, docs: List[Document]) -> Dict[str
         "sources": sources,
         "num_sources": len(docs)
     }
+
+
+def parse_structured_answer(text: str) -> Tuple[str, List[int]]:
+    """
+    Parse a structured answer ({"answer": ..., "citations": [...]}) generated by the LLM.
+
+    Falls back to the raw text and the "[Source i]" references it contains if the output isn't valid JSON
+    (LLM without grammar support, truncated generation).
+
+    Args:
+        text: Raw LLM output
+
+    Returns:
+        Tuple of (answer, cited source numbers starting at 1)
+    """
+    try:
+        data = json.loads(text)
+        answer = str(data.get("answer", "")).strip()
+        citations = [int(i) for i in data.get("citations", []) if isinstance(i, (int, float, str)) and str(i).isdigit()]
+    except (ValueError, AttributeError, TypeError):
+        answer = text.strip()
+        citations = [int(i) for i in re.findall(r"\[Source (\d+)", text)]
+
+    return answer, citations
+
+
+def map_citations(citations: List[int], docs: List[Document]) -> List[Document]:
+    """
+    Map cited source numbers (as numbered by format_docs) to the retrieved documents, in one pass.
+
+    Args:
+        citations: Cited source numbers, starting at 1
+        docs: Retrieved documents in the order given to the LLM
+
+    Returns:
+        Cited documents without duplicates, in citation order (out of range numbers are ignored)
+    """
+    cited = []
+    seen = set()
+    for i in citations:
+        if 1 <= i <= len(docs) and i not in seen:
+            seen.add(i)
+            cited.append(docs[i - 1])
+    return cited
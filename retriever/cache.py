@@ -0,0 +1,203 @@
+"""
+Retrieval result cache.
+
+Keeps the chunk IDs and scores returned for a (normalized query, retrieval mode, k, threshold,
+filter, collection version) key, so repeated questions (UI reruns, evaluation sweeps) skip
+both embedding models and the Qdrant round trip.
+"""
+
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+from indexing.chunk_record import ChunkRecord
+from indexing.collections_config import get_collection_version
+from monitoring.tracing import incr
+
+COLLECTIONS_YAML = Path(__file__).resolve().parent.parent / "indexing" / "collections.yaml"
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a query for cache lookups (unicode form, case, surrounding and repeated whitespace).
+    """
+    query = unicodedata.normalize("NFKC", query)
+    return re.sub(r"\s+", " ", query).strip().casefold()
+
+
+def serialize_filter(filter) -> str:
+    """
+    Turn a Qdrant filter (pydantic model, dict or None) into a stable string usable in a cache key.
+    """
+    if filter is None:
+        return ""
+    if hasattr(filter, "model_dump_json"):
+        return filter.model_dump_json(exclude_none=True)
+    return json.dumps(filter, sort_keys=True, default=str)
+
+
+class RetrievalCache:
+    """
+    Bounded LRU cache of retrieval results.
+
+    Each entry only stores (chunk id, score) pairs; chunk contents are kept once in a shared
+    table of ChunkRecords (interned section strings) and dropped when no entry references them anymore, so memory stays bounded by
+    `maxsize` entries whatever the overlap between queries.
+
+    Args:
+        maxsize: Maximum number of cached queries.
+    """
+
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[tuple, List[Tuple[str, Optional[float]]]]" = OrderedDict()
+        self._chunks: Dict[str, ChunkRecord] = {}
+        self._refcount: Dict[str, int] = {}
+        self._versions: Dict[str, int] = {}
+        self._yaml_mtime: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def collection_version(self, collection_name: str) -> int:
+        """
+        Current version of the collection, re-read from collections.yaml only when the file changed.
+        The whole cache is dropped as soon as one version moves.
+        """
+        mtime = os.stat(COLLECTIONS_YAML).st_mtime if COLLECTIONS_YAML.exists() else None
+
+        with self._lock:
+            if mtime != self._yaml_mtime:
+                self._yaml_mtime = mtime
+                versions = {name: get_collection_version(name) for name in self._versions}
+                if versions != self._versions:  # Stale entries could never be hit again, free them now
+                    self._clear()
+                self._versions = versions
+
+            if collection_name not in self._versions:
+                self._versions[collection_name] = get_collection_version(collection_name)
+
+            return self._versions[collection_name]
+
+    def make_key(self, query: str, retrieval_mode: str, k: int, threshold, filter, collection_name: str) -> tuple:
+        return (
+            normalize_query(query),
+            retrieval_mode,
+            k,
+            threshold,
+            serialize_filter(filter),
+            collection_name,
+            self.collection_version(collection_name),
+        )
+
+    def get(self, key: tuple) -> Optional[List[Document]]:
+        with self._lock:
+            hits = self._entries.get(key)
+            if hits is None:
+                self.misses += 1
+                incr("cache_misses")
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            incr("cache_hits")
+
+            # New Documents (and metadata dicts) each time, downstream steps (reranker) write into metadata
+            return [self._chunks[chunk_id].to_document(score) for chunk_id, score in hits]
+
+    def put(self, key: tuple, docs_and_scores: List[Tuple[Document, Optional[float]]]):
+        with self._lock:
+            if key in self._entries:
+                self._release(self._entries.pop(key))
+
+            hits = []
+            for doc, score in docs_and_scores:
+                chunk_id = doc.metadata.get("_id") or doc.page_content
+                if chunk_id not in self._chunks:
+                    self._chunks[chunk_id] = ChunkRecord.from_document(doc, exclude=("score", "rerank_score"))
+                self._refcount[chunk_id] = self._refcount.get(chunk_id, 0) + 1
+                hits.append((chunk_id, score))
+
+            self._entries[key] = hits
+
+            while len(self._entries) > self.maxsize:
+                _, evicted = self._entries.popitem(last=False)
+                self._release(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        self._entries.clear()
+        self._chunks.clear()
+        self._refcount.clear()
+
+    def _release(self, hits):
+        for chunk_id, _ in hits:
+            self._refcount[chunk_id] -= 1
+            if self._refcount[chunk_id] == 0:
+                del self._refcount[chunk_id]
+                del self._chunks[chunk_id]
+
+
+class CachedRetriever:
+    """
+    Wrap a LangChain `VectorStoreRetriever` so results are served from a `RetrievalCache`
+    (or any retriever with `search_kwargs` and a `search_with_scores(query)` method).
+
+    On a miss, the search is run with scores (relevance scores for the threshold search, raw
+    scores otherwise) so the cache can store (id, score) pairs; returned documents carry the
+    score in `metadata["score"]`.
+    """
+
+    def __init__(self, retriever, cache: RetrievalCache, retrieval_mode: str, collection_name: str = "RAG"):
+        self.retriever = retriever
+        self.cache = cache
+        self.retrieval_mode = retrieval_mode
+        self.collection_name = collection_name
+
+    def invoke(self, query: str) -> List[Document]:
+        search_kwargs = dict(self.retriever.search_kwargs)
+        key = self.cache.make_key(
+            query,
+            self.retrieval_mode,
+            search_kwargs.get("k"),
+            search_kwargs.get("score_threshold"),
+            search_kwargs.get("filter"),
+            self.collection_name,
+        )
+
+        docs = self.cache.get(key)
+        if docs is not None:
+            return docs
+
+        if hasattr(self.retriever, "search_with_scores"):
+            docs_and_scores = self.retriever.search_with_scores(query)
+        elif self.retriever.search_type == "similarity_score_threshold":
+            docs_and_scores = self.retriever.vectorstore.similarity_search_with_relevance_scores(query, **search_kwargs)
+        else:
+            search_kwargs.pop("score_threshold", None)
+            docs_and_scores = self.retriever.vectorstore.similarity_search_with_score(query, **search_kwargs)
+
+        self.cache.put(key, docs_and_scores)
+
+        docs = []
+        for doc, score in docs_and_scores:
+            doc.metadata["score"] = score
+            docs.append(doc)
+        return docs
+
+
+# Process-wide cache: module state survives Streamlit reruns, unlike objects created in the script
+default_cache = RetrievalCache()
@@ -0,0 +1,160 @@
+"""
+Federated search over several collections.
+
+Per-regulator collections (e.g. IFRS, Basel, EBA, ECB entries of collections.yaml) can be scaled and
+re-indexed independently; FederatedRetriever queries the selected ones concurrently and merges
+their results:
+- the query is embedded once per embedding model, not once per collection,
+- raw scores aren't comparable across collections (cosine, RRF, sparse dot products), so they are
+  normalized per collection before the merge ("minmax", "rrf" or "none"),
+- a global deadline bounds the whole search: collections that haven't answered in time are left
+  out and the results of the others are returned.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_qdrant import RetrievalMode
+from qdrant_client import models
+
+from indexing.profiles import search_params
+from monitoring.tracing import incr, span
+from retriever.retrievers import get_collection_config, load_vector_stores_from_config, points_to_documents, search_points
+
+RRF_K = 60
+
+# Shared by every FederatedRetriever: a slow collection keeps at most one worker busy per query
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="federated")
+
+
+def normalize_scores(scores: List[float], method: str = "minmax") -> List[float]:
+    """
+    Normalize the scores of one collection's results (best first).
+
+    Args:
+        scores: Raw scores, best first
+        method: "minmax" (best -> 1, worst -> 0, 1 for a single result), "rrf" (1 / (60 + rank)) or "none"
+    """
+    if method == "none":
+        return list(scores)
+    if method == "rrf":
+        return [1.0 / (RRF_K + rank) for rank in range(1, len(scores) + 1)]
+    if method == "minmax":
+        if not scores:
+            return []
+        high, low = max(scores), min(scores)
+        return [1.0 if high == low else (score - low) / (high - low) for score in scores]
+    raise ValueError(f"Unknown normalization '{method}'. Use one of: minmax, rrf, none.")
+
+
+class FederatedRetriever:
+    """
+    Query several collections concurrently and merge their results by normalized score.
+
+    Documents carry `_collection_name`, the normalized `score` and the collection's `raw_score`.
+
+    Args:
+        vector_stores: {collection_name: QdrantVectorStore}
+        k: Number of documents returned after the merge
+        per_collection_k: Results requested from each collection (k if None)
+        threshold: Minimum relevance score in every collection, before normalization, as in the
+            "similarity_score_threshold" search type (None for no threshold)
+        filter: Optional Qdrant filter applied in every collection
+        normalization: "minmax", "rrf" or "none" (see normalize_scores)
+        deadline: Seconds allowed for the whole search; collections answering later are skipped
+        collection_search_params: {collection_name: SearchParams} (e.g. from the collection profiles)
+    """
+
+    def __init__(self, vector_stores: Dict, k: int = 20, per_collection_k: Optional[int] = None,
+                 threshold: Optional[float] = None, filter: Optional[models.Filter] = None,
+                 normalization: str = "minmax", deadline: float = 2.0,
+                 collection_search_params: Optional[Dict[str, models.SearchParams]] = None):
+        normalize_scores([], normalization)  # Fail early on an unknown method
+        self.vector_stores = vector_stores
+        self.k = k
+        self.per_collection_k = per_collection_k or k
+        self.threshold = threshold
+        self.filter = filter
+        self.normalization = normalization
+        self.deadline = deadline
+        self.collection_search_params = collection_search_params or {}
+
+    @classmethod
+    def from_config(cls, collection_names: List[str], retrieval_mode: Optional[str] = None, client=None, **kwargs) -> "FederatedRetriever":
+        """
+        Build from collections.yaml entries, with the search parameters of each collection's profile.
+        """
+        vector_stores = load_vector_stores_from_config(collection_names, client=client, force_retrieval_mode=retrieval_mode)
+        params = {name: search_params(get_collection_config(name).get("profile")) for name in collection_names}
+        return cls(vector_stores, collection_search_params={name: p for name, p in params.items() if p is not None}, **kwargs)
+
+    def embed(self, query: str, collection_names: List[str]) -> Dict[str, Tuple]:
+        """
+        (dense, sparse) query embeddings of each collection, computed once per embedding model.
+        """
+        computed, vectors = {}, {}
+        for name in collection_names:
+            store = self.vector_stores[name]
+            mode = store.retrieval_mode
+            dense = sparse = None
+            if mode in (RetrievalMode.DENSE, RetrievalMode.HYBRID):
+                model = store.embeddings
+                if id(model) not in computed:
+                    computed[id(model)] = model.embed_query(query)
+                dense = computed[id(model)]
+            if mode in (RetrievalMode.SPARSE, RetrievalMode.HYBRID):
+                model = store.sparse_embeddings
+                if id(model) not in computed:
+                    computed[id(model)] = model.embed_query(query)
+                sparse = computed[id(model)]
+            vectors[name] = (dense, sparse)
+        return vectors
+
+    def search_collection(self, name: str, query: str, dense, sparse) -> List[Document]:
+        store = self.vector_stores[name]
+        points = search_points(store, query, k=self.per_collection_k, query_filter=self.filter, relevance_threshold=self.threshold,
+                               dense_vector=dense, sparse_vector=sparse,
+                               search_params=self.collection_search_params.get(name) if store.retrieval_mode != RetrievalMode.SPARSE else None)
+        return points_to_documents(points, store.collection_name)
+
+    def search_with_scores(self, query: str, collections: Optional[List[str]] = None) -> List[Tuple[Document, float]]:
+        """
+        Search the selected collections (all of them if None) and merge their results.
+        """
+        start = time.monotonic()
+        names = [name for name in (collections or self.vector_stores) if name in self.vector_stores]
+
+        with span("federated_search", collections=len(names)):
+            vectors = self.embed(query, names)
+            futures = [_executor.submit(self.search_collection, name, query, *vectors[name]) for name in names]
+            done, pending = wait(futures, timeout=max(self.deadline - (time.monotonic() - start), 0))
+
+        for future in pending:
+            future.cancel()  # Running searches can't be interrupted, their results are dropped
+            incr("federated_timeouts")
+
+        merged, errors = [], []
+        for future in futures:  # Collection order, so ties merge deterministically
+            if future not in done:
+                continue
+            if future.exception() is not None:
+                incr("federated_errors")
+                errors.append(future.exception())
+                continue
+            docs = future.result()
+            raw = [doc.metadata.get("score") or 0.0 for doc in docs]
+            for doc, raw_score, score in zip(docs, raw, normalize_scores(raw, self.normalization)):
+                doc.metadata["raw_score"] = raw_score
+                doc.metadata["score"] = score
+                merged.append((doc, score))
+
+        if errors and len(errors) == len(done) and not pending:
+            raise errors[0]  # Every collection failed: not a partial result
+
+        merged.sort(key=lambda pair: pair[1], reverse=True)
+        return merged[:self.k]
+
+    def invoke(self, query: str, collections: Optional[List[str]] = None) -> List[Document]:
+        return [doc for doc, _ in self.search_with_scores(query, collections)]
@@ -1,29 +1,106 @@
-from retriever.retrievers import load_vector_store_from_config
+import warnings
+
+from retriever.retrievers import load_vector_store_from_config, get_collection_config
+from retriever.matryoshka import TwoStageRetriever
+from retriever.payload_light import PayloadLightRetriever
+from retriever.source_router import SourceRoutedRetriever, SourceRouter
+from retriever.federated import FederatedRetriever
+from retriever.multi_query import MultiQueryRetriever
+from indexing.chunk_store import STORE_FILE, ChunkStore
+from indexing.profiles import search_params
 from qdrant_client import models
 from flashrank import Ranker, RerankRequest
+from retriever.cache import CachedRetriever
+from retriever.paragraph_router import with_paragraph_routing
+from retriever.section_expansion import with_section_expansion
+from monitoring.tracing import span
+from scheduling.cpu_budget import budget_ranker, stage
 
 filters = models.Filter(must=[models.FieldCondition(key="metadata.type", match=models.MatchValue(value="main"))])
 
-def production_retriever(k=20, threshold=0.6, retrieval_mode = "hybrid", filter=filters) :
+def default_threshold(retrieval_mode) :
+    """
+    Threshold used by production_retriever when none is given.
+    """
+    if retrieval_mode == "sparse" : #Sparse tend to have a similarity score that isn't bound to [0,1] 
+        return 0
+    elif retrieval_mode == "dense" :
+        return 0.7
+    return 0.6
+
+def production_retriever(k=20, threshold=0.6, retrieval_mode = "hybrid", filter=filters, cache=None, paragraph_lookup=True, expand=None, expand_budget=1500, local_payload=False, route_sources=False, collections=None, deadline=2.0, multi_query=False, multi_query_budget_ms=250) :
+    """
+    Build the production retriever. If a RetrievalCache is given, results are served from it when possible.
+    With paragraph_lookup, queries citing a paragraph ("IFRS 9 paragraph 5.5.3") fetch it directly by ID
+    (see retriever.paragraph_router), whatever the filter.
+    If the collection has truncated vectors (dense.short in collections.yaml), dense search runs in two
+    stages (see retriever.matryoshka).
+    expand ("paragraph", "neighbours" or "section") adds the surrounding chunks of each hit from the section
+    tree, within expand_budget tokens (see retriever.section_expansion); skipped if the tree wasn't built.
+    With local_payload, Qdrant only returns IDs and scores and the chunks are read from the local chunk
+    store built at upload (see retriever.payload_light); payloads come from Qdrant if it wasn't built.
+    With route_sources, the search is restricted to the regulations named in the query or predicted from its
+    embedding, with a global search when unsure (see retriever.source_router).
+    collections (list of collections.yaml entries, e.g. one per regulator) switches to a federated search over
+    them, merged by normalized score within `deadline` seconds (see retriever.federated); the other options
+    apply to the single "RAG" collection and are ignored then.
+    With multi_query, the query and a few rule-based variants are searched concurrently and fused, variants
+    answering after multi_query_budget_ms being dropped (see retriever.multi_query); with route_sources, all
+    of them search the sources routed from the query.
+    """
     
     if not threshold :
-        if retrieval_mode == "hybrid" :
-            threshold = 0.6
-        elif retrieval_mode == "sparse" : #Sparse tend to have a similarity score that isn't bound to [0,1] 
-            threshold = 0
-        elif retrieval_mode == "dense" :
-            threshold = 0.7
+        threshold = default_threshold(retrieval_mode)
+
+    if collections :
+        return FederatedRetriever.from_config(collections, retrieval_mode=retrieval_mode, k=k, threshold=threshold, filter=filter, deadline=deadline)
     
+    if local_payload and not STORE_FILE.exists() :
+        warnings.warn(f"{STORE_FILE} not built (python -m indexing.chunk_store --prefix), payloads are read from Qdrant")
+        local_payload = False
+
     vector_store = load_vector_store_from_config("RAG",force_retrieval_mode=retrieval_mode)
-    retriever = vector_store.as_retriever(search_type="similarity_score_threshold", search_kwargs={"k":k, "score_threshold" : threshold,"filter":filter})
+    search_kwargs = {"k":k, "score_threshold" : threshold,"filter":filter}
+    config = get_collection_config("RAG")
+
+    params = search_params(config.get("profile")) #Quantization rescoring / hnsw_ef of the collection profile
+    if params is not None and retrieval_mode != "sparse" :
+        search_kwargs["search_params"] = params
+
+    short_dim = (config.get("dense") or {}).get("short") if retrieval_mode != "sparse" else None
+    cache_mode = f"{retrieval_mode}+short{short_dim}" if short_dim else retrieval_mode
+    if multi_query :
+        retriever = MultiQueryRetriever(vector_store, k=k, threshold=threshold, filter=filter, budget_ms=multi_query_budget_ms,
+                                        search_params=search_kwargs.get("search_params"), short_dim=short_dim,
+                                        store=ChunkStore() if local_payload else None, router=SourceRouter() if route_sources else None)
+        cache_mode += "+multi+routed" if route_sources else "+multi"
+    elif route_sources :
+        retriever = SourceRoutedRetriever(vector_store, k=k, threshold=threshold, filter=filter, search_params=search_kwargs.get("search_params"),
+                                          short_dim=short_dim, store=ChunkStore() if local_payload else None)
+        cache_mode += "+routed"
+    elif local_payload :
+        retriever = PayloadLightRetriever(vector_store, k=k, threshold=threshold, filter=filter, search_params=search_kwargs.get("search_params"), short_dim=short_dim)
+    elif short_dim :
+        retriever = TwoStageRetriever(vector_store, short_dim, k=k, threshold=threshold, filter=filter, search_params=params)
+    else :
+        retriever = vector_store.as_retriever(search_type="similarity_score_threshold", search_kwargs=search_kwargs)
+
+    if cache is not None :
+        retriever = CachedRetriever(retriever, cache, retrieval_mode=cache_mode, collection_name="RAG")
+
+    if expand :
+        retriever = with_section_expansion(retriever, vector_store.client, collection_name="RAG", mode=expand, token_budget=expand_budget)
+
+    if paragraph_lookup :
+        retriever = with_paragraph_routing(retriever, vector_store, collection_name="RAG")
 
     return retriever
 
 class retrieve_FlashrankReranker:
-    def __init__(self, retriever, model_name="ms-marco-TinyBERT-L-2-v2", top_n=10, threshold=0.5):
+    def __init__(self, retriever, model_name="ms-marco-TinyBERT-L-2-v2", top_n=10, threshold=0.5, ranker=None):
 
         self.retriever = retriever
-        self.ranker = Ranker(model_name=model_name)
+        self.ranker = ranker if ranker is not None else budget_ranker(Ranker(model_name=model_name)) #Pass an already loaded Ranker to share it
         self.top_n = top_n
         self.threshold = threshold
 
@@ -54,7 +131,8 @@ class retrieve_FlashrankReranker:
         passages = [{"id": i, "text": doc.page_content} for i, doc in enumerate(documents)]
 
         rerank_request = RerankRequest(query=query, passages=passages)
-        results = self.ranker.rerank(rerank_request)  # Don't slice yet
+        with span("rerank", candidates=len(passages)), stage("rerank"):
+            results = self.ranker.rerank(rerank_request)  # Don't slice yet
 
         reranked_docs = []
         for result in results:
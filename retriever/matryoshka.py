@@ -0,0 +1,56 @@
+"""
+Two-stage dense retrieval with truncated vectors (see indexing.matryoshka).
+"""
+
+from typing import List, Optional, Tuple
+
+from langchain_core.documents import Document
+from qdrant_client import models
+
+from retriever.retrievers import points_to_documents, search_points
+
+
+class TwoStageRetriever:
+    """
+    Retriever searching the short vectors first, then rescoring `candidates_factor * k` candidates
+    with the full dense vector (fused with the sparse search in hybrid mode).
+
+    Exposes the same `search_kwargs` as a LangChain VectorStoreRetriever so it can be wrapped by
+    retriever.cache.CachedRetriever.
+
+    Args:
+        vector_store: QdrantVectorStore in dense or hybrid mode
+        short_dim: Size of the collection's short vector
+        k: Number of documents returned
+        threshold: Minimum relevance score, as in the "similarity_score_threshold" search type (None for no threshold)
+        filter: Optional Qdrant filter
+        candidates_factor: First-stage pool size, as a multiple of k
+        search_params: Dense search parameters of the collection profile
+    """
+
+    def __init__(self, vector_store, short_dim: int, k: int = 20, threshold: Optional[float] = None,
+                 filter: Optional[models.Filter] = None, candidates_factor: int = 4,
+                 search_params: Optional[models.SearchParams] = None):
+        self.vector_store = vector_store
+        self.short_dim = short_dim
+        self.candidates_factor = candidates_factor
+        self.search_params = search_params
+        self.search_kwargs = {"k": k, "score_threshold": threshold, "filter": filter}
+
+    def search_with_scores(self, query: str) -> List[Tuple[Document, float]]:
+        k = self.search_kwargs["k"]
+        points = search_points(
+            self.vector_store,
+            query,
+            k=k,
+            query_filter=self.search_kwargs["filter"],
+            relevance_threshold=self.search_kwargs["score_threshold"],
+            search_params=self.search_params,
+            short_dim=self.short_dim,
+            candidates=self.candidates_factor * k,
+        )
+        docs = points_to_documents(points, self.vector_store.collection_name)
+        return [(doc, doc.metadata.get("score")) for doc in docs]
+
+    def invoke(self, query: str) -> List[Document]:
+        return [doc for doc, _ in self.search_with_scores(query)]
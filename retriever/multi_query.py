@@ -0,0 +1,171 @@
+"""
+Multi-query retrieval.
+
+The question and a few rule-based variants (retriever.query_expansion) are embedded in one batch per
+model, searched concurrently, then fused with reciprocal rank fusion and de-duplicated by ID in
+one pass.
+
+The original query's search is always used; variant searches only count if they finish within
+`budget_ms` of the call, so expansion can't push retrieval latency past the budget.
+
+With a SourceRouter (retriever.source_router), the sources are predicted once from the original
+query and every variant searches them; if the query's routed search returns fewer than
+`min_results` chunks, the searches are run again over the whole collection.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_qdrant import RetrievalMode
+from qdrant_client import models
+
+from monitoring.tracing import incr, span
+from retriever.payload_light import hydrate_points
+from retriever.query_expansion import expand_query
+from retriever.retrievers import points_to_documents, search_points
+from retriever.source_router import SourceRouter, with_source_filter
+
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="multi_query")
+
+
+def fuse_documents(ranked_lists: List[List[Document]], rrf_k: int = 60) -> List[Document]:
+    """
+    Merge ranked document lists (e.g. one per query variant) with reciprocal rank fusion,
+    de-duplicating by ID in the same pass.
+
+    Args:
+        ranked_lists: Lists of documents, best first
+        rrf_k: RRF constant, a document scores sum(1 / (rrf_k + rank)) over the lists it appears in
+
+    Returns:
+        Unique documents sorted by fused score (stored in metadata["fused_score"])
+    """
+    fused = {}
+    for docs in ranked_lists:
+        for rank, doc in enumerate(docs, 1):
+            key = doc.metadata.get('_id') or id(doc)
+            entry = fused.get(key)
+            if entry is None:
+                fused[key] = entry = [doc, 0.0]
+            entry[1] += 1.0 / (rrf_k + rank)
+
+    ranked = sorted(fused.values(), key=lambda entry: entry[1], reverse=True)
+    for doc, score in ranked:
+        doc.metadata['fused_score'] = score
+    return [doc for doc, _ in ranked]
+
+
+def embed_batch(model, texts: List[str]):
+    """
+    Query embeddings of several texts, in one batch when the model supports it.
+    """
+    if hasattr(model, "embed_queries"):
+        return model.embed_queries(texts)
+    return [model.embed_query(text) for text in texts]
+
+
+class MultiQueryRetriever:
+    """
+    Retriever searching the query and its variants concurrently and fusing the results.
+
+    Exposes the same `search_kwargs` as a LangChain VectorStoreRetriever so it can be wrapped by
+    retriever.cache.CachedRetriever.
+
+    Args:
+        vector_store: QdrantVectorStore (any retrieval mode)
+        k: Number of documents per search and after fusion
+        threshold: Minimum relevance score of each search, as in the "similarity_score_threshold" search type (None for no threshold)
+        filter: Optional Qdrant filter
+        max_variants: Variants searched in addition to the query
+        budget_ms: Time allowed for the whole retrieval; late variant searches are dropped
+        expander: Function returning [query, variant, ...] (retriever.query_expansion.expand_query by default)
+        search_params: Dense search parameters of the collection profile
+        short_dim: Size of the collection's short vector, for a two-stage dense search
+        store: ChunkStore to hydrate payload-less results from (see retriever.payload_light)
+        router: SourceRouter restricting the searches to the query's sources (None for no routing)
+        min_results: Routed searches of the query returning fewer chunks are rerun globally
+    """
+
+    def __init__(self, vector_store, k: int = 20, threshold: Optional[float] = None, filter: Optional[models.Filter] = None,
+                 max_variants: int = 3, budget_ms: float = 250, expander: Optional[Callable[[str, int], List[str]]] = None,
+                 search_params: Optional[models.SearchParams] = None, short_dim: Optional[int] = None, store=None,
+                 router: Optional[SourceRouter] = None, min_results: int = 3):
+        self.vector_store = vector_store
+        self.max_variants = max_variants
+        self.budget_ms = budget_ms
+        self.expander = expander or expand_query
+        self.search_params = search_params
+        self.short_dim = short_dim
+        self.store = store
+        self.router = router
+        self.min_results = min_results
+        self.search_kwargs = {"k": k, "score_threshold": threshold, "filter": filter}
+
+    def search(self, query: str, dense, sparse, query_filter: Optional[models.Filter] = None) -> List[Document]:
+        k = self.search_kwargs["k"]
+        points = search_points(
+            self.vector_store,
+            query,
+            k=k,
+            query_filter=query_filter,
+            relevance_threshold=self.search_kwargs["score_threshold"],
+            with_payload=self.store is None,
+            dense_vector=dense,
+            sparse_vector=sparse,
+            search_params=self.search_params,
+            short_dim=self.short_dim,
+        )
+        collection_name = self.vector_store.collection_name
+        if self.store is None:
+            return points_to_documents(points, collection_name)
+        return hydrate_points(points, self.store, self.vector_store.client, collection_name)
+
+    def search_all(self, queries: List[str], dense, sparse, query_filter: Optional[models.Filter], start: float) -> List[List[Document]]:
+        """
+        Results of the query and of the variants finished within the budget (counted from `start`).
+        """
+        futures = [_executor.submit(self.search, q, d, s, query_filter) for q, d, s in zip(queries, dense, sparse)]
+        remaining = self.budget_ms / 1000 - (time.monotonic() - start)
+        done, _ = wait(futures[1:], timeout=max(remaining, 0))
+        results = [futures[0].result()]  # The query itself is always waited for
+        for future in futures[1:]:
+            if future in done and future.exception() is None:
+                results.append(future.result())
+            else:
+                future.cancel()
+                incr("multi_query_dropped")
+        return results
+
+    def search_with_scores(self, query: str) -> List[Tuple[Document, float]]:
+        start = time.monotonic()
+        queries = self.expander(query, self.max_variants)
+        mode = self.vector_store.retrieval_mode
+        base_filter = self.search_kwargs["filter"]
+
+        with span("multi_query", variants=len(queries) - 1):
+            dense = sparse = [None] * len(queries)
+            if mode in (RetrievalMode.DENSE, RetrievalMode.HYBRID):
+                dense = embed_batch(self.vector_store.embeddings, queries)
+            if mode in (RetrievalMode.SPARSE, RetrievalMode.HYBRID):
+                sparse = embed_batch(self.vector_store.sparse_embeddings, queries)
+
+            results = None
+            if self.router is not None:
+                with span("route_sources"):
+                    sources, method = self.router.route(query, dense[0])
+                incr(f"source_route_{method}")
+                if sources:
+                    results = self.search_all(queries, dense, sparse, with_source_filter(base_filter, sources), start)
+                    if len(results[0]) < self.min_results:
+                        incr("source_route_fallbacks")
+                        results = None
+            if results is None:
+                results = self.search_all(queries, dense, sparse, base_filter, start)
+
+            docs = fuse_documents(results)[:self.search_kwargs["k"]]
+        return [(doc, doc.metadata.get("score")) for doc in docs]
+
+    def invoke(self, query: str) -> List[Document]:
+        return [doc for doc, _ in self.search_with_scores(query)]
@@ -0,0 +1,62 @@
+"""
+Paragraph-reference routing.
+
+Queries citing a paragraph ("IFRS 9 paragraph 5.5.3", "B3.2.1", "3.2.6(a)") are served by fetching
+the chunks of that paragraph by ID (indexing.paragraph_index), skipping embedding, vector search
+and reranking. Every other query goes to the wrapped retriever.
+"""
+
+from typing import List, Optional
+
+from langchain_core.documents import Document
+
+from indexing.paragraph_index import INDEX_FILE, ParagraphIndex
+from monitoring.tracing import incr, span
+from retriever.retrievers import points_to_documents
+
+
+class ParagraphRouterRetriever:
+    """
+    Route paragraph references to an exact lookup, fall back to `retriever` otherwise.
+
+    Args:
+        retriever: Retriever used when the query cites no known paragraph
+        client: QdrantClient used to fetch chunks by ID
+        collection_name: Collection holding the chunks
+        index: ParagraphIndex (loaded from data/paragraph_index.json if None)
+    """
+
+    def __init__(self, retriever, client, collection_name: str = "RAG", index: Optional[ParagraphIndex] = None):
+        self.retriever = retriever
+        self.client = client
+        self.collection_name = collection_name
+        self.index = index if index is not None else ParagraphIndex()
+
+    def fetch(self, ids: List[str]) -> List[Document]:
+        """
+        Fetch chunks by ID, in the order of `ids`.
+        """
+        records = self.client.retrieve(collection_name=self.collection_name, ids=ids, with_payload=True)
+        position = {point_id: i for i, point_id in enumerate(ids)}
+        records = sorted(records, key=lambda record: position.get(str(record.id), len(ids)))
+        return points_to_documents(records, self.collection_name)
+
+    def invoke(self, query: str) -> List[Document]:
+        ids = self.index.lookup(query)
+        if ids:
+            with span("paragraph_lookup", chunks=len(ids)):
+                docs = self.fetch(ids)
+            if docs:
+                incr("paragraph_lookups")
+                return docs
+
+        return self.retriever.invoke(query)
+
+
+def with_paragraph_routing(retriever, vector_store, collection_name: str = "RAG"):
+    """
+    Wrap `retriever` with a ParagraphRouterRetriever, or return it unchanged if the index wasn't built.
+    """
+    if not INDEX_FILE.exists():
+        return retriever
+    return ParagraphRouterRetriever(retriever, vector_store.client, collection_name=collection_name)
@@ -0,0 +1,86 @@
+"""
+Payload-light retrieval.
+
+Qdrant only returns IDs and scores (with_payload=False); page_content and metadata are read from the
+local chunk store (indexing.chunk_store). Points missing from the store (uploaded after it was
+built) are fetched from Qdrant by ID, so results are the same as a regular search.
+"""
+
+from typing import List, Optional, Tuple
+
+from langchain_core.documents import Document
+from qdrant_client import models
+
+from indexing.chunk_store import ChunkStore
+from monitoring.tracing import span
+from retriever.retrievers import points_to_documents, search_points
+
+
+def hydrate_points(points: List[models.ScoredPoint], store: ChunkStore, client, collection_name: str) -> List[Document]:
+    """
+    Documents of payload-less points, shaped like QdrantVectorStore results, in the points' order.
+    """
+    store.refresh()
+    missing = []
+    for point in points:
+        point.payload = store.get(point.id)
+        if point.payload is None:
+            missing.append(point.id)
+
+    if missing:
+        records = client.retrieve(collection_name=collection_name, ids=missing, with_payload=True)
+        payloads = {str(record.id): record.payload for record in records}
+        for point in points:
+            if point.payload is None:
+                point.payload = payloads.get(str(point.id))
+
+    return points_to_documents(points, collection_name)
+
+
+class PayloadLightRetriever:
+    """
+    Retriever asking Qdrant for IDs and scores only and hydrating the Documents from the chunk store.
+
+    Exposes the same `search_kwargs` as a LangChain VectorStoreRetriever so it can be wrapped by
+    retriever.cache.CachedRetriever.
+
+    Args:
+        vector_store: QdrantVectorStore (any retrieval mode)
+        store: ChunkStore (data/chunk_store.bin if None)
+        k: Number of documents returned
+        threshold: Minimum relevance score, as in the "similarity_score_threshold" search type (None for no threshold)
+        filter: Optional Qdrant filter
+        search_params: Dense search parameters of the collection profile
+        short_dim: Size of the collection's short vector, for a two-stage dense search (see retriever.matryoshka)
+        candidates_factor: First-stage pool size with short_dim, as a multiple of k
+    """
+
+    def __init__(self, vector_store, store: Optional[ChunkStore] = None, k: int = 20, threshold: Optional[float] = None,
+                 filter: Optional[models.Filter] = None, search_params: Optional[models.SearchParams] = None,
+                 short_dim: Optional[int] = None, candidates_factor: int = 4):
+        self.vector_store = vector_store
+        self.store = store if store is not None else ChunkStore()
+        self.search_params = search_params
+        self.short_dim = short_dim
+        self.candidates_factor = candidates_factor
+        self.search_kwargs = {"k": k, "score_threshold": threshold, "filter": filter}
+
+    def search_with_scores(self, query: str) -> List[Tuple[Document, float]]:
+        k = self.search_kwargs["k"]
+        points = search_points(
+            self.vector_store,
+            query,
+            k=k,
+            query_filter=self.search_kwargs["filter"],
+            relevance_threshold=self.search_kwargs["score_threshold"],
+            with_payload=False,
+            search_params=self.search_params,
+            short_dim=self.short_dim,
+            candidates=self.candidates_factor * k,
+        )
+        with span("hydrate", points=len(points)):
+            docs = hydrate_points(points, self.store, self.vector_store.client, self.vector_store.collection_name)
+        return [(doc, doc.metadata.get("score")) for doc in docs]
+
+    def invoke(self, query: str) -> List[Document]:
+        return [doc for doc, _ in self.search_with_scores(query)]
@@ -0,0 +1,84 @@
+"""
+Rule-based query expansion.
+
+Builds a few variants of a question without calling an LLM, so multi-aspect questions
+("three types of hedging relationships") also match chunks phrased with other IFRS terms:
+- synonym variants: each IFRS term of SYNONYM_GROUPS found in the question is replaced by an
+  equivalent (abbreviation, spelled-out form, related defined term),
+- a keyword variant: the question without its interrogative wording, closer to how the
+  standards are written (helps the sparse search).
+
+Variants keep the "query: " prefix of the question, if any.
+"""
+
+import re
+from typing import List
+
+# Interchangeable phrasings of IFRS terms, most common form first
+SYNONYM_GROUPS = [
+    ["expected credit losses", "ECL", "loss allowance"],
+    ["lifetime expected credit losses", "lifetime ECL"],
+    ["12-month expected credit losses", "12-month ECL"],
+    ["significant increase in credit risk", "SICR"],
+    ["credit-impaired", "stage 3"],
+    ["fair value through other comprehensive income", "FVOCI"],
+    ["fair value through profit or loss", "FVTPL"],
+    ["solely payments of principal and interest", "SPPI"],
+    ["effective interest rate", "EIR", "effective interest method"],
+    ["amortised cost", "amortized cost"],
+    ["derecognise", "remove from the statement of financial position"],
+    ["derecognition", "removal from the statement of financial position"],
+    ["hedging relationships", "hedge accounting", "hedging instrument and hedged item"],
+    ["hedging relationship", "hedge accounting relationship"],
+    ["fair value hierarchy", "Level 1, Level 2 and Level 3 inputs"],
+    ["business model", "business model for managing financial assets"],
+    ["financial instrument", "financial asset or financial liability"],
+]
+
+QUERY_PREFIX = re.compile(r"^\s*query\s*:\s*", re.IGNORECASE)
+QUESTION_WORDING = re.compile(
+    r"^(?:what|which|how|when|why|under\s+what\s+conditions?|in\s+which\s+cases?)\b"
+    r"(?:\s+(?:is|are|does|do|should|can|must|shall|an?|the|entity|entities))*\s+",
+    re.IGNORECASE,
+)
+
+# Longest phrases first, so "lifetime expected credit losses" isn't also matched as "expected credit losses"
+_PHRASES = sorted(((phrase, group) for group in SYNONYM_GROUPS for phrase in group), key=lambda item: -len(item[0]))
+_PHRASE_PATTERN = re.compile(
+    "|".join(rf"(?<![\w-]){re.escape(phrase)}(?![\w-])" for phrase, _ in _PHRASES), re.IGNORECASE
+)
+_GROUP_OF = {phrase.lower(): group for phrase, group in _PHRASES}
+
+
+def keyword_variant(question: str) -> str:
+    """
+    Question without its interrogative wording and question mark, e.g.
+    "How should expected credit losses be measured?" -> "expected credit losses be measured".
+    """
+    return QUESTION_WORDING.sub("", question).rstrip(" ?").strip()
+
+
+def expand_query(query: str, max_variants: int = 3) -> List[str]:
+    """
+    Original query followed by up to `max_variants` distinct rule-based variants.
+    """
+    m = QUERY_PREFIX.match(query)
+    prefix = m.group(0) if m else ""
+    question = query[len(prefix):]
+
+    variants = []
+    for match in _PHRASE_PATTERN.finditer(question):
+        term = match.group(0)
+        for alternative in _GROUP_OF[term.lower()]:
+            if alternative.lower() != term.lower():
+                variants.append(question[:match.start()] + alternative + question[match.end():])
+                break # One variant per term, so every term of the question gets one
+    variants.append(keyword_variant(question))
+
+    seen = {question.lower()}
+    expanded = [query]
+    for variant in variants:
+        if variant and variant.lower() not in seen and len(expanded) <= max_variants:
+            seen.add(variant.lower())
+            expanded.append(prefix + variant)
+    return expanded
@@ -6,18 +6,40 @@ from configuration files with different retrieval modes.
 """
 
 import yaml
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, Tuple
-from langchain_qdrant import QdrantVectorStore, RetrievalMode, FastEmbedSparse
-from qdrant_client import QdrantClient
+from typing import Dict, List, Optional, Tuple
+from langchain_core.documents import Document
+from langchain_qdrant import QdrantVectorStore, RetrievalMode
+from qdrant_client import QdrantClient, models
 
-from embeddings.embedding import FastEmbedEmbeddings
+from embeddings.embedding import FastEmbedEmbeddings, FastEmbedSparseEmbeddings
 from indexing.qdrant import load_qdrant_client
+from indexing.matryoshka import SHORT_VECTOR_NAME, truncate_vector
+from scheduling.cpu_budget import component_threads, pinned
 
 path = Path(__file__).parent.parent
 good_path = path/ "indexing/collections.yaml"
 
 
+@lru_cache(maxsize=None)
+def load_dense_model(model_name: str, variant: str = "fp32") -> FastEmbedEmbeddings:
+    """
+    Dense embedding model, loaded once per process: vector stores of collections sharing a model share it.
+    Uses the "embed" threads and cores of the CPU budget when one is enabled (see scheduling.cpu_budget).
+    """
+    with pinned("embed"):
+        return FastEmbedEmbeddings(model_name=model_name, variant=variant, threads=component_threads("embed"))
+
+@lru_cache(maxsize=None)
+def load_sparse_model(model_name: str) -> FastEmbedSparseEmbeddings:
+    """
+    Sparse embedding model, loaded once per process (with the "embed" CPU budget, as load_dense_model).
+    """
+    with pinned("embed"):
+        return FastEmbedSparseEmbeddings(model_name=model_name, threads=component_threads("embed"))
+
+
 def load_vector_store_from_config(
     collection_name: str,
     client: Optional[QdrantClient] = None,
@@ -82,24 +104,24 @@ def load_vector_store_from_config(
         if force_mode in ["dense", "hybrid"]:
             if model_config.get("dense") is not None:
                 dense_name = model_config["dense"]["name"]
-                model_dense = FastEmbedEmbeddings(model_name=dense_name)
+                model_dense = load_dense_model(dense_name, model_config["dense"].get("variant", "fp32"))
             elif force_mode == "dense":
                 raise ValueError(f"Dense embeddings not configured for '{collection_name}'")
 
         if force_mode in ["sparse", "hybrid"]:
             if model_config.get("sparse") is not None:
                 sparse_name = model_config["sparse"]["name"]
-                model_sparse = FastEmbedSparse(model_name=sparse_name)
+                model_sparse = load_sparse_model(sparse_name)
             elif force_mode == "sparse":
                 raise ValueError(f"Sparse embeddings not configured for '{collection_name}'")
     else:
         if model_config.get("dense") is not None:
             dense_name = model_config["dense"]["name"]
-            model_dense = FastEmbedEmbeddings(model_name=dense_name)
+            model_dense = load_dense_model(dense_name, model_config["dense"].get("variant", "fp32"))
 
         if model_config.get("sparse") is not None:
             sparse_name = model_config["sparse"]["name"]
-            model_sparse = FastEmbedSparse(model_name=sparse_name)
+            model_sparse = load_sparse_model(sparse_name)
 
     if force_retrieval_mode:
         mode_map = {
@@ -130,4 +152,148 @@ def load_vector_store_from_config(
     mode_suffix = f" (forced: {force_retrieval_mode})" if force_retrieval_mode else ""
 #    print(f"✓ Vector store loaded: {collection_name} (mode: {retrieval_mode.value}{mode_suffix})")
 
-    return vector_store
\ No newline at end of file
+    return vector_store
+
+def load_vector_stores_from_config(
+    collection_names: List[str],
+    client: Optional[QdrantClient] = None,
+    config_path: str = str(good_path),
+    force_retrieval_mode: Optional[str] = None
+) -> Dict[str, QdrantVectorStore]:
+    """
+    Load one QdrantVectorStore per collection (see load_vector_store_from_config), sharing the client
+    and the embedding models.
+
+    Returns:
+        {collection_name: QdrantVectorStore}, in the order of collection_names
+    """
+    return {name: load_vector_store_from_config(name, client=client, config_path=config_path,
+                                                force_retrieval_mode=force_retrieval_mode)
+            for name in collection_names}
+
+def get_collection_config(collection_name: str, config_path: str = str(good_path)) -> dict:
+    """
+    Entry of a collection in collections.yaml ({} if it isn't there).
+    """
+    with open(config_path, 'r') as file:
+        config = yaml.safe_load(file) or []
+
+    for model in config:
+        if model.get("name") == collection_name:
+            return model
+    return {}
+
+def get_collection_profile(collection_name: str, config_path: str = str(good_path)):
+    """
+    Profile (name or inline mapping, see indexing.profiles) of a collection in collections.yaml, None if unset.
+    """
+    return get_collection_config(collection_name, config_path).get("profile")
+
+def search_points(
+    vector_store: QdrantVectorStore,
+    query: str,
+    k: int = 20,
+    query_filter: Optional[models.Filter] = None,
+    score_threshold: Optional[float] = None,
+    with_payload: bool = True,
+    dense_vector: Optional[List[float]] = None,
+    sparse_vector=None,
+    search_params: Optional[models.SearchParams] = None,
+    short_dim: Optional[int] = None,
+    candidates: Optional[int] = None,
+    relevance_threshold: Optional[float] = None
+) -> List[models.ScoredPoint]:
+    """
+    Run the same Qdrant request as QdrantVectorStore for its retrieval mode, with the embedding step exposed.
+
+    Embeddings not passed are computed here, so callers can time (or batch) query embedding
+    separately from the vector search itself.
+
+    Args:
+        vector_store: Store loaded with load_vector_store_from_config
+        query: Search query (with its "query: " prefix if the model needs it)
+        k: Number of points to return
+        query_filter: Optional Qdrant filter
+        score_threshold: Optional raw score threshold applied by Qdrant (cosine similarity, RRF score, ...)
+        with_payload: Set to False to only get IDs and scores back
+        dense_vector: Precomputed dense query embedding
+        sparse_vector: Precomputed sparse query embedding (object with `indices` and `values`)
+        search_params: Dense search parameters (hnsw_ef, quantization rescoring, see indexing.profiles)
+        short_dim: Size of the collection's truncated vector: if set, the dense search first takes
+            `candidates` points (default 4 * k) with the short vector, then rescores them with the full one
+        candidates: First-stage pool size with short_dim
+        relevance_threshold: Optional minimum relevance score, the threshold of LangChain's
+            "similarity_score_threshold" search type (see filter_by_relevance)
+
+    Returns:
+        List of Qdrant ScoredPoint, best first
+    """
+    mode = vector_store.retrieval_mode
+
+    if mode in (RetrievalMode.DENSE, RetrievalMode.HYBRID) and dense_vector is None:
+        dense_vector = vector_store.embeddings.embed_query(query)
+    if mode in (RetrievalMode.SPARSE, RetrievalMode.HYBRID) and sparse_vector is None:
+        sparse_vector = vector_store.sparse_embeddings.embed_query(query)
+
+    if sparse_vector is not None:
+        sparse_vector = models.SparseVector(indices=sparse_vector.indices, values=sparse_vector.values)
+
+    # First stage on the truncated vectors, the full dense vector only rescores its candidates
+    short_stage = None
+    if short_dim and dense_vector is not None:
+        short_stage = models.Prefetch(using=SHORT_VECTOR_NAME, query=truncate_vector(dense_vector, short_dim),
+                                      filter=query_filter, limit=candidates or 4 * k)
+
+    if mode == RetrievalMode.DENSE:
+        request = {"query": dense_vector, "using": vector_store.vector_name, "search_params": search_params, "prefetch": short_stage}
+    elif mode == RetrievalMode.SPARSE:
+        request = {"query": sparse_vector, "using": vector_store.sparse_vector_name}
+    else:
+        request = {
+            "prefetch": [
+                models.Prefetch(using=vector_store.vector_name, query=dense_vector, filter=query_filter, limit=k, params=search_params, prefetch=short_stage),
+                models.Prefetch(using=vector_store.sparse_vector_name, query=sparse_vector, filter=query_filter, limit=k),
+            ],
+            "query": models.FusionQuery(fusion=models.Fusion.RRF),
+        }
+
+    points = vector_store.client.query_points(
+        collection_name=vector_store.collection_name,
+        query_filter=query_filter,
+        score_threshold=score_threshold,
+        limit=k,
+        with_payload=with_payload,
+        **request
+    ).points
+    return filter_by_relevance(vector_store, points, relevance_threshold)
+
+
+def filter_by_relevance(vector_store: QdrantVectorStore, points: List[models.ScoredPoint], threshold: Optional[float]) -> List[models.ScoredPoint]:
+    """
+    Points whose relevance score is at least `threshold`, computed as LangChain's
+    "similarity_score_threshold" search type does: the store's relevance function of the raw score
+    ((score + 1) / 2 for cosine collections, RRF scores of the hybrid mode included).
+
+    The thresholds of production_retriever are calibrated on this scale, not on raw Qdrant scores
+    (a raw 0.6 cutoff on RRF scores keeps almost nothing).
+    """
+    if threshold is None:
+        return points
+    relevance = vector_store._select_relevance_score_fn()
+    return [point for point in points if relevance(point.score) >= threshold]
+
+
+def points_to_documents(points: List[models.ScoredPoint], collection_name: str) -> List[Document]:
+    """
+    Convert Qdrant points (with payload) to Documents shaped like QdrantVectorStore results.
+    """
+    docs = []
+    for point in points:
+        payload = point.payload or {}
+        metadata = dict(payload.get("metadata") or {})
+        metadata["_id"] = point.id
+        metadata["_collection_name"] = collection_name
+        if getattr(point, "score", None) is not None:
+            metadata["score"] = point.score
+        docs.append(Document(page_content=payload.get("page_content", ""), metadata=metadata))
+    return docs
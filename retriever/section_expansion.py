@@ -0,0 +1,117 @@
+"""
+Context expansion with the section tree.
+
+Retrieved chunks are often fragments of a paragraph or of a list spread over several chunks.
+SectionExpansionRetriever adds the rest of the paragraph, the neighbouring chunks of the same
+section, or the section and its parent sections, around each hit within a token budget. Positions
+come from indexing.section_tree and the added chunks are fetched by ID in one call: no extra vector
+search.
+"""
+
+import warnings
+from typing import List, Optional
+
+from langchain_core.documents import Document
+
+from indexing.section_tree import TREE_FILE, SectionTree
+from monitoring.tracing import span
+from retriever.retrievers import points_to_documents
+
+
+class SectionExpansionRetriever:
+    """
+    Expand the results of `retriever` to their paragraph / section neighbours.
+
+    Hits keep their rank order; the chunks added around a hit follow it, the group being sorted in
+    document order so the LLM reads contiguous text. Added chunks carry `expanded_from` (the hit ID).
+
+    Args:
+        retriever: Base retriever (its Documents must carry `_id`, as QdrantVectorStore results do)
+        client: QdrantClient used to fetch the added chunks by ID
+        collection_name: Collection holding the chunks
+        mode: "paragraph", "neighbours" or "section" (see SectionTree.expansion)
+        token_budget: Maximum approximate tokens added around the hits
+        window: Neighbours on each side for mode="neighbours"
+        levels: Parent section levels expanded to for mode="section"
+        tree: SectionTree (loaded from data/section_tree.npz if None)
+    """
+
+    def __init__(self, retriever, client, collection_name: str = "RAG", mode: str = "paragraph",
+                 token_budget: int = 1500, window: int = 1, levels: int = 1, tree: Optional[SectionTree] = None):
+        self.retriever = retriever
+        self.client = client
+        self.collection_name = collection_name
+        self.mode = mode
+        self.token_budget = token_budget
+        self.window = window
+        self.levels = levels
+        self.tree = tree if tree is not None else SectionTree()
+
+    def plan(self, hits: List[Document]) -> List[List[int]]:
+        """
+        Positions to return for each hit (hit included), within the token budget. Hits unknown to
+        the tree are kept as they are (empty plan).
+        """
+        tree = self.tree
+        positions = [tree.position(doc.metadata.get("_id")) for doc in hits]
+        taken = {pos for pos in positions if pos is not None}
+        used = 0
+
+        plans = []
+        for pos in positions:
+            plan = [] if pos is None else [pos]
+            if pos is not None:
+                for candidate in tree.expansion(pos, self.mode, self.window, self.levels):
+                    if candidate in taken:
+                        continue
+                    cost = int(tree.tokens[candidate])
+                    if used + cost > self.token_budget:
+                        break # Candidates are sorted by relevance, stop at the first one that doesn't fit
+                    used += cost
+                    taken.add(candidate)
+                    plan.append(candidate)
+            plans.append(sorted(plan))
+        return plans
+
+    def invoke(self, query: str) -> List[Document]:
+        hits = self.retriever.invoke(query)
+        if not hits:
+            return []
+
+        with span("expand", hits=len(hits)):
+            plans = self.plan(hits)
+            hit_ids = {str(hit.metadata.get("_id")) for hit in hits}
+            ids = [str(self.tree.ids[pos]) for plan in plans for pos in plan]
+            ids = [point_id for point_id in ids if point_id not in hit_ids]
+
+            fetched = {}
+            if ids:
+                records = self.client.retrieve(collection_name=self.collection_name, ids=ids, with_payload=True)
+                fetched = {str(doc.metadata["_id"]): doc for doc in points_to_documents(records, self.collection_name)}
+
+            docs = []
+            for hit, plan in zip(hits, plans):
+                if not plan:
+                    docs.append(hit)
+                    continue
+                hit_id = str(hit.metadata.get("_id"))
+                for pos in plan:
+                    point_id = str(self.tree.ids[pos])
+                    if point_id == hit_id:
+                        docs.append(hit)
+                    elif point_id in fetched:
+                        doc = fetched[point_id]
+                        doc.metadata["expanded_from"] = hit_id
+                        docs.append(doc)
+
+        return docs
+
+
+def with_section_expansion(retriever, client, collection_name: str = "RAG", mode: str = "paragraph", token_budget: int = 1500):
+    """
+    Wrap `retriever` with a SectionExpansionRetriever, or return it unchanged (with a warning) if the tree wasn't built.
+    """
+    if not TREE_FILE.exists():
+        warnings.warn(f"{TREE_FILE} not built (python -m indexing.section_tree), context expansion is disabled")
+        return retriever
+    return SectionExpansionRetriever(retriever, client, collection_name=collection_name, mode=mode, token_budget=token_budget)
@@ -3,8 +3,11 @@ import yaml
 import numpy as np
 from typing import List, Dict, Tuple, Optional
 import time
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.documents import Document
+from flashrank import Ranker
 from retriever.retrievers import load_vector_store_from_config
-from retriever.final_retriever import production_retriever, retrieve_FlashrankReranker
+from retriever.final_retriever import production_retriever, retrieve_FlashrankReranker, filters, default_threshold
 import logging
 logging.getLogger("httpx").setLevel(logging.WARNING)
 
@@ -67,6 +70,13 @@ def evaluate_single_query(retriever, query: str, relevant_ids, k: int = 10, add_
 
     query_time_ms = (end_time - start_time) * 1000
 
+    return compute_metrics(documents, relevant_ids, k, query_time_ms)
+
+
+def compute_metrics(documents, relevant_ids, k: int, query_time_ms: float) -> Dict[str, float]:
+    """
+    Metrics of a single query from its retrieved documents.
+    """
     retrieved_ids = [doc.metadata.get("_id", "") for doc in documents]
 
     metrics = {
@@ -109,18 +119,7 @@ def simple_evaluation(
     results = {}
 
     for config in retriever_configs:
-        # Parse config
-        if len(config) == 3:
-            retrieval_mode, search_type, threshold = config
-            use_rerank, rerank_top_n, rerank_threshold, rerank_model, add_query_prefix = False, None, None, None, False
-        elif len(config) == 6:
-            retrieval_mode, search_type, threshold, use_rerank, rerank_top_n, rerank_threshold = config
-            rerank_model, add_query_prefix = None, False
-        elif len(config) == 7:
-            retrieval_mode, search_type, threshold, use_rerank, rerank_top_n, rerank_threshold, rerank_model = config
-            add_query_prefix = False
-        else:
-            retrieval_mode, search_type, threshold, use_rerank, rerank_top_n, rerank_threshold, rerank_model, add_query_prefix = config
+        retrieval_mode, search_type, threshold, use_rerank, rerank_top_n, rerank_threshold, rerank_model, add_query_prefix = parse_retriever_config(config, k)
 
         if retrieval_mode not in ["hybrid", "dense", "sparse"]:
             print(f"Warning: Invalid retrieval_mode '{retrieval_mode}', skipping")
@@ -142,28 +141,14 @@ def simple_evaluation(
 
         # Apply reranking if requested
         if use_rerank:
-            if rerank_top_n is None:
-                rerank_top_n = k
-            if rerank_threshold is None:
-                rerank_threshold = 0.5
-            if rerank_model is None:
-                rerank_model = "ms-marco-MiniLM-L-12-v2"
-
             retriever = retrieve_FlashrankReranker(
                 retriever=retriever,
                 model_name=rerank_model,
                 top_n=rerank_top_n,
                 threshold=rerank_threshold
             )
-            # Include model name in retriever_name for clarity
-            model_short = rerank_model.replace("ms-marco-", "").replace("-v2", "")
-            retriever_name = f"{retrieval_mode}_{search_type}_t{threshold}_rerank_{model_short}_top{rerank_top_n}_t{rerank_threshold}"
-            if add_query_prefix:
-                retriever_name += "_queryprefix"
-        else:
-            retriever_name = f"{retrieval_mode}_{search_type}_t{threshold}"
-            if add_query_prefix:
-                retriever_name += "_queryprefix"
+
+        retriever_name = get_retriever_name(config, k)
 
         print(f"\nEvaluating {retriever_name}...")
 
@@ -179,22 +164,191 @@ def simple_evaluation(
             metrics = evaluate_single_query(retriever, query, relevant_ids, k, add_query_prefix=add_query_prefix)
             metrics_list.append(metrics)
 
-        # Aggregate metrics
-        aggregated = {}
-        metric_names = [f"recall@{k}", "mrr", "query_time_ms", "num_docs_retrieved"]
+        results[retriever_name] = aggregate_metrics(metrics_list, k)
+        print(f"  ✓ Completed {len(request_pool)} queries")
+
+    return results
 
-        for metric_name in metric_names:
-            values = [m[metric_name] for m in metrics_list]
-            aggregated[f"{metric_name}_mean"] = np.mean(values)
-            aggregated[f"{metric_name}_std"] = np.std(values)
-            aggregated[f"{metric_name}_min"] = np.min(values)
-            aggregated[f"{metric_name}_max"] = np.max(values)
-            aggregated[f"{metric_name}_median"] = np.median(values)
 
-        results[retriever_name] = aggregated
+def parallel_evaluation(
+    retriever_configs: List[Tuple[str, str, float, bool, Optional[int], Optional[float], Optional[str], Optional[bool]]],
+    request_pool: List[Dict] = None,
+    k: int = 10,
+    max_workers: int = 8
+) -> Dict[str, Dict[str, float]]:
+    """
+    Same evaluation as `simple_evaluation` (same configs, same recall@k/MRR output) but much faster on a config grid.
+
+    Configs are grouped by what actually hits Qdrant (retrieval mode, query prefix, filtered or not):
+    each group loads its vector store once and searches every query once, concurrently over a thread pool.
+    The candidates are then shared by every config of the group, which only applies its own threshold
+    and reranking locally (FlashRank models are loaded once per model name).
+
+    Applying the threshold after the top-k search gives the same documents as the thresholded Qdrant search,
+    since candidates come back sorted by score.
+    `query_time_ms` is the group search time plus the config's own post-processing, i.e. what the config would cost alone.
+
+    Args:
+        retriever_configs: Same tuples as `simple_evaluation`
+        request_pool: List of dicts with keys 'question', 'answer', 'location'
+        k: Number of documents to retrieve
+        max_workers: Number of queries evaluated concurrently
+    """
+    if request_pool is None:
+        request_pool = evaluation_set
+
+    # Group configs sharing the same Qdrant search
+    groups = {}
+    for config in retriever_configs:
+        parsed = parse_retriever_config(config, k)
+        retrieval_mode, search_type, threshold, _, _, _, _, add_query_prefix = parsed
+
+        if retrieval_mode not in ["hybrid", "dense", "sparse"]:
+            print(f"Warning: Invalid retrieval_mode '{retrieval_mode}', skipping")
+            continue
+
+        # Same rule as simple_evaluation: a threshold means production_retriever (relevance scores + type filter)
+        filtered = threshold > 0 or search_type == "similarity_score_threshold"
+        groups.setdefault((retrieval_mode, add_query_prefix, filtered), []).append((get_retriever_name(config, k), parsed))
+
+    vector_stores = {}
+    rankers = {}
+    metrics_per_config = {}
+
+    for (retrieval_mode, add_query_prefix, filtered), configs in groups.items():
+        if retrieval_mode not in vector_stores:
+            vector_stores[retrieval_mode] = load_vector_store_from_config("RAG", force_retrieval_mode=retrieval_mode)
+        vector_store = vector_stores[retrieval_mode]
+
+        # Build post-processing steps once per config
+        steps = []
+        for retriever_name, (_, _, threshold, use_rerank, rerank_top_n, rerank_threshold, rerank_model, _) in configs:
+            if filtered:
+                threshold = threshold if threshold > 0 else default_threshold(retrieval_mode)
+            else:
+                threshold = None
+
+            reranker = None
+            if use_rerank:
+                if rerank_model not in rankers:
+                    rankers[rerank_model] = Ranker(model_name=rerank_model)
+                reranker = retrieve_FlashrankReranker(
+                    retriever=None,
+                    model_name=rerank_model,
+                    top_n=rerank_top_n,
+                    threshold=rerank_threshold,
+                    ranker=rankers[rerank_model]
+                )
+
+            steps.append((retriever_name, threshold, reranker))
+            metrics_per_config[retriever_name] = [None] * len(request_pool)
+
+        print(f"\nEvaluating {', '.join(name for name, _, _ in steps)}...")
+
+        def evaluate_query(i):
+            query_item = request_pool[i]
+            query = query_item["question"]
+            if add_query_prefix:
+                query = f"query: {query}"
+
+            start_time = time.perf_counter()
+            if filtered:
+                candidates = vector_store.similarity_search_with_relevance_scores(query, k=k, filter=filters)
+            else:
+                candidates = vector_store.similarity_search_with_score(query, k=k)
+            search_time_ms = (time.perf_counter() - start_time) * 1000
+
+            for retriever_name, threshold, reranker in steps:
+                start_time = time.perf_counter()
+
+                documents = [
+                    Document(page_content=doc.page_content, metadata=dict(doc.metadata)) #Copy, reranker writes in metadata
+                    for doc, score in candidates
+                    if threshold is None or score >= threshold
+                ]
+                if reranker is not None:
+                    documents = reranker.rerank(query, documents)
+
+                query_time_ms = search_time_ms + (time.perf_counter() - start_time) * 1000
+                metrics_per_config[retriever_name][i] = compute_metrics(documents, query_item["location"], k, query_time_ms)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            list(executor.map(evaluate_query, range(len(request_pool))))
+
         print(f"  ✓ Completed {len(request_pool)} queries")
 
-    return results
+    # Keep the order of retriever_configs
+    results = {}
+    for configs in groups.values():
+        for retriever_name, _ in configs:
+            results[retriever_name] = aggregate_metrics(metrics_per_config[retriever_name], k)
+
+    order = [get_retriever_name(config, k) for config in retriever_configs]
+    return {name: results[name] for name in order if name in results}
+
+
+def parse_retriever_config(config: tuple, k: int) -> tuple:
+    """
+    Expand a retriever config tuple (3, 6, 7 or 8 elements) to its 8 fields, filling rerank defaults.
+    """
+    if len(config) == 3:
+        retrieval_mode, search_type, threshold = config
+        use_rerank, rerank_top_n, rerank_threshold, rerank_model, add_query_prefix = False, None, None, None, False
+    elif len(config) == 6:
+        retrieval_mode, search_type, threshold, use_rerank, rerank_top_n, rerank_threshold = config
+        rerank_model, add_query_prefix = None, False
+    elif len(config) == 7:
+        retrieval_mode, search_type, threshold, use_rerank, rerank_top_n, rerank_threshold, rerank_model = config
+        add_query_prefix = False
+    else:
+        retrieval_mode, search_type, threshold, use_rerank, rerank_top_n, rerank_threshold, rerank_model, add_query_prefix = config
+
+    if use_rerank:
+        if rerank_top_n is None:
+            rerank_top_n = k
+        if rerank_threshold is None:
+            rerank_threshold = 0.5
+        if rerank_model is None:
+            rerank_model = "ms-marco-MiniLM-L-12-v2"
+
+    return retrieval_mode, search_type, threshold, use_rerank, rerank_top_n, rerank_threshold, rerank_model, add_query_prefix
+
+
+def get_retriever_name(config: tuple, k: int) -> str:
+    """
+    Name used as key in the evaluation results.
+    """
+    retrieval_mode, search_type, threshold, use_rerank, rerank_top_n, rerank_threshold, rerank_model, add_query_prefix = parse_retriever_config(config, k)
+
+    if use_rerank:
+        # Include model name in retriever_name for clarity
+        model_short = rerank_model.replace("ms-marco-", "").replace("-v2", "")
+        retriever_name = f"{retrieval_mode}_{search_type}_t{threshold}_rerank_{model_short}_top{rerank_top_n}_t{rerank_threshold}"
+    else:
+        retriever_name = f"{retrieval_mode}_{search_type}_t{threshold}"
+
+    if add_query_prefix:
+        retriever_name += "_queryprefix"
+
+    return retriever_name
+
+
+def aggregate_metrics(metrics_list: List[Dict[str, float]], k: int) -> Dict[str, float]:
+    """
+    Aggregate per-query metrics into mean/std/min/max/median.
+    """
+    aggregated = {}
+    metric_names = [f"recall@{k}", "mrr", "query_time_ms", "num_docs_retrieved"]
+
+    for metric_name in metric_names:
+        values = [m[metric_name] for m in metrics_list]
+        aggregated[f"{metric_name}_mean"] = np.mean(values)
+        aggregated[f"{metric_name}_std"] = np.std(values)
+        aggregated[f"{metric_name}_min"] = np.min(values)
+        aggregated[f"{metric_name}_max"] = np.max(values)
+        aggregated[f"{metric_name}_median"] = np.median(values)
+
+    return aggregated
 
 
 def print_simple_evaluation_results(results: Dict[str, Dict[str, float]], k: int):
@@ -243,13 +397,15 @@ if __name__ == "__main__":
 
     k = 20
 
-    print(f"Starting simple evaluation with k={k}")
+    print(f"Starting parallel evaluation with k={k}")
     print(f"Number of queries: {len(evaluation_set)}")
 
-    results = simple_evaluation(
+    start_time = time.perf_counter()
+    results = parallel_evaluation(
         retriever_configs=retriever_configs,
         k=k
     )
+    print(f"\nFull sweep done in {time.perf_counter() - start_time:.1f}s")
 
     print_simple_evaluation_results(results, k)
 
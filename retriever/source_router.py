@@ -0,0 +1,191 @@
+"""
+Source routing.
+
+Predicts which regulation(s) a question is about and restricts the vector search to them with a
+`metadata.source` filter (payload-indexed by the collection profiles):
+1. regex: standards named in the query ("IFRS 9", "IFRS13", "Basel III") are routed to directly,
+2. classifier: otherwise the query embedding is compared to the source centroids
+   (indexing.source_centroids) and the nearest source is used if it leads the second one by
+   `min_margin` cosine,
+3. fallback: low confidence, or a routed search returning fewer than `min_results` chunks, runs
+   the usual search over the whole collection.
+
+The query is embedded once, for both the classifier and the search.
+"""
+
+import json
+import math
+import re
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_qdrant import RetrievalMode
+from qdrant_client import models
+
+from indexing.paragraph_index import INDEX_FILE
+from indexing.source_centroids import load_source_centroids
+from monitoring.tracing import incr, span
+from retriever.payload_light import hydrate_points
+from retriever.retrievers import points_to_documents, search_points
+
+# Names of sources that don't follow the "<STANDARD>_<number>" pattern
+SOURCE_ALIASES = {
+    "Bale_3": [r"\bBasel[\s_-]?(?:III|3)\b"],
+    "ECB_trim_guide": [r"\bTRIM\b", r"\bECB guide to internal models\b"],
+}
+
+
+def source_pattern(source: str) -> Optional[re.Pattern]:
+    """
+    Regex of the names of a source: "IFRS_9" matches "IFRS 9", "IFRS9", "ifrs-9"; aliases from SOURCE_ALIASES.
+    """
+    patterns = list(SOURCE_ALIASES.get(source, []))
+    m = re.fullmatch(r"([A-Za-z]+)_(\d+)", source)
+    if m:
+        patterns.append(rf"\b{m.group(1)}[\s_-]?{m.group(2)}\b")
+    return re.compile("|".join(patterns), re.IGNORECASE) if patterns else None
+
+
+def indexed_sources() -> List[str]:
+    """
+    Sources of the paragraph index (data/paragraph_index.json keys are "source|paragraph").
+    """
+    if not INDEX_FILE.exists():
+        return []
+    with open(INDEX_FILE, "r", encoding="utf-8") as f:
+        return list(dict.fromkeys(key.split("|", 1)[0] for key in json.load(f)))
+
+
+def with_source_filter(filter: Optional[models.Filter], sources: List[str]) -> models.Filter:
+    """
+    `filter` with an extra metadata.source condition.
+    """
+    condition = models.FieldCondition(key="metadata.source", match=models.MatchAny(any=sources))
+    return models.Filter(must=[filter, condition] if filter is not None else [condition]) # Nested filter, kept as is
+
+
+class SourceRouter:
+    """
+    Regex + nearest-centroid source prediction.
+
+    Args:
+        centroids: {source: unit centroid} (data/source_centroids.json if None; regex only if not built)
+        sources: Known sources for the regex (the centroids' sources, else the paragraph index's, if None)
+        min_margin: Minimum cosine lead of the nearest centroid over the second one
+    """
+
+    def __init__(self, centroids: Optional[Dict[str, List[float]]] = None, sources: Optional[List[str]] = None,
+                 min_margin: float = 0.02):
+        self.centroids = centroids if centroids is not None else (load_source_centroids() or {})
+        self.min_margin = min_margin
+        self.patterns = {}
+        for source in sources or list(self.centroids) or indexed_sources():
+            pattern = source_pattern(source)
+            if pattern is not None:
+                self.patterns[source] = pattern
+
+    def classify(self, query_vector: List[float]) -> Tuple[Optional[str], float]:
+        """
+        Nearest source centroid and its cosine lead over the second one (None if there are fewer than 2 sources).
+        """
+        if len(self.centroids) < 2:
+            return None, 0.0
+        norm = math.sqrt(sum(x * x for x in query_vector)) or 1.0
+        scores = sorted(((sum(a * b for a, b in zip(query_vector, centroid)) / norm, source)
+                         for source, centroid in self.centroids.items()), reverse=True)
+        return scores[0][1], scores[0][0] - scores[1][0]
+
+    def route(self, query: str, query_vector: Optional[List[float]] = None) -> Tuple[Optional[List[str]], str]:
+        """
+        Predict the sources of a query.
+
+        Returns:
+            Tuple of (sources, or None for a global search, and how they were found: "regex", "classifier" or "global")
+        """
+        named = [source for source, pattern in self.patterns.items() if pattern.search(query)]
+        if named:
+            return named, "regex"
+
+        if query_vector is not None:
+            source, margin = self.classify(query_vector)
+            if source is not None and margin >= self.min_margin:
+                return [source], "classifier"
+
+        return None, "global"
+
+
+class SourceRoutedRetriever:
+    """
+    Retriever restricting its search to the sources predicted by a SourceRouter, global search otherwise.
+
+    Exposes the same `search_kwargs` as a LangChain VectorStoreRetriever so it can be wrapped by
+    retriever.cache.CachedRetriever (the routed filter only depends on the query).
+
+    Args:
+        vector_store: QdrantVectorStore (the classifier needs the dense mode or the hybrid mode)
+        router: SourceRouter (built from data/source_centroids.json if None)
+        k: Number of documents returned
+        threshold: Minimum relevance score, as in the "similarity_score_threshold" search type (None for no threshold)
+        filter: Base Qdrant filter, the source condition is added to it
+        search_params: Dense search parameters of the collection profile
+        short_dim: Size of the collection's short vector, for a two-stage dense search
+        candidates_factor: First-stage pool size with short_dim, as a multiple of k
+        store: ChunkStore to hydrate payload-less results from (see retriever.payload_light), None to get payloads from Qdrant
+        min_results: Routed searches returning fewer chunks are rerun globally
+    """
+
+    def __init__(self, vector_store, router: Optional[SourceRouter] = None, k: int = 20, threshold: Optional[float] = None,
+                 filter: Optional[models.Filter] = None, search_params: Optional[models.SearchParams] = None,
+                 short_dim: Optional[int] = None, candidates_factor: int = 4, store=None, min_results: int = 3):
+        self.vector_store = vector_store
+        self.router = router if router is not None else SourceRouter()
+        self.search_params = search_params
+        self.short_dim = short_dim
+        self.candidates_factor = candidates_factor
+        self.store = store
+        self.min_results = min_results
+        self.search_kwargs = {"k": k, "score_threshold": threshold, "filter": filter}
+
+    def search(self, query: str, query_filter: Optional[models.Filter], dense_vector) -> List[models.ScoredPoint]:
+        k = self.search_kwargs["k"]
+        return search_points(
+            self.vector_store,
+            query,
+            k=k,
+            query_filter=query_filter,
+            relevance_threshold=self.search_kwargs["score_threshold"],
+            with_payload=self.store is None,
+            dense_vector=dense_vector,
+            search_params=self.search_params,
+            short_dim=self.short_dim,
+            candidates=self.candidates_factor * k,
+        )
+
+    def search_with_scores(self, query: str) -> List[Tuple[Document, float]]:
+        base_filter = self.search_kwargs["filter"]
+        dense_vector = None
+        if self.vector_store.retrieval_mode in (RetrievalMode.DENSE, RetrievalMode.HYBRID):
+            dense_vector = self.vector_store.embeddings.embed_query(query)
+
+        with span("route_sources"):
+            sources, method = self.router.route(query, dense_vector)
+        incr(f"source_route_{method}")
+
+        points = None
+        if sources:
+            points = self.search(query, with_source_filter(base_filter, sources), dense_vector)
+            if len(points) < self.min_results:
+                incr("source_route_fallbacks")
+                points = None
+        if points is None:
+            points = self.search(query, base_filter, dense_vector)
+
+        collection_name = self.vector_store.collection_name
+        if self.store is None:
+            docs = points_to_documents(points, collection_name)
+        else:
+            docs = hydrate_points(points, self.store, self.vector_store.client, collection_name)
+        return [(doc, doc.metadata.get("score")) for doc in docs]
+
+    def invoke(self, query: str) -> List[Document]:
+        return [doc for doc, _ in self.search_with_scores(query)]
@@ -0,0 +1,278 @@
+"""
+CPU budget of the in-process inference components.
+
+The fastembed ONNX sessions, the FlashRank ONNX session and llama.cpp each size their thread pool for
+the whole machine. Under concurrent users they run at the same time and oversubscribe the cores,
+which shows up as p99 latency spikes. A CpuBudget assigns each component ("embed", "rerank", "llm"):
+- a thread count, used when its model is loaded (FastEmbed `threads`, ONNX Runtime intra-op threads
+  of the FlashRank session, llama.cpp `n_threads` / `n_threads_batch`),
+- optionally a core set: stages run with the calling thread pinned to it (os.sched_setaffinity),
+  and models loaded within `pinned()` create their thread pools on it,
+- a semaphore bounding the stage's concurrent runs, so that threads in flight never exceed the cores.
+
+Two plans:
+- "interleave": the cores are split between the LLM and the embedding/reranking models, so
+  retrieval of one request runs next to the generation of another,
+- "serialize": every component uses all the cores and a single slot is shared by all stages, one
+  CPU-heavy stage running at a time.
+
+A loaded llama.cpp model can only run one generation at a time, so the "llm" stage always has one
+slot per process.
+
+Disabled by default: `stage()` then returns a shared no-op context manager. Enable it at startup,
+before the models are loaded (thread counts are read at load time):
+
+    from scheduling.cpu_budget import enable_cpu_budget
+
+    enable_cpu_budget("interleave", pin=True)
+    chain = create_rag_chain(import_llm("qwen2.5-0.5b-instruct"))
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Sequence
+
+from LLM.llm import logical_cores, physical_cores
+from monitoring.tracing import incr
+
+COMPONENTS = ("embed", "rerank", "llm")
+PLANS = ("interleave", "serialize")
+
+# Small ONNX models stop scaling after a couple of threads on short inputs (one query, ~20 passages)
+MAX_ONNX_THREADS = 2
+
+
+def usable_cpus() -> list:
+    """
+    IDs of the CPUs this process may run on.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+class ComponentBudget:
+    """
+    Threads, core set and concurrent runs of one component.
+
+    Args:
+        threads: Threads used by one run of the component
+        cores: CPU IDs the component runs on (None to leave the affinity alone)
+        slots: Semaphore bounding the concurrent runs (shared between components to serialize them)
+    """
+
+    def __init__(self, threads: int, cores: Optional[Sequence[int]] = None, slots: Optional[threading.Semaphore] = None):
+        self.threads = max(1, threads)
+        self.cores = tuple(cores) if cores else None
+        self.slots = slots if slots is not None else threading.Semaphore(1)
+
+    def __repr__(self):
+        return f"ComponentBudget(threads={self.threads}, cores={self.cores})"
+
+
+def split_cores(cpus: list, llm_share: float) -> tuple:
+    """
+    (llm cores, embed cores, rerank cores) of the "interleave" plan. With fewer than 3 CPUs, the
+    embedding and reranking models share the non-LLM cores, or all of them.
+    """
+    n = len(cpus)
+    n_llm = min(max(1, round(n * llm_share)), max(1, n - 1))
+    llm, rest = cpus[:n_llm], cpus[n_llm:] or cpus
+    if len(rest) < 2:
+        return llm, rest, rest
+    half = len(rest) // 2
+    return llm, rest[:half], rest[half:]
+
+
+class CpuBudget:
+    """
+    Per-component thread counts, core sets and concurrency limits.
+
+    Args:
+        components: {component: ComponentBudget} for "embed", "rerank" and "llm"
+        pin: Pin the threads running a stage to the component's cores
+    """
+
+    def __init__(self, components: Dict[str, ComponentBudget], pin: bool = False):
+        missing = [name for name in COMPONENTS if name not in components]
+        if missing:
+            raise ValueError(f"Missing component budgets: {', '.join(missing)}")
+        self.components = components
+        self.pin = pin and hasattr(os, "sched_setaffinity")
+        self._held = threading.local()
+
+    @classmethod
+    def plan(cls, plan: str = "interleave", cpus: Optional[Sequence[int]] = None, llm_share: float = 0.5,
+             pin: bool = False) -> "CpuBudget":
+        """
+        Budget for the CPUs of this process (or `cpus`).
+
+        Args:
+            plan: "interleave" (cores split between the LLM and retrieval models) or "serialize" (one stage at a time)
+            cpus: CPU IDs to share (the process affinity if None)
+            llm_share: Share of the cores given to the LLM by the "interleave" plan
+            pin: Pin each stage to its cores
+        """
+        if plan not in PLANS:
+            raise ValueError(f"Unknown plan '{plan}'. Use one of: {', '.join(PLANS)}.")
+        cpus = sorted(cpus) if cpus else usable_cpus()
+        # Hyper-threads don't help token generation, the LLM gets one thread per physical core
+        smt = max(1, logical_cores() // physical_cores())
+
+        if plan == "serialize":
+            slots = threading.Semaphore(1)
+            onnx_threads = min(len(cpus), 2 * MAX_ONNX_THREADS)
+            return cls({
+                "embed": ComponentBudget(onnx_threads, cpus, slots),
+                "rerank": ComponentBudget(onnx_threads, cpus, slots),
+                "llm": ComponentBudget(len(cpus) // smt, cpus, slots),
+            }, pin=pin)
+
+        llm, embed, rerank = split_cores(cpus, llm_share)
+        components = {"llm": ComponentBudget(len(llm) // smt, llm)}
+        for name, cores in (("embed", embed), ("rerank", rerank)):
+            threads = min(len(cores), MAX_ONNX_THREADS)
+            components[name] = ComponentBudget(threads, cores, threading.Semaphore(max(1, len(cores) // threads)))
+        return cls(components, pin=pin)
+
+    def threads(self, component: str) -> int:
+        return self.components[component].threads
+
+    def llm_kwargs(self) -> Dict[str, int]:
+        """
+        llama.cpp thread settings (import_llm overrides).
+        """
+        threads = self.threads("llm")
+        return {"n_threads": threads, "n_threads_batch": threads}
+
+    @contextmanager
+    def pinned(self, component: str):
+        """
+        Run the block with the calling thread pinned to the component's cores (e.g. to load its model:
+        thread pools inherit the affinity of the thread creating them).
+        """
+        cores = self.components[component].cores
+        if not self.pin or cores is None:
+            yield
+            return
+        previous = os.sched_getaffinity(0)
+        os.sched_setaffinity(0, cores)  # 0 = the calling thread on Linux
+        try:
+            yield
+        finally:
+            os.sched_setaffinity(0, previous)
+
+    @contextmanager
+    def stage(self, component: str):
+        """
+        Run a stage of the component: wait for one of its slots, then run pinned to its cores.
+        Re-entrant: a thread already holding the slot (e.g. nested calls) doesn't wait again.
+        """
+        budget = self.components[component]
+        held = getattr(self._held, "slots", None)
+        if held is None:
+            held = self._held.slots = set()
+        if id(budget.slots) in held:
+            yield
+            return
+
+        start = time.perf_counter()
+        budget.slots.acquire()
+        incr(f"cpu_wait_ms_{component}", (time.perf_counter() - start) * 1000)
+        held.add(id(budget.slots))
+        try:
+            with self.pinned(component):
+                yield
+        finally:
+            held.discard(id(budget.slots))
+            budget.slots.release()
+
+    def describe(self) -> Dict[str, dict]:
+        return {name: {"threads": budget.threads, "cores": list(budget.cores or [])} for name, budget in self.components.items()}
+
+
+class _NoopStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_STAGE = _NoopStage()
+
+_budget: Optional[CpuBudget] = None
+
+
+def enable_cpu_budget(plan="interleave", **kwargs) -> CpuBudget:
+    """
+    Set the process-wide budget, a CpuBudget or a plan name (kwargs passed to CpuBudget.plan).
+    """
+    global _budget
+    _budget = plan if isinstance(plan, CpuBudget) else CpuBudget.plan(plan, **kwargs)
+    return _budget
+
+
+def disable_cpu_budget():
+    global _budget
+    _budget = None
+
+
+def get_cpu_budget() -> Optional[CpuBudget]:
+    return _budget
+
+
+def stage(component: str):
+    """
+    Context manager around a CPU-heavy stage ("embed", "rerank", "llm"), no-op without a budget.
+    """
+    budget = _budget
+    if budget is None:
+        return _NOOP_STAGE
+    return budget.stage(component)
+
+
+def pinned(component: str):
+    """
+    Context manager pinning model loading to the component's cores, no-op without a budget.
+    """
+    budget = _budget
+    if budget is None:
+        return _NOOP_STAGE
+    return budget.pinned(component)
+
+
+def component_threads(component: str, default: Optional[int] = None) -> Optional[int]:
+    """
+    Thread count of the component in the current budget, `default` without a budget.
+    """
+    budget = _budget
+    return budget.threads(component) if budget is not None else default
+
+
+def limit_session_threads(session, threads: int):
+    """
+    Copy of an ONNX Runtime session (e.g. FlashRank's `ranker.session`) with `threads` intra-op threads.
+    """
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = threads
+    options.inter_op_num_threads = 1
+    return ort.InferenceSession(session._model_path, sess_options=options, providers=["CPUExecutionProvider"])
+
+
+def budget_ranker(ranker):
+    """
+    Apply the "rerank" thread count to a flashrank.Ranker (created on the rerank cores), unchanged without a budget.
+    """
+    budget = _budget
+    if budget is None or not hasattr(ranker, "session"):
+        return ranker
+    with budget.pinned("rerank"):
+        ranker.session = limit_session_threads(ranker.session, budget.threads("rerank"))
+    return ranker
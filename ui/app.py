@@ -1,16 +1,26 @@
 import ui as st
+import os
 import sys
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
 from retriever.final_retriever import production_retriever
+from retriever.cache import default_cache
 from rag.chain import create_rag_chain
 from LLM import llm
 
-model = llm.import_llm("qwen2.5-0.5b-instruct-q8_0.gguf")
-retrieve_hybrid = production_retriever()
-chain = create_rag_chain(model, retriever=retrieve_hybrid, include_sources=False)
+@st.cache_resource #Streamlit reruns the script on every interaction, load the model and chain once
+def load_chain() :
+    if os.getenv("LLM_SERVER_SOCKET") : #Model kept resident by `python -m LLM.server`, survives UI reloads
+        from LLM.server import RemoteLLM
+        model = RemoteLLM(socket_path=os.getenv("LLM_SERVER_SOCKET"))
+    else :
+        model = llm.import_llm("qwen2.5-0.5b-instruct")
+    retrieve_hybrid = production_retriever(cache=default_cache)
+    return create_rag_chain(model, retriever=retrieve_hybrid, include_sources=False, structured_output=True)
+
+chain = load_chain()
 
 st.title("Mini RAG (IFRS / Réglementation)")
 
@@ -26,18 +36,15 @@ if query:
     st.write(result["answer"])
 
     st.subheader("Sources")
-    list_sources = [elem.metadata for elem in result["retrieved_documents"]]
-    all_list = [
-        elem.get("source", "") + " - " + elem.get("title", "") + " - " + elem.get("subtitle", "") + " - " + elem.get("subsection", "")
-        for elem in list_sources]
-
-    for i, label in enumerate(all_list):
-        if label in all_list[:i]:
-            continue
+    documents = result.get("cited_documents", []) #Only the sources cited by the model
+    if not documents :
+        st.write("Aucune source citée.")
+    grouped = {}
+    for elem in documents:
+        label = " - ".join(elem.metadata.get(key) or "" for key in ("source", "title", "subtitle", "subsection"))
+        grouped.setdefault(label, []).append(elem.page_content)
+
+    for label, contents in grouped.items():
         with st.expander(label):
             st.write("Contenu :")
-            content = "\n\n".join(
-                [elem.page_content for elem in result["retrieved_documents"] if
-                 elem.metadata.get("source", "") + " - " + elem.metadata.get("title", "") + " - " +
-                 elem.metadata.get("subtitle", "") + " - " + elem.metadata.get("subsection", "") == label])
-            st.write(content)
+            st.write("\n\n".join(contents))